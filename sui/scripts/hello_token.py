@@ -1,4 +1,6 @@
 
+from typing import Union
+
 from base58 import b58decode
 from load import hello_token_package, sui_project, wormhole_package, token_bridge_package
 from sui_brownie import Argument, U16
@@ -155,7 +157,7 @@ def send_tokens_with_payload(coin_object, coin_type):
     )
 
 
-def redeem_tokens_with_payload(vaa: str, coin_type):
+def redeem_tokens_with_payload(vaa: Union[bytes, str], coin_type):
     # public entry fun external_redeem_transfer_with_payload<C>(
     #     t_state: &State,
     #     wormhole_state: &WormholeState,
@@ -173,7 +175,10 @@ def redeem_tokens_with_payload(vaa: str, coin_type):
     hello_token = hello_token_package(hello_token_package_id)
 
     clock = "0x0000000000000000000000000000000000000000000000000000000000000006"
-    raw_vaa = list(bytes.fromhex(vaa.replace("0x", "")))
+    if isinstance(vaa, str):
+        vaa = bytes.fromhex(vaa.replace("0x", ""))
+    # sui_brownie encodes vector<u8> from a list of ints
+    raw_vaa = list(vaa)
 
     params = [
         hello_token_state,
@@ -1,9 +1,14 @@
-import base64
+import asyncio
+import sys
+from pathlib import Path
 
-import requests
 from load import token_bridge_package, wormhole_package, sui_project
 from sui_brownie import Argument, U16
 
+# the pooled signed-VAA fetcher lives with the python relayer helpers
+sys.path.append(str(Path(__file__).resolve().parents[2].joinpath("tests")))
+from get_vaa import fetch_signed_vaa, sui_token_bridge_emitter  # noqa: E402
+
 sui_project.active_account("TestAccount")
 
 def attest_token():
@@ -63,19 +68,12 @@ def attest_token():
     )
 
 
-def get_signed_vaa():
-    base_url = "https://wormhole-v2-testnet-api.certus.one/v1/signed_vaa/21/40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9/"
-    sequnce = "122"
-
-    response = requests.get(base_url + sequnce)
-    if 'vaaBytes' not in response.json():
-        raise ValueError(f"Get sui-testnet signed vaa failed: {response.text}")
-
-    vaa_bytes = response.json()['vaaBytes']
-    vaa = base64.b64decode(vaa_bytes).hex()
+def get_signed_vaa(sequence: int, emitter_chain: int = 21, emitter_address: str = sui_token_bridge_emitter):
+    vaa = asyncio.run(fetch_signed_vaa(emitter_chain, emitter_address, sequence))
 
-    print(f"0x{vaa}")
+    print(f"0x{vaa.hex()}")
+    return vaa
 
 
 if __name__ == '__main__':
-    get_signed_vaa()
\ No newline at end of file
+    get_signed_vaa(int(sys.argv[1]))
\ No newline at end of file
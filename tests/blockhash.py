@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solana.rpc.types import TxOpts
+from solana.transaction import Transaction
+from solders.hash import Hash
+from solders.keypair import Keypair
+
+# average slot time, used to estimate the block height between refreshes
+SLOT_SECONDS = 0.4
+
+
+class BlockhashProvider:
+    # keeps a recent blockhash fresh in the background, so sends skip the
+    # get_latest_blockhash round trip solana-py would otherwise make every time
+
+    def __init__(
+            self,
+            client: AsyncClient,
+            refresh_interval: float = 5.0,
+            commitment: Commitment = Confirmed,
+            resign_margin: int = 30
+    ):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.commitment = commitment
+        # re-sign when fewer than this many blocks are left before last_valid_block_height
+        self.resign_margin = resign_margin
+        self.blockhash: Optional[Hash] = None
+        self.last_valid_block_height: Optional[int] = None
+        self.block_height: Optional[int] = None
+        self.refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.resigned = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def refresh(self):
+        async with self._lock:
+            blockhash_resp, block_height_resp = await asyncio.gather(
+                self.client.get_latest_blockhash(self.commitment),
+                self.client.get_block_height(self.commitment)
+            )
+            self.blockhash = blockhash_resp.value.blockhash
+            self.last_valid_block_height = blockhash_resp.value.last_valid_block_height
+            self.block_height = block_height_resp.value
+            self.refreshed_at = time.monotonic()
+            self.refreshes += 1
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # keep serving the previous blockhash, senders re-sign if it gets close to expiry
+                print(f"blockhash refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def latest(self) -> Tuple[Hash, int]:
+        if self.blockhash is None:
+            await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+
+    def estimated_block_height(self) -> Optional[int]:
+        if self.block_height is None:
+            return None
+        return self.block_height + int((time.monotonic() - self.refreshed_at) / SLOT_SECONDS)
+
+    def is_expiring(self, last_valid_block_height: int) -> bool:
+        block_height = self.estimated_block_height()
+        if block_height is None:
+            return True
+        return last_valid_block_height - block_height <= self.resign_margin
+
+    async def usable(self) -> Tuple[Hash, int]:
+        # latest() unless that blockhash is already too close to expiry
+        blockhash, last_valid_block_height = await self.latest()
+        if self.is_expiring(last_valid_block_height):
+            await self.refresh()
+            blockhash, last_valid_block_height = self.blockhash, self.last_valid_block_height
+        return blockhash, last_valid_block_height
+
+    async def sign(self, tx: Transaction, *signers: Keypair) -> int:
+        # returns the last block height the signed transaction can land in
+        blockhash, last_valid_block_height = await self.usable()
+        tx.recent_blockhash = blockhash
+        tx.sign(*signers)
+        return last_valid_block_height
+
+    async def send(
+            self,
+            tx: Transaction,
+            *signers: Keypair,
+            last_valid_block_height: Optional[int] = None,
+            opts: Optional[TxOpts] = None,
+            skip_preflight: bool = False
+    ):
+        # signs unsigned transactions, re-signs ones close to expiry and sends the rest as they are.
+        # returns (send response, last_valid_block_height) so retries can pass the height back in
+        if last_valid_block_height is None or self.is_expiring(last_valid_block_height):
+            if last_valid_block_height is not None:
+                self.resigned += 1
+            last_valid_block_height = await self.sign(tx, *signers)
+
+        if opts is None:
+            opts = TxOpts(
+                skip_preflight=skip_preflight,
+                preflight_commitment=self.commitment,
+                last_valid_block_height=last_valid_block_height
+            )
+        resp = await self.client.send_raw_transaction(tx.serialize(), opts=opts)
+        return resp, last_valid_block_height
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed, Finalized, Processed
+from solana.rpc.websocket_api import connect
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcSignatureSubscribeConfig
+from solders.rpc.requests import SignatureSubscribe
+from solders.rpc.responses import SignatureNotification, SubscriptionResult
+from solders.signature import Signature
+from solders.transaction_status import InstructionErrorCustom, TransactionErrorInstructionError
+
+from hellotoken.errors import from_code
+from hellotoken.program_id import PROGRAM_ID
+
+# getSignatureStatuses accepts at most 256 signatures per request
+MAX_SIGNATURES_PER_REQUEST = 256
+
+_COMMITMENT_RANK = {Processed: 0, Confirmed: 1, Finalized: 2}
+
+_COMMITMENT_LEVEL = {
+    Processed: CommitmentLevel.Processed,
+    Confirmed: CommitmentLevel.Confirmed,
+    Finalized: CommitmentLevel.Finalized,
+}
+
+
+def program_error(err, program_ids: Sequence[Pubkey]):
+    # signature statuses carry no logs, so the program that raised a custom error is
+    # looked up by instruction index; None when it was not the HelloToken program
+    if not isinstance(err, TransactionErrorInstructionError) or not isinstance(err.err, InstructionErrorCustom):
+        return None
+    if err.index >= len(program_ids) or program_ids[err.index] != PROGRAM_ID:
+        return None
+    return from_code(err.err.code)
+
+
+class TransactionFailed(Exception):
+    def __init__(self, signature: Signature, error, program_error=None):
+        super().__init__(f"{signature} failed: {program_error if program_error is not None else error}")
+        self.signature = signature
+        self.error = error
+        # hellotoken.errors decoded error, None when the failure came from another program
+        self.program_error = program_error
+
+
+class TransactionExpired(Exception):
+    def __init__(self, signature: Signature):
+        super().__init__(f"{signature} expired before it was confirmed")
+        self.signature = signature
+
+
+class _Pending:
+    __slots__ = ("future", "program_ids", "last_valid_block_height", "deadline")
+
+    def __init__(self, future, program_ids, last_valid_block_height, deadline):
+        self.future = future
+        self.program_ids = program_ids
+        self.last_valid_block_height = last_valid_block_height
+        self.deadline = deadline
+
+
+class ConfirmationTracker:
+    # resolves futures for sent transactions. Outstanding signatures are polled together
+    # with getSignatureStatuses, or watched over one websocket when ws_endpoint is set.
+
+    def __init__(
+            self,
+            client: AsyncClient,
+            commitment: Commitment = Confirmed,
+            poll_interval: float = 0.5,
+            timeout: float = 90.0,
+            ws_endpoint: Optional[str] = None,
+            backup_poll_interval: float = 10.0,
+            block_height: Optional[Callable[[], Optional[int]]] = None
+    ):
+        self.client = client
+        self.commitment = commitment
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.ws_endpoint = ws_endpoint
+        self.backup_poll_interval = backup_poll_interval
+        # current block height estimate, e.g. BlockhashProvider.estimated_block_height
+        self.block_height = block_height
+        self.polls = 0
+        self._pending: Dict[Signature, _Pending] = {}
+        self._subscriptions: Dict[int, Signature] = {}
+        self._requests: Dict[int, Signature] = {}
+        self._next_request_id = 0
+        self._websocket = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def track(
+            self,
+            signature: Signature,
+            program_ids: Sequence[Pubkey] = (),
+            last_valid_block_height: Optional[int] = None
+    ) -> asyncio.Future:
+        # program_ids are the instruction program ids in order, used to decode custom errors
+        pending = self._pending.get(signature)
+        if pending is not None:
+            return pending.future
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[signature] = _Pending(
+            future,
+            list(program_ids),
+            last_valid_block_height,
+            time.monotonic() + self.timeout
+        )
+        if self._websocket is not None:
+            asyncio.ensure_future(self._subscribe(signature))
+        self._wakeup.set()
+        return future
+
+    def _resolve(self, signature: Signature, err):
+        pending = self._pending.pop(signature, None)
+        if pending is None or pending.future.done():
+            return
+        if err is None:
+            pending.future.set_result(signature)
+        else:
+            pending.future.set_exception(
+                TransactionFailed(signature, err, program_error(err, pending.program_ids))
+            )
+
+    def _expire(self):
+        now = time.monotonic()
+        block_height = self.block_height() if self.block_height is not None else None
+        for signature, pending in list(self._pending.items()):
+            expired = now > pending.deadline or (
+                block_height is not None
+                and pending.last_valid_block_height is not None
+                and block_height > pending.last_valid_block_height
+            )
+            if expired:
+                del self._pending[signature]
+                if not pending.future.done():
+                    pending.future.set_exception(TransactionExpired(signature))
+
+    async def poll(self):
+        self.polls += 1
+        signatures = list(self._pending)
+        required = _COMMITMENT_RANK[self.commitment]
+        for start in range(0, len(signatures), MAX_SIGNATURES_PER_REQUEST):
+            chunk = signatures[start:start + MAX_SIGNATURES_PER_REQUEST]
+            resp = await self.client.get_signature_statuses(chunk)
+            for signature, status in zip(chunk, resp.value):
+                if status is None:
+                    continue
+                if status.err is not None:
+                    self._resolve(signature, status.err)
+                elif status.confirmation_status is not None and int(status.confirmation_status) >= required:
+                    self._resolve(signature, None)
+        self._expire()
+
+    async def _subscribe(self, signature: Signature):
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        self._requests[request_id] = signature
+        config = RpcSignatureSubscribeConfig(commitment=_COMMITMENT_LEVEL[self.commitment])
+        await self._websocket.send_data(SignatureSubscribe(signature, config, request_id))
+
+    async def _listen(self):
+        async with connect(self.ws_endpoint) as websocket:
+            self._websocket = websocket
+            try:
+                for signature in list(self._pending):
+                    await self._subscribe(signature)
+                async for messages in websocket:
+                    for message in messages:
+                        if isinstance(message, SubscriptionResult):
+                            signature = self._requests.pop(message.id, None)
+                            if signature is not None:
+                                self._subscriptions[message.result] = signature
+                        elif isinstance(message, SignatureNotification):
+                            # signature subscriptions fire once and are then removed by the node
+                            signature = self._subscriptions.pop(message.subscription, None)
+                            if signature is not None:
+                                self._resolve(signature, message.result.value.err)
+            finally:
+                self._websocket = None
+                self._requests.clear()
+                self._subscriptions.clear()
+
+    async def run(self):
+        listener = asyncio.ensure_future(self._listen()) if self.ws_endpoint is not None else None
+        last_poll = 0.0
+        try:
+            while True:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                await asyncio.sleep(self.poll_interval)
+                # while the websocket is up, polling only backs it up for missed notifications
+                if listener is not None and not listener.done() \
+                        and time.monotonic() - last_poll < self.backup_poll_interval:
+                    self._expire()
+                    continue
+                last_poll = time.monotonic()
+                try:
+                    await self.poll()
+                except Exception as e:
+                    print(f"signature status poll failed: {e}")
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for signature, pending in self._pending.items():
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
@@ -1,41 +1,68 @@
-import requests
-import base64
-from help import ParsedVaa
+import asyncio
+import os
+from typing import Optional, Union
+from help import LazyParsedVaa
+from payloads import AttestMeta, decode_payload
+from vaa_cache import VaaCache
+from vaa_fetch import VaaFetcher
 
-def get_sui_signed_vaa(sequence: str):
-    base_url = "https://wormhole-v2-testnet-api.certus.one/v1/signed_vaa/21/40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9/"
+sui_token_bridge_emitter = "40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9"
+solana_token_bridge_emitter = "3b26409f8aaded3f5ddca184695aa6a0fa829b0c85caf84856324896d214ca98"
 
-    response = requests.get(base_url + sequence)
-    if 'vaaBytes' not in response.json():
-        raise ValueError(f"Get sui-testnet signed vaa failed: {response.text}")
+vaa_cache = VaaCache(os.environ["VAA_CACHE_PATH"]) if os.environ.get("VAA_CACHE_PATH") else None
 
-    vaa_bytes = response.json()['vaaBytes']
-    vaa = base64.b64decode(vaa_bytes).hex()
 
-    return vaa
+def useVaaCache(path: str, **kwargs) -> VaaCache:
+    global vaa_cache
+    vaa_cache = VaaCache(path, **kwargs)
+    return vaa_cache
 
-def get_solana_signed_vaa(sequence: str):
-    base_url = "https://wormhole-v2-testnet-api.certus.one/v1/signed_vaa/1/3b26409f8aaded3f5ddca184695aa6a0fa829b0c85caf84856324896d214ca98/"
 
-    response = requests.get(base_url + sequence)
-    if 'vaaBytes' not in response.json():
-        raise ValueError(f"Get sui-testnet signed vaa failed: {response.text}")
+async def fetch_signed_vaa(
+        emitter_chain: int,
+        emitter_address: Union[bytes, str],
+        sequence: Union[int, str],
+        fetcher: Optional[VaaFetcher] = None
+) -> bytes:
+    # async callers should pass a long lived fetcher so they share its connection pool
+    if fetcher is not None:
+        return await fetcher.fetch(emitter_chain, emitter_address, int(sequence))
+    async with VaaFetcher(retries=2, cache=vaa_cache) as fetcher:
+        return await fetcher.fetch(emitter_chain, emitter_address, int(sequence))
 
-    vaa_bytes = response.json()['vaaBytes']
-    vaa = base64.b64decode(vaa_bytes).hex()
 
-    return vaa
+def _get_signed_vaa(emitter_chain: int, emitter_address: str, sequence: Union[int, str]) -> bytes:
+    # blocking entry point for scripts, raises vaa_fetch.VaaNotFound (a ValueError) when not signed
+    return asyncio.run(fetch_signed_vaa(emitter_chain, emitter_address, sequence))
 
-def parse_coin_meta(vaa: str):
-    v = ParsedVaa.parse_vaa(vaa)
-    print(f"tokenAddress={v.payload[1:33].hex()}")
-    print(f"tokenChain={int.from_bytes(v.payload[33:35], byteorder='big')}")
-    print(f"decimals={int(v.payload[35])}")
-    print(f"symbol={v.payload[36:68].decode('utf-8')}")
-    print(f"name={v.payload[68:100].decode('utf-8')}")
+def get_sui_signed_vaa(sequence: Union[int, str]) -> bytes:
+    return _get_signed_vaa(21, sui_token_bridge_emitter, sequence)
+
+def get_solana_signed_vaa(sequence: Union[int, str]) -> bytes:
+    return _get_signed_vaa(1, solana_token_bridge_emitter, sequence)
+
+async def get_signed_vaas(fetcher: VaaFetcher, emitter_chain: int, emitter_address: str, sequences):
+    # concurrent fetch over the fetcher's pool, raw bytes in sequence order
+    return await fetcher.fetch_many((emitter_chain, emitter_address, sequence) for sequence in sequences)
+
+def decode_coin_meta(vaa: Union[bytes, memoryview, str]) -> AttestMeta:
+    v = LazyParsedVaa.parse_vaa(vaa)
+    meta = decode_payload(v.payload)
+    if not isinstance(meta, AttestMeta):
+        raise ValueError("not token bridge attest meta VAA")
+    return meta
+
+def parse_coin_meta(vaa: Union[bytes, memoryview, str]):
+    meta = decode_coin_meta(vaa)
+    print(f"tokenAddress={meta.token_address.hex()}")
+    print(f"tokenChain={meta.token_chain}")
+    print(f"decimals={meta.decimals}")
+    print(f"symbol={meta.symbol}")
+    print(f"name={meta.name}")
+    return meta
 
 
 
 if __name__ == '__main__':
-    print(get_sui_signed_vaa("126"))
-    # print((get_solana_signed_vaa("25487")))
\ No newline at end of file
+    print(get_sui_signed_vaa(126).hex())
+    # print(get_solana_signed_vaa(25487).hex())
\ No newline at end of file
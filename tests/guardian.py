@@ -0,0 +1,274 @@
+import asyncio
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Union
+
+from eth_keys.datatypes import PrivateKey, Signature
+from eth_keys.exceptions import BadSignature
+from eth_utils import keccak
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment
+
+from help import LazyParsedVaa, deriveGuardianSetKey
+
+_U32 = struct.Struct("<I")
+
+
+def vaa_digest(body: Union[bytes, memoryview]) -> bytes:
+    # guardians sign keccak256(keccak256(body))
+    return keccak(keccak(bytes(body)))
+
+
+def quorum(num_guardians: int) -> int:
+    return num_guardians * 2 // 3 + 1
+
+
+class GuardianSet:
+    def __init__(
+            self,
+            index: int,
+            keys: List[bytes],
+            creation_time: int = 0,
+            expiration_time: int = 0
+    ):
+        self.index = index
+        self.keys = keys
+        self.creation_time = creation_time
+        self.expiration_time = expiration_time
+
+    @property
+    def quorum(self) -> int:
+        return quorum(len(self.keys))
+
+    def is_expired(self, now: Optional[int] = None) -> bool:
+        if self.expiration_time == 0:
+            return False
+        if now is None:
+            now = int(time.time())
+        return self.expiration_time < now
+
+    def format_json(self):
+        return {
+            "index": self.index,
+            "keys": ["0x" + key.hex() for key in self.keys],
+            "creationTime": self.creation_time,
+            "expirationTime": self.expiration_time,
+        }
+
+    @classmethod
+    def decode(cls, data: bytes) -> "GuardianSet":
+        # wormhole GuardianSetData: index u32, keys Vec<[u8; 20]>, creation_time u32, expiration_time u32
+        index = _U32.unpack_from(data, 0)[0]
+        num_keys = _U32.unpack_from(data, 4)[0]
+        offset = 8
+        guardian_keys = []
+        for _ in range(num_keys):
+            guardian_keys.append(bytes(data[offset:offset + 20]))
+            offset += 20
+        creation_time = _U32.unpack_from(data, offset)[0]
+        expiration_time = _U32.unpack_from(data, offset + 4)[0]
+        return cls(index, guardian_keys, creation_time, expiration_time)
+
+    @classmethod
+    def from_private_keys(cls, index: int, private_keys: Sequence[Union[bytes, str]]) -> "GuardianSet":
+        # local stand-in for a real guardian set, e.g. the tilt devnet guardian
+        guardian_keys = []
+        for private_key in private_keys:
+            if isinstance(private_key, str):
+                private_key = bytes.fromhex(private_key.replace("0x", ""))
+            guardian_keys.append(PrivateKey(private_key).public_key.to_canonical_address())
+        return cls(index, guardian_keys)
+
+
+class GuardianSetCache:
+    # guardian sets by index. A set only gets its expiration_time on-chain when it is
+    # rotated out, in the same instruction that adds the next set, so a cached set
+    # without one is fetched again once after a newer index shows up.
+
+    def __init__(self, wormhole_program_id: Optional[str] = None):
+        self.wormhole_program_id = wormhole_program_id
+        self._sets: Dict[int, GuardianSet] = {}
+        self._latest = -1
+        # superseded sets fetched again since the newer index was seen
+        self._refetched: Set[int] = set()
+
+    def put(self, guardian_set: GuardianSet):
+        self._sets[guardian_set.index] = guardian_set
+        self._latest = max(self._latest, guardian_set.index)
+
+    def _is_current(self, guardian_set: GuardianSet) -> bool:
+        return (
+            guardian_set.expiration_time != 0
+            or guardian_set.index >= self._latest
+            or guardian_set.index in self._refetched
+        )
+
+    def get(self, index: int) -> Optional[GuardianSet]:
+        return self._sets.get(index)
+
+    def load(self, data: bytes) -> GuardianSet:
+        guardian_set = GuardianSet.decode(data)
+        self.put(guardian_set)
+        return guardian_set
+
+    async def fetch(
+            self,
+            conn: AsyncClient,
+            index: int,
+            commitment: Optional[Commitment] = None
+    ) -> Optional[GuardianSet]:
+        guardian_set = self._sets.get(index)
+        if guardian_set is not None and (self._is_current(guardian_set) or self.wormhole_program_id is None):
+            return guardian_set
+
+        assert self.wormhole_program_id is not None, "wormhole program id is required to fetch guardian sets"
+        resp = await conn.get_account_info(
+            deriveGuardianSetKey(self.wormhole_program_id, index),
+            commitment=commitment
+        )
+        if index < self._latest:
+            self._refetched.add(index)
+        if resp.value is None:
+            return guardian_set
+        return self.load(resp.value.data)
+
+    async def verify(
+            self,
+            conn: AsyncClient,
+            vaa: Union[bytes, memoryview, str, LazyParsedVaa],
+            commitment: Optional[Commitment] = None
+    ) -> "VerificationResult":
+        # checks the VAA against the guardian set it names, fetching that set if needed
+        if not isinstance(vaa, LazyParsedVaa):
+            vaa = LazyParsedVaa.parse_vaa(vaa)
+        guardian_set = await self.fetch(conn, vaa.guardian_set_index, commitment)
+        if guardian_set is None:
+            return VerificationResult(
+                False, vaa.guardian_set_index, len(vaa.guardian_signatures), 0, 0, "unknown guardian set"
+            )
+        # signature recovery is CPU bound, keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, verify_vaa, vaa, guardian_set, int(time.time())
+        )
+
+    def snapshot(self) -> Dict[int, GuardianSet]:
+        return dict(self._sets)
+
+    def __contains__(self, index: int):
+        return index in self._sets
+
+
+class VerificationResult:
+    def __init__(
+            self,
+            valid: bool,
+            guardian_set_index: int,
+            num_signatures: int,
+            num_valid: int,
+            quorum: int,
+            error: Optional[str] = None
+    ):
+        self.valid = valid
+        self.guardian_set_index = guardian_set_index
+        self.num_signatures = num_signatures
+        self.num_valid = num_valid
+        self.quorum = quorum
+        self.error = error
+
+    def __bool__(self):
+        return self.valid
+
+    def __repr__(self):
+        return (
+            f"VerificationResult(valid={self.valid}, guardian_set_index={self.guardian_set_index}, "
+            f"signatures={self.num_valid}/{self.num_signatures}, quorum={self.quorum}, error={self.error})"
+        )
+
+
+class VaaVerificationFailed(Exception):
+    def __init__(self, result: VerificationResult):
+        super().__init__(f"VAA failed verification: {result.error}")
+        self.result = result
+
+
+def verify_vaa(
+        vaa: Union[bytes, memoryview, str, LazyParsedVaa],
+        guardian_set: GuardianSet,
+        now: Optional[int] = None
+) -> VerificationResult:
+    if not isinstance(vaa, LazyParsedVaa):
+        vaa = LazyParsedVaa.parse_vaa(vaa)
+
+    signatures = vaa.guardian_signatures
+    required = guardian_set.quorum
+
+    def failed(error: str, num_valid: int = 0):
+        return VerificationResult(False, vaa.guardian_set_index, len(signatures), num_valid, required, error)
+
+    if vaa.guardian_set_index != guardian_set.index:
+        return failed(f"guardian set index mismatch: {vaa.guardian_set_index} != {guardian_set.index}")
+    if now is not None and guardian_set.is_expired(now):
+        return failed("guardian set expired")
+    if len(signatures) < required:
+        return failed("no quorum")
+
+    digest = vaa_digest(vaa.body)
+
+    num_valid = 0
+    last_index = -1
+    for guardian_signature in signatures:
+        index = guardian_signature["index"]
+        if index <= last_index:
+            return failed("guardian signatures not in ascending index order", num_valid)
+        if index >= len(guardian_set.keys):
+            return failed(f"guardian index {index} out of range", num_valid)
+        last_index = index
+
+        try:
+            signer = Signature(signature_bytes=guardian_signature["signature"]) \
+                .recover_public_key_from_msg_hash(digest) \
+                .to_canonical_address()
+        except (BadSignature, ValueError):
+            return failed(f"invalid signature for guardian {index}", num_valid)
+
+        if signer != guardian_set.keys[index]:
+            return failed(f"signature for guardian {index} does not match", num_valid)
+        num_valid += 1
+
+    return VerificationResult(True, vaa.guardian_set_index, len(signatures), num_valid, required)
+
+
+def _verifyChunk(guardian_sets: Dict[int, GuardianSet], chunk: List[bytes], now: Optional[int]) -> List[VerificationResult]:
+    results = []
+    for raw in chunk:
+        vaa = LazyParsedVaa.parse_vaa(raw)
+        guardian_set = guardian_sets.get(vaa.guardian_set_index)
+        if guardian_set is None:
+            results.append(VerificationResult(
+                False, vaa.guardian_set_index, len(vaa.guardian_signatures), 0, 0, "unknown guardian set"
+            ))
+            continue
+        results.append(verify_vaa(vaa, guardian_set, now))
+    return results
+
+
+def verify_vaas(
+        vaas: Sequence[Union[bytes, str]],
+        cache: GuardianSetCache,
+        workers: Optional[int] = None,
+        chunk_size: int = 512,
+        now: Optional[int] = None
+) -> List[VerificationResult]:
+    workers = workers or os.cpu_count() or 1
+    vaas = [bytes.fromhex(vaa.replace("0x", "")) if isinstance(vaa, str) else bytes(vaa) for vaa in vaas]
+    chunks = [vaas[start:start + chunk_size] for start in range(0, len(vaas), chunk_size)]
+    guardian_sets = cache.snapshot()
+
+    if workers == 1 or len(chunks) <= 1:
+        return [result for chunk in chunks for result in _verifyChunk(guardian_sets, chunk, now)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(_verifyChunk, guardian_sets, chunk, now) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
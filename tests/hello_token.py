@@ -1,257 +1,758 @@
 import asyncio
+import functools
 import json
+import os
 
 from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Union
+from base58 import b58encode
 from solana.transaction import Transaction
 from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+from solana.rpc.core import RPCException
+from solana.rpc.types import MemcmpOpts, TxOpts
+from solders.instruction import Instruction
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.signature import Signature
 
 from hellotoken.instructions import (
     initialize,
     register_foreign_contract,
+    update_relayer_fee,
     redeem_wrapped_transfer_with_payload,
     redeem_native_transfer_with_payload,
     send_wrapped_tokens_with_payload,
     send_native_tokens_with_payload,
 )
+from hellotoken.accounts.foreign_contract import ForeignContract
+from hellotoken.errors import from_tx_error
+from hellotoken.errors.anchor import ConstraintSeeds
 from hellotoken.program_id import PROGRAM_ID
 from help import (
-    deriveSenderConfigKey,
-    deriveRedeemerConfigKey,
-    deriveForeignContractKey,
-    getTokenBridgeDerivedAccounts,
-    deriveForeignEndPointKey,
     getRedeemWrappedTransferAccounts,
     getSendWrappedTransferAccounts,
-    deriveTokenTransferMessageKey,
-    ParsedVaa, getSendNativeTransferAccounts, getRedeemNativeTransferAccounts
+    LazyParsedVaa, getSendNativeTransferAccounts, getRedeemNativeTransferAccounts,
+    getDeployment,
+    Deployment,
+    ForeignContractTable,
+    ForeignEndpoint
 )
+from blockhash import SLOT_SECONDS, BlockhashProvider
+from guardian import GuardianSetCache, VaaVerificationFailed
+from confirmations import ConfirmationTracker, TransactionExpired, TransactionFailed
+from replay_filter import ClaimFilter
+from lookup_table import LookupTableManager, compile_v0, static_accounts
+from packer import TransactionPacker
+from scheduler import WriteLockScheduler
+from sequence import MessageKeyWindow, SequenceAllocator
 
 # solana-devnet
 rpc_url = "https://api.devnet.solana.com"
 wormhole_program_id = "3u8hJUVTA4jH1wYAyUur7FFZVQ8H635K3tSHHF4ssjQ5"
 token_bridge_program_id = "DZnkkTmCiFWfYTfT41X3Rd1kDgozqzxWaHqsw6W4x2oe"
 
-async def get_payer():
-    default_path = Path.home().joinpath(".config/solana/id.json")
-    with open(default_path, "r") as file:
-        raw_key = json.load(file)
+# sui-testnet
+chain_id_sui = 21
+token_bridge_emitter_sui = bytes.fromhex("40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9")
+hello_emitter_sui = bytes.fromhex("35fbfedfe4ba06b311b86ae1d2064e08e583e6d550524307fc626648c4718c0c")
+
+# discriminator, chain u16, address [u8; 32], token_bridge_foreign_endpoint
+FOREIGN_CONTRACT_ACCOUNT_SIZE = 8 + 2 + 32 + 32
+
+deployment = getDeployment(token_bridge_program_id, wormhole_program_id, PROGRAM_ID)
+
+# registered foreign token bridge emitters, refreshed once a registration is confirmed;
+# filled from the on-chain ForeignContract accounts when a client opens
+foreign_contracts = ForeignContractTable(deployment)
+
+# guardian sets redeemed VAAs are verified against, fetched from the wormhole program
+guardian_sets = GuardianSetCache(wormhole_program_id)
+
+# redeemed (emitter_address, emitter_chain, sequence) claims, persisted when CLAIM_FILTER_PATH is set
+claimed_transfers = ClaimFilter(os.environ.get("CLAIM_FILTER_PATH"))
+
+default_keypair_path = Path.home().joinpath(".config/solana/id.json")
+
+# wrapped sol mint
+wrapped_sol_mint = Pubkey.from_string("So11111111111111111111111111111111111111112")
 
-    payer = Keypair.from_bytes(bytes(raw_key))
 
-    print(f"payer={payer.pubkey()}")
+@functools.lru_cache()
+def load_payer(path: Path = default_keypair_path) -> Keypair:
+    with open(path, "r") as file:
+        raw_key = json.load(file)
 
-    return payer
+    return Keypair.from_bytes(bytes(raw_key))
+
+
+def _forward(source: asyncio.Future, target: asyncio.Future):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _is_stale_sequence(error: BaseException) -> bool:
+    # the wormhole_message PDA no longer matches token_bridge_sequence
+    return isinstance(error, TransactionFailed) and isinstance(error.program_error, ConstraintSeeds)
+
+
+class HelloTokenClient:
+    # one rpc session, payer and set of derived accounts shared by every HelloToken flow
+    def __init__(
+            self,
+            endpoint: str = rpc_url,
+            payer: Optional[Keypair] = None,
+            deployment: Deployment = deployment,
+            foreign_table: ForeignContractTable = foreign_contracts,
+            claims: ClaimFilter = claimed_transfers,
+            guardian_sets: Optional[GuardianSetCache] = guardian_sets,
+            blockhash_refresh_interval: float = 5.0,
+            ws_endpoint: Optional[str] = None,
+            use_lookup_table: bool = False,
+            lookup_table_path: Optional[str] = os.environ.get("LOOKUP_TABLE_PATH"),
+            max_writes_per_slot: Optional[int] = None,
+            max_resends: int = 2
+    ):
+        self.endpoint = endpoint
+        self.payer = payer if payer is not None else load_payer()
+        self.deployment = deployment
+        self.foreign_table = foreign_table
+        self.claims = claims
+        # None skips verification and leaves it to the core bridge
+        self.guardian_sets = guardian_sets
+        self.blockhash_refresh_interval = blockhash_refresh_interval
+        self.ws_endpoint = ws_endpoint
+        self.use_lookup_table = use_lookup_table
+        self.lookup_table_path = lookup_table_path
+        self.max_writes_per_slot = max_writes_per_slot
+        # times a send whose blockhash expired before it landed is re-signed and sent again
+        self.max_resends = max_resends
+        self.client: Optional[AsyncClient] = None
+        self.blockhashes: Optional[BlockhashProvider] = None
+        self.confirmations: Optional[ConfirmationTracker] = None
+        self.sequences: Optional[SequenceAllocator] = None
+        self.message_keys = MessageKeyWindow(PROGRAM_ID)
+        self.lookup_tables: Optional[LookupTableManager] = None
+        self.scheduler: Optional[WriteLockScheduler] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.client is not None:
+            return
+        self.client = AsyncClient(self.endpoint)
+        try:
+            await self._open()
+        except BaseException:
+            # a half opened client would keep its background tasks running, and the next
+            # open() would see self.client and return without finishing
+            await self.close()
+            raise
+
+    async def _open(self):
+        await self.client.is_connected()
+        print(f"payer={self.payer.pubkey()}")
+
+        self.blockhashes = BlockhashProvider(self.client, self.blockhash_refresh_interval)
+        await self.blockhashes.refresh()
+        self.blockhashes.start()
+
+        self.confirmations = ConfirmationTracker(
+            self.client,
+            ws_endpoint=self.ws_endpoint,
+            block_height=self.blockhashes.estimated_block_height
+        )
+        self.confirmations.start()
+
+        self.sequences = SequenceAllocator(self.client, self.deployment.token_bridge_sequence)
+        self.message_keys.advance(await self.sequences.sync() + 1)
+        self.message_keys.start()
+
+        await self.load_foreign_contracts()
+
+        if self.use_lookup_table:
+            self.lookup_tables = LookupTableManager(self.client, self.payer, self.lookup_table_path)
+            await self.lookup_tables.ensure(static_accounts(self.deployment))
+
+        if self.max_writes_per_slot is not None:
+            self.scheduler = WriteLockScheduler(
+                self._send_now,
+                ignore=[self.payer.pubkey()],
+                max_writes_per_slot=self.max_writes_per_slot
+            )
+            self.scheduler.start()
+
+    async def close(self):
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+            self.scheduler = None
+        if self.confirmations is not None:
+            await self.confirmations.stop()
+            self.confirmations = None
+        self.sequences = None
+        self.lookup_tables = None
+        await self.message_keys.stop()
+        # the filter outlives the client, just make sure its claims reached disk
+        await asyncio.get_running_loop().run_in_executor(None, self.claims.flush)
+        if self.blockhashes is not None:
+            await self.blockhashes.stop()
+            self.blockhashes = None
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def send(
+            self,
+            tx: Transaction,
+            skip_preflight: bool = False,
+            resends: Optional[int] = None
+    ) -> asyncio.Future:
+        # returns a future resolving to the signature once confirmed, or failing with
+        # confirmations.TransactionFailed / TransactionExpired
+        if resends is None:
+            resends = self.max_resends
+        if self.scheduler is not None:
+            # waits until the write locks it takes have room in a slot
+            return await self.scheduler.submit(tx, skip_preflight, resends)
+        return await self._send_now(tx, skip_preflight, resends)
+
+    async def _send_now(self, tx: Transaction, skip_preflight: bool = False, resends: int = 0) -> asyncio.Future:
+        if self.lookup_tables is not None:
+            tx_sig, last_valid_block_height = await self.send_v0(tx.instructions, skip_preflight)
+        else:
+            # always signs with the current blockhash, so a resend gets a fresh one
+            tx_sig, last_valid_block_height = await self.blockhashes.send(tx, self.payer, skip_preflight=skip_preflight)
+        print(tx_sig)
+
+        signature = tx_sig.value
+        program_ids = [ix.program_id for ix in tx.instructions]
+        confirmed = self.confirmations.track(signature, program_ids, last_valid_block_height)
+        if resends <= 0:
+            return confirmed
+
+        result = asyncio.get_running_loop().create_future()
+
+        def done(future: asyncio.Future):
+            if result.done():
+                return
+            if future.cancelled():
+                result.cancel()
+            elif isinstance(future.exception(), TransactionExpired):
+                resend = asyncio.ensure_future(
+                    self._resend(tx, skip_preflight, resends, signature, program_ids, last_valid_block_height)
+                )
+                resend.add_done_callback(lambda task: _forward(task, result))
+            elif future.exception() is not None:
+                result.set_exception(future.exception())
+            else:
+                result.set_result(future.result())
+
+        confirmed.add_done_callback(done)
+        return result
+
+    async def _resend(
+            self,
+            tx: Transaction,
+            skip_preflight: bool,
+            resends: int,
+            signature: Signature,
+            program_ids: List[Pubkey],
+            last_valid_block_height: int
+    ):
+        # the tracker only estimates the block height, so wait until the node agrees the
+        # blockhash expired. Re-signing earlier could let both copies execute
+        while True:
+            block_height = (await self.client.get_block_height(Confirmed)).value
+            if block_height > last_valid_block_height:
+                break
+            await asyncio.sleep((last_valid_block_height - block_height + 1) * SLOT_SECONDS)
+
+        statuses = await self.client.get_signature_statuses([signature], search_transaction_history=True)
+        if statuses.value[0] is not None:
+            # it landed after all, wait for the tracker's commitment
+            return await self.confirmations.track(signature, program_ids)
+
+        self.blockhashes.resigned += 1
+        return await (await self.send(tx, skip_preflight, resends - 1))
+
+    async def send_v0(self, instructions: Sequence[Instruction], skip_preflight: bool = False):
+        # versioned transaction resolving the static accounts through the lookup table
+        blockhash, last_valid_block_height = await self.blockhashes.usable()
+        tx = compile_v0(self.payer, instructions, [self.lookup_tables.account], blockhash)
+        resp = await self.client.send_raw_transaction(
+            bytes(tx),
+            opts=TxOpts(
+                skip_preflight=skip_preflight,
+                preflight_commitment=self.blockhashes.commitment,
+                last_valid_block_height=last_valid_block_height
+            )
+        )
+        return resp, last_valid_block_height
+
+    async def verify_vaa(self, parsed_vaa: LazyParsedVaa):
+        # raises VaaVerificationFailed before a redeem is built for a VAA the core
+        # bridge would reject anyway
+        if self.guardian_sets is None:
+            return
+        result = await self.guardian_sets.verify(self.client, parsed_vaa)
+        if not result:
+            raise VaaVerificationFailed(result)
+
+    async def send_redeem(self, tx: Transaction, parsed_vaa: LazyParsedVaa) -> Optional[asyncio.Future]:
+        # the claim stays in flight until the redeem is confirmed or fails
+        if not self.claims.acquire(parsed_vaa):
+            print(f"skip claimed transfer: emitter_chain={parsed_vaa.emitter_chain} sequence={parsed_vaa.sequence}")
+            return None
+
+        try:
+            confirmed = await self.send(tx)
+        except RPCException as e:
+            self.claims.release_with_error(parsed_vaa, from_tx_error(e))
+            raise
+        except BaseException:
+            self.claims.release(parsed_vaa)
+            raise
+
+        def release(future: asyncio.Future):
+            if future.cancelled():
+                self.claims.release(parsed_vaa)
+            elif isinstance(future.exception(), TransactionFailed):
+                self.claims.release_with_error(parsed_vaa, future.exception().program_error)
+            else:
+                self.claims.release(parsed_vaa, future.exception() is None)
+
+        confirmed.add_done_callback(release)
+        return confirmed
+
+    async def send_sequenced(self, build: Callable[[Pubkey], Transaction], attempts: int = 3) -> asyncio.Future:
+        # build(wormhole_message) returns the transaction posting that message account.
+        # Sends ahead of the on-chain sequence skip preflight, which would reject them
+        # until the earlier reservations land. A send whose reservation went stale
+        # because an earlier one failed is rebuilt on a fresh sequence, up to `attempts`
+        # times; the returned future follows the last attempt
+        sequences = self.sequences
+        result = asyncio.get_running_loop().create_future()
+
+        async def attempt(remaining: int):
+            sequence, epoch = await sequences.reserve()
+            print(f"sequence={sequence}")
+            tx = build(self.message_keys.get(sequence))
+            try:
+                confirmed = await self.send(tx, skip_preflight=sequences.is_ahead(sequence))
+            except RPCException as e:
+                sequences.release(sequence, epoch, False)
+                if remaining > 1 and isinstance(from_tx_error(e), ConstraintSeeds):
+                    return await attempt(remaining - 1)
+                raise
+            except BaseException:
+                sequences.release(sequence, epoch, False)
+                raise
+
+            def done(future: asyncio.Future):
+                landed = not future.cancelled() and future.exception() is None
+                # sequences is captured, close() drops self.sequences before callbacks run
+                sequences.release(sequence, epoch, landed)
+                if result.done():
+                    return
+                if future.cancelled():
+                    result.cancel()
+                elif landed:
+                    result.set_result(future.result())
+                elif remaining > 1 and _is_stale_sequence(future.exception()):
+                    asyncio.ensure_future(retry(remaining - 1))
+                else:
+                    result.set_exception(future.exception())
+
+            confirmed.add_done_callback(done)
+
+        async def retry(remaining: int):
+            try:
+                await attempt(remaining)
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+
+        await attempt(attempts)
+        return result
+
+    async def initialize(self, relayer_fee: int = 10, relayer_fee_precision: int = 100000):
+        deployment = self.deployment
+        payer = self.payer
+
+        ix = initialize(
+            args={
+                "relayer_fee": relayer_fee,
+                "relayer_fee_precision": relayer_fee_precision
+            },
+            accounts={
+                "owner": payer.pubkey(),
+                "sender_config": deployment.sender_config,
+                "redeemer_config": deployment.redeemer_config,
+                "wormhole_program": deployment.wormhole_program,
+                "token_bridge_program": deployment.token_bridge_program,
+                "token_bridge_config": deployment.token_bridge_config,
+                "token_bridge_authority_signer": deployment.token_bridge_authority_signer,
+                "token_bridge_custody_signer": deployment.token_bridge_custody_signer,
+                "token_bridge_mint_authority": deployment.token_bridge_mint_authority,
+                "wormhole_bridge": deployment.wormhole_bridge,
+                "token_bridge_emitter": deployment.token_bridge_emitter,
+                "wormhole_fee_collector": deployment.wormhole_fee_collector,
+                "token_bridge_sequence": deployment.token_bridge_sequence,
+            },
+        )
+
+        return await self.send(Transaction(fee_payer=payer.pubkey()).add(ix))
+
+    async def send_packed(self, packer: TransactionPacker) -> List[asyncio.Future]:
+        # one transaction per packed batch. Batches depending on earlier ones are only
+        # sent once the previous batch is confirmed
+        futures = []
+        for instructions in packer.pack():
+            if futures and packer.has_dependencies:
+                await futures[-1]
+            futures.append(await self.send(Transaction(fee_payer=self.payer.pubkey()).add(*instructions)))
+        return futures
+
+    def packer(self) -> TransactionPacker:
+        return TransactionPacker(self.payer.pubkey())
+
+    def update_relayer_fee_ix(self, relayer_fee: int, relayer_fee_precision: int = 100000) -> Instruction:
+        return update_relayer_fee(
+            args={
+                "relayer_fee": relayer_fee,
+                "relayer_fee_precision": relayer_fee_precision
+            },
+            accounts={
+                "owner": self.payer.pubkey(),
+                "config": self.deployment.redeemer_config
+            },
+        )
+
+    async def update_relayer_fee(self, relayer_fee: int, relayer_fee_precision: int = 100000):
+        ix = self.update_relayer_fee_ix(relayer_fee, relayer_fee_precision)
+        return await self.send(Transaction(fee_payer=self.payer.pubkey()).add(ix))
+
+    def register_foreign_contract_ix(
+            self,
+            chain: int = chain_id_sui,
+            token_bridge_emitter: bytes = token_bridge_emitter_sui,
+            contract_address: bytes = hello_emitter_sui
+    ) -> Instruction:
+        # foreign_table only learns about the registration once it is confirmed, see
+        # register_foreign_contract; callers sending this instruction themselves should
+        # call load_foreign_contracts afterwards
+        payer = self.payer
+
+        foreign_endpoint = self.foreign_table.endpoint(chain, token_bridge_emitter)
+        foreign_contract_key = foreign_endpoint.foreign_contract
+        foreign_endpoint_key = foreign_endpoint.token_bridge_foreign_endpoint
+
+        print(foreign_endpoint_key)
+
+        ix = register_foreign_contract(
+            args={
+                "chain": chain,
+                "address": list(contract_address)
+            },
+            accounts={
+                "owner": payer.pubkey(),
+                "config": self.deployment.sender_config,
+                "foreign_contract": foreign_contract_key,
+                "token_bridge_foreign_endpoint": foreign_endpoint_key,
+                "token_bridge_program": self.deployment.token_bridge_program
+            },
+        )
+        return ix
+
+    async def register_foreign_contract(
+            self,
+            chain: int = chain_id_sui,
+            token_bridge_emitter: bytes = token_bridge_emitter_sui,
+            contract_address: bytes = hello_emitter_sui
+    ):
+        ix = self.register_foreign_contract_ix(chain, token_bridge_emitter, contract_address)
+        confirmed = await self.send(Transaction(fee_payer=self.payer.pubkey()).add(ix))
+
+        def record(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is None:
+                self.foreign_table.refresh(chain, token_bridge_emitter)
+
+        confirmed.add_done_callback(record)
+        return confirmed
+
+    async def load_foreign_contracts(self) -> int:
+        # rebuilds foreign_table from the registered ForeignContract accounts and the
+        # token bridge endpoints they point at
+        resp = await self.client.get_program_accounts(
+            PROGRAM_ID,
+            encoding="base64",
+            filters=[
+                MemcmpOpts(offset=0, bytes=b58encode(ForeignContract.discriminator).decode()),
+                FOREIGN_CONTRACT_ACCOUNT_SIZE
+            ]
+        )
+        registered = [(keyed.pubkey, ForeignContract.decode(keyed.account.data)) for keyed in resp.value]
+        if not registered:
+            return 0
+
+        endpoints = await self.client.get_multiple_accounts(
+            [foreign_contract.token_bridge_foreign_endpoint for _key, foreign_contract in registered]
+        )
+        for (key, foreign_contract), endpoint in zip(registered, endpoints.value):
+            if endpoint is None:
+                print(f"foreign contract {key} points at a missing token bridge endpoint")
+                continue
+            # token bridge EndpointRegistration: chain u16, emitter address [u8; 32]
+            self.foreign_table.put(ForeignEndpoint(
+                foreign_contract.chain,
+                key,
+                foreign_contract.token_bridge_foreign_endpoint,
+                bytes(endpoint.data[2:34])
+            ))
+        return len(self.foreign_table)
+
+    async def redeem_wrapped_transfer_with_payload(self, vaa: Union[bytes, memoryview, str]):
+        parsed_vaa = LazyParsedVaa.parse_vaa(vaa)
+        if self.claims.is_duplicate(parsed_vaa):
+            print(f"skip claimed transfer: emitter_chain={parsed_vaa.emitter_chain} sequence={parsed_vaa.sequence}")
+            return None
+        await self.verify_vaa(parsed_vaa)
+
+        payer = self.payer
+
+        redeem_wrapped_accounts = getRedeemWrappedTransferAccounts(
+            # the program ids come from self.deployment
+            None,
+            None,
+            None,
+            payer.pubkey(),
+            parsed_vaa.raw,
+            deployment=self.deployment,
+            foreign_table=self.foreign_table
+        )
+
+        ix = redeem_wrapped_transfer_with_payload(
+            args={
+                "vaa_hash": parsed_vaa.hash
+            },
+            accounts={
+                "payer": payer.pubkey(),
+                "payer_token_account": redeem_wrapped_accounts["payer_token_key"],
+                "config": redeem_wrapped_accounts["redeemer_config_key"],
+                "foreign_contract": redeem_wrapped_accounts["foreign_contract_key"],
+                "token_bridge_wrapped_mint": redeem_wrapped_accounts["token_bridge_wrapped_mint"],
+                "recipient_token_account": redeem_wrapped_accounts["recipient_token_key"],
+                "recipient": redeem_wrapped_accounts["recipient"],
+                "tmp_token_account": redeem_wrapped_accounts["tmp_token_key"],
+                "wormhole_program": redeem_wrapped_accounts["wormhole_program"],
+                "token_bridge_program": redeem_wrapped_accounts["token_bridge_program"],
+                "token_bridge_wrapped_meta": redeem_wrapped_accounts["token_bridge_wrapped_meta"],
+                "token_bridge_config": redeem_wrapped_accounts["token_bridge_config"],
+                "vaa": redeem_wrapped_accounts["vaa"],
+                "token_bridge_claim": redeem_wrapped_accounts["token_bridge_claim"],
+                "token_bridge_foreign_endpoint": redeem_wrapped_accounts["token_bridge_foreign_endpoint"],
+                "token_bridge_mint_authority": redeem_wrapped_accounts["token_bridge_mint_authority"]
+            },
+        )
+
+        return await self.send_redeem(Transaction(fee_payer=payer.pubkey()).add(ix), parsed_vaa)
+
+    async def redeem_native_transfer_with_payload(
+            self,
+            vaa: Union[bytes, memoryview, str],
+            mint: Pubkey = wrapped_sol_mint
+    ):
+        parsed_vaa = LazyParsedVaa.parse_vaa(vaa)
+        if self.claims.is_duplicate(parsed_vaa):
+            print(f"skip claimed transfer: emitter_chain={parsed_vaa.emitter_chain} sequence={parsed_vaa.sequence}")
+            return None
+        await self.verify_vaa(parsed_vaa)
+
+        payer = self.payer
+
+        redeem_native_accounts = getRedeemNativeTransferAccounts(
+            # the program ids come from self.deployment
+            None,
+            None,
+            None,
+            payer.pubkey(),
+            parsed_vaa.raw,
+            mint,
+            deployment=self.deployment,
+            foreign_table=self.foreign_table
+        )
+
+        ix = redeem_native_transfer_with_payload(
+            args={
+                "vaa_hash": parsed_vaa.hash
+            },
+            accounts={
+                "payer": payer.pubkey(),
+                "payer_token_account": redeem_native_accounts["payer_token_account"],
+                "config": redeem_native_accounts["redeemer_config"],
+                "foreign_contract": redeem_native_accounts["foreign_contract"],
+                "mint": mint,
+                "recipient_token_account": redeem_native_accounts["recipient_token_account"],
+                "recipient": redeem_native_accounts["recipient"],
+                "tmp_token_account": redeem_native_accounts["tmp_token_account"],
+                "wormhole_program": redeem_native_accounts["wormhole_program"],
+                "token_bridge_program": redeem_native_accounts["token_bridge_program"],
+                "token_bridge_config": redeem_native_accounts["token_bridge_config"],
+                "vaa": redeem_native_accounts["vaa"],
+                "token_bridge_claim": redeem_native_accounts["token_bridge_claim"],
+                "token_bridge_foreign_endpoint": redeem_native_accounts["token_bridge_foreign_endpoint"],
+                "token_bridge_custody": redeem_native_accounts["token_bridge_custody"],
+                "token_bridge_custody_signer": redeem_native_accounts["token_bridge_custody_signer"]
+            }
+        )
+
+        return await self.send_redeem(Transaction(fee_payer=payer.pubkey()).add(ix), parsed_vaa)
+
+    async def send_wrapped_tokens_with_payload(
+            self,
+            recipient_chain: int,
+            recipient_token: bytes,
+            from_token_account: Pubkey,
+            amount: int,
+            recipient_address: bytes,
+            batch_id: int = 0
+    ):
+        payer = self.payer
+
+        send_wrapped_accounts = getSendWrappedTransferAccounts(
+            # the program ids come from self.deployment
+            None,
+            None,
+            None,
+            recipient_chain,
+            recipient_token,
+            deployment=self.deployment,
+            foreign_table=self.foreign_table
+        )
+
+        def build(wormhole_message: Pubkey) -> Transaction:
+            ix = send_wrapped_tokens_with_payload(
+                args={
+                    "batch_id": batch_id,
+                    "amount": amount,
+                    "recipient_address": list(recipient_address),
+                    "recipient_chain": recipient_chain
+                },
+                accounts={
+                    "payer": payer.pubkey(),
+                    "config": send_wrapped_accounts["send_config"],
+                    "foreign_contract": send_wrapped_accounts["foreign_contract"],
+                    "token_bridge_wrapped_mint": send_wrapped_accounts["token_bridge_wrapped_mint"],
+                    "from_token_account": from_token_account,
+                    "tmp_token_account": send_wrapped_accounts["tmp_token_account"],
+                    "wormhole_program": send_wrapped_accounts["wormhole_program"],
+                    "token_bridge_program": send_wrapped_accounts["token_bridge_program"],
+                    "token_bridge_wrapped_meta": send_wrapped_accounts["token_bridge_wrapped_meta"],
+                    "token_bridge_config": send_wrapped_accounts["token_bridge_config"],
+                    "token_bridge_authority_signer": send_wrapped_accounts["token_bridge_authority_signer"],
+                    "wormhole_bridge": send_wrapped_accounts["wormhole_bridge"],
+                    "wormhole_message": wormhole_message,
+                    "token_bridge_emitter": send_wrapped_accounts["token_bridge_emitter"],
+                    "token_bridge_sequence": send_wrapped_accounts["token_bridge_sequence"],
+                    "wormhole_fee_collector": send_wrapped_accounts["wormhole_fee_collector"]
+                }
+            )
+            return Transaction(fee_payer=payer.pubkey()).add(ix)
+
+        return await self.send_sequenced(build)
+
+    async def send_native_tokens_with_payload(
+            self,
+            recipient_chain: int,
+            mint: Pubkey,
+            from_token_account: Pubkey,
+            amount: int,
+            recipient_address: bytes,
+            batch_id: int = 0
+    ):
+        payer = self.payer
+
+        send_native_accounts = getSendNativeTransferAccounts(
+            # the program ids come from self.deployment
+            None,
+            None,
+            None,
+            recipient_chain,
+            mint,
+            deployment=self.deployment,
+            foreign_table=self.foreign_table
+        )
+
+        def build(wormhole_message: Pubkey) -> Transaction:
+            ix = send_native_tokens_with_payload(
+                args={
+                    "batch_id": batch_id,
+                    "amount": amount,
+                    "recipient_address": list(recipient_address),
+                    "recipient_chain": recipient_chain
+                },
+                accounts={
+                    "payer": payer.pubkey(),
+                    "config": send_native_accounts["send_config"],
+                    "foreign_contract": send_native_accounts["foreign_contract"],
+                    "mint": mint,
+                    "from_token_account": from_token_account,
+                    "tmp_token_account": send_native_accounts["tmp_token_account"],
+                    "wormhole_program": send_native_accounts["wormhole_program"],
+                    "token_bridge_program": send_native_accounts["token_bridge_program"],
+                    "token_bridge_config": send_native_accounts["token_bridge_config"],
+                    "token_bridge_custody": send_native_accounts["token_bridge_custody"],
+                    "token_bridge_authority_signer": send_native_accounts["token_bridge_authority_signer"],
+                    "token_bridge_custody_signer": send_native_accounts["token_bridge_custody_signer"],
+                    "wormhole_bridge": send_native_accounts["wormhole_bridge"],
+                    "wormhole_message": wormhole_message,
+                    "token_bridge_emitter": send_native_accounts["token_bridge_emitter"],
+                    "token_bridge_sequence": send_native_accounts["token_bridge_sequence"],
+                    "wormhole_fee_collector": send_native_accounts["wormhole_fee_collector"]
+                }
+            )
+            return Transaction(fee_payer=payer.pubkey()).add(ix)
+
+        return await self.send_sequenced(build)
 
 
 async def hellotoken_initialize():
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
-
-    payer = await get_payer()
-
-    send_config_key = deriveSenderConfigKey(PROGRAM_ID)
-    redeemer_config_key = deriveRedeemerConfigKey(PROGRAM_ID)
-
-    token_bridge_accounts = getTokenBridgeDerivedAccounts(
-        token_bridge_program_id,
-        wormhole_program_id
-    )
-
-    ix = initialize(
-        args={
-            "relayer_fee": 10,
-            "relayer_fee_precision": 100000
-        },
-        accounts={
-            "owner": payer.pubkey(),
-            "sender_config": send_config_key,
-            "redeemer_config": redeemer_config_key,
-            "wormhole_program": Pubkey.from_string(wormhole_program_id),
-            "token_bridge_program": Pubkey.from_string(token_bridge_program_id),
-            "token_bridge_config": token_bridge_accounts["token_bridge_config"],
-            "token_bridge_authority_signer": token_bridge_accounts["token_bridge_authority_signer"],
-            "token_bridge_custody_signer": token_bridge_accounts["token_bridge_custody_signer"],
-            "token_bridge_mint_authority": token_bridge_accounts["token_bridge_mint_authority"],
-            "wormhole_bridge": token_bridge_accounts["wormhole_bridge"],
-            "token_bridge_emitter": token_bridge_accounts["token_bridge_emitter"],
-            "wormhole_fee_collector": token_bridge_accounts["wormhole_fee_collector"],
-            "token_bridge_sequence": token_bridge_accounts["token_bridge_sequence"],
-        },
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-    await client.close()
+    async with HelloTokenClient() as hello_token:
+        print(await (await hello_token.initialize()))
 
 
 async def hellotoken_register_foreign_contract():
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
-
-    payer = await get_payer()
-
-    send_config_key = deriveSenderConfigKey(PROGRAM_ID)
+    async with HelloTokenClient() as hello_token:
+        print(await (await hello_token.register_foreign_contract(chain_id_sui, token_bridge_emitter_sui, hello_emitter_sui)))
 
-    chain_id_sui = 21
-    token_bridge_emitter_sui = bytes.fromhex("40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9")
-    hello_emitter_sui = bytes.fromhex("35fbfedfe4ba06b311b86ae1d2064e08e583e6d550524307fc626648c4718c0c")
-
-
-    foreign_contract_key = deriveForeignContractKey(PROGRAM_ID, chain_id_sui)
-    foreign_endpoint_key = deriveForeignEndPointKey(
-        token_bridge_program_id,
-        chain_id_sui,
-        Pubkey.from_bytes(token_bridge_emitter_sui)
-    )
-
-    print(foreign_endpoint_key)
-
-    ix = register_foreign_contract(
-        args={
-            "chain": chain_id_sui,
-            "address": list(hello_emitter_sui)
-        },
-        accounts={
-            "owner": payer.pubkey(),
-            "config": send_config_key,
-            "foreign_contract": foreign_contract_key,
-            "token_bridge_foreign_endpoint": foreign_endpoint_key,
-            "token_bridge_program": Pubkey.from_string(token_bridge_program_id)
-        },
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-    await client.close()
-
-
-async def hellotoken_redeem_wrapped_transfer_with_payload(vaa: str):
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
-
-    payer = await get_payer()
-
-    parsed_vaa = ParsedVaa.parse_vaa(vaa)
-
-    redeem_wrapped_accounts = getRedeemWrappedTransferAccounts(
-        token_bridge_program_id,
-        wormhole_program_id,
-        PROGRAM_ID,
-        payer.pubkey(),
-        vaa
-    )
-
-    ix = redeem_wrapped_transfer_with_payload(
-        args={
-            "vaa_hash": parsed_vaa.hash
-        },
-        accounts={
-            "payer": payer.pubkey(),
-            "payer_token_account": redeem_wrapped_accounts["payer_token_key"],
-            "config": redeem_wrapped_accounts["redeemer_config_key"],
-            "foreign_contract": redeem_wrapped_accounts["foreign_contract_key"],
-            "token_bridge_wrapped_mint": redeem_wrapped_accounts["token_bridge_wrapped_mint"],
-            "recipient_token_account": redeem_wrapped_accounts["recipient_token_account"],
-            "recipient": redeem_wrapped_accounts["recipient"],
-            "tmp_token_account": redeem_wrapped_accounts["tmp_token_key"],
-            "wormhole_program": redeem_wrapped_accounts["wormhole_program"],
-            "token_bridge_program": redeem_wrapped_accounts["token_bridge_program"],
-            "token_bridge_wrapped_meta": redeem_wrapped_accounts["token_bridge_wrapped_meta"],
-            "token_bridge_config": redeem_wrapped_accounts["token_bridge_config"],
-            "vaa": redeem_wrapped_accounts["vaa"],
-            "token_bridge_claim": redeem_wrapped_accounts["token_bridge_claim"],
-            "token_bridge_foreign_endpoint": redeem_wrapped_accounts["token_bridge_foreign_endpoint"],
-            "token_bridge_mint_authority": redeem_wrapped_accounts["token_bridge_mint_authority"]
-        },
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-    await client.close()
-
-async def hellotoken_redeem_native_transfer_with_payload(vaa: str):
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
-
-    payer = await get_payer()
-
-    # wrapped sol mint
-    wrapped_sol_mint = Pubkey.from_string("So11111111111111111111111111111111111111112")
-
-    parsed_vaa = ParsedVaa.parse_vaa(vaa)
-
-    redeem_native_accounts = getRedeemNativeTransferAccounts(
-        token_bridge_program_id,
-        wormhole_program_id,
-        PROGRAM_ID,
-        payer.pubkey(),
-        vaa,
-        wrapped_sol_mint
-    )
-
-    ix = redeem_native_transfer_with_payload(
-        args={
-            "vaa_hash": parsed_vaa.hash
-        },
-        accounts={
-            "payer": payer.pubkey(),
-            "payer_token_account": redeem_native_accounts["payer_token_account"],
-            "config": redeem_native_accounts["redeemer_config"],
-            "foreign_contract": redeem_native_accounts["foreign_contract"],
-            "mint": wrapped_sol_mint,
-            "recipient_token_account": redeem_native_accounts["recipient_token_account"],
-            "recipient": redeem_native_accounts["recipient"],
-            "tmp_token_account": redeem_native_accounts["tmp_token_account"],
-            "wormhole_program": redeem_native_accounts["wormhole_program"],
-            "token_bridge_program": redeem_native_accounts["token_bridge_program"],
-            "token_bridge_config": redeem_native_accounts["token_bridge_config"],
-            "vaa": redeem_native_accounts["vaa"],
-            "token_bridge_claim": redeem_native_accounts["token_bridge_claim"],
-            "token_bridge_foreign_endpoint": redeem_native_accounts["token_bridge_foreign_endpoint"],
-            "token_bridge_custody": redeem_native_accounts["token_bridge_custody"],
-            "token_bridge_custody_signer": redeem_native_accounts["token_bridge_custody_signer"]
-        }
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-    await client.close()
 
+async def hellotoken_redeem_wrapped_transfer_with_payload(vaa: Union[bytes, memoryview, str]):
+    async with HelloTokenClient() as hello_token:
+        confirmed = await hello_token.redeem_wrapped_transfer_with_payload(vaa)
+        if confirmed is not None:
+            print(await confirmed)
 
-async def hellotoken_send_wrapped_tokens_with_payload():
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
+async def hellotoken_redeem_native_transfer_with_payload(vaa: Union[bytes, memoryview, str]):
+    async with HelloTokenClient() as hello_token:
+        confirmed = await hello_token.redeem_native_transfer_with_payload(vaa, wrapped_sol_mint)
+        if confirmed is not None:
+            print(await confirmed)
 
-    payer = await get_payer()
 
+async def hellotoken_send_wrapped_tokens_with_payload():
     # sui-testnet
-    recipient_chain = 21
+    recipient_chain = chain_id_sui
     # coin10
     recipient_token = bytes.fromhex("bda28aeb93874baba2273db9c92fb7b7fe2f412352e9633c0258978a32620a23")
     # wrapper coin10
@@ -261,70 +762,21 @@ async def hellotoken_send_wrapped_tokens_with_payload():
     # recipient
     recipient_address = bytes.fromhex("e76e8792889a2c3d6f7cf3b8b21be9c9f162ae98e1f218f23ac6d09e70931a2d")
 
-    send_wrapped_accounts = getSendWrappedTransferAccounts(
-        token_bridge_program_id,
-        wormhole_program_id,
-        PROGRAM_ID,
-        recipient_chain,
-        recipient_token
-    )
-
-    current_sequence = await client.get_account_info(send_wrapped_accounts["token_bridge_sequence"])
-
-    next_seq = int.from_bytes(current_sequence.value.data, byteorder='little') + 1
-    print(f"sequence={next_seq}")
-    wormhole_message = deriveTokenTransferMessageKey(PROGRAM_ID, next_seq)
-
-    ix = send_wrapped_tokens_with_payload(
-        args={
-            "batch_id": 0,
-            "amount": amount,
-            "recipient_address": list(recipient_address),
-            "recipient_chain": recipient_chain
-        },
-        accounts={
-            "payer": payer.pubkey(),
-            "config": send_wrapped_accounts["send_config"],
-            "foreign_contract": send_wrapped_accounts["foreign_contract"],
-            "token_bridge_wrapped_mint": send_wrapped_accounts["token_bridge_wrapped_mint"],
-            "from_token_account": coin10_from_account,
-            "tmp_token_account": send_wrapped_accounts["tmp_token_account"],
-            "wormhole_program": send_wrapped_accounts["wormhole_program"],
-            "token_bridge_program": send_wrapped_accounts["token_bridge_program"],
-            "token_bridge_wrapped_meta": send_wrapped_accounts["token_bridge_wrapped_meta"],
-            "token_bridge_config": send_wrapped_accounts["token_bridge_config"],
-            "token_bridge_authority_signer": send_wrapped_accounts["token_bridge_authority_signer"],
-            "wormhole_bridge": send_wrapped_accounts["wormhole_bridge"],
-            "wormhole_message": wormhole_message,
-            "token_bridge_emitter": send_wrapped_accounts["token_bridge_emitter"],
-            "token_bridge_sequence": send_wrapped_accounts["token_bridge_sequence"],
-            "wormhole_fee_collector": send_wrapped_accounts["wormhole_fee_collector"]
-        }
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-
-    await client.close()
+    async with HelloTokenClient() as hello_token:
+        confirmed = await hello_token.send_wrapped_tokens_with_payload(
+            recipient_chain,
+            recipient_token,
+            coin10_from_account,
+            amount,
+            recipient_address
+        )
+        print(await confirmed)
 
 async def hellotoken_send_native_tokens_with_payload():
-    client = AsyncClient(rpc_url)
-    await client.is_connected()
-
-    payer = await get_payer()
-
     # sui-testnet
-    recipient_chain = 21
+    recipient_chain = chain_id_sui
     # wrapped sol
     # recipient_token = bytes.fromhex("215a00f3162a83849a7d1d4ce982fa8ceda94fd9ab505d7f94452eece5feaf25")
-    # wrapped sol mint
-    wrapped_sol_mint = Pubkey.from_string("So11111111111111111111111111111111111111112")
     # wrapped sol account
     wrapped_sol_account = Pubkey.from_string("6keZXUa7n3hoHkboSnzpGETANuwY43zWZC3FGrCPN1Gh")
     # send 1 wsol
@@ -332,61 +784,18 @@ async def hellotoken_send_native_tokens_with_payload():
     # recipient
     recipient_address = bytes.fromhex("e76e8792889a2c3d6f7cf3b8b21be9c9f162ae98e1f218f23ac6d09e70931a2d")
 
-    send_native_accounts = getSendNativeTransferAccounts(
-        token_bridge_program_id,
-        wormhole_program_id,
-        PROGRAM_ID,
-        recipient_chain,
-        wrapped_sol_mint
-    )
-
-    current_sequence = await client.get_account_info(send_native_accounts["token_bridge_sequence"])
-
-    next_seq = int.from_bytes(current_sequence.value.data, byteorder='little') + 1
-    print(f"sequence={next_seq}")
-
-    wormhole_message = deriveTokenTransferMessageKey(PROGRAM_ID, next_seq)
-
-    ix = send_native_tokens_with_payload(
-        args={
-            "batch_id": 0,
-            "amount": amount,
-            "recipient_address": list(recipient_address),
-            "recipient_chain": recipient_chain
-        },
-        accounts={
-            "payer": payer.pubkey(),
-            "config": send_native_accounts["send_config"],
-            "foreign_contract": send_native_accounts["foreign_contract"],
-            "mint": wrapped_sol_mint,
-            "from_token_account": wrapped_sol_account,
-            "tmp_token_account": send_native_accounts["tmp_token_account"],
-            "wormhole_program": send_native_accounts["wormhole_program"],
-            "token_bridge_program": send_native_accounts["token_bridge_program"],
-            "token_bridge_config": send_native_accounts["token_bridge_config"],
-            "token_bridge_custody": send_native_accounts["token_bridge_custody"],
-            "token_bridge_authority_signer": send_native_accounts["token_bridge_authority_signer"],
-            "token_bridge_custody_signer": send_native_accounts["token_bridge_custody_signer"],
-            "wormhole_bridge": send_native_accounts["wormhole_bridge"],
-            "wormhole_message": wormhole_message,
-            "token_bridge_emitter": send_native_accounts["token_bridge_emitter"],
-            "token_bridge_sequence": send_native_accounts["token_bridge_sequence"],
-            "wormhole_fee_collector": send_native_accounts["wormhole_fee_collector"]
-        }
-    )
-
-    tx = Transaction(fee_payer=payer.pubkey()).add(ix)
-
-    tx_sig = await client.send_transaction(tx, payer)
-    print(tx_sig)
-
-    resp = await client.get_transaction(tx_sig.value)
-    print(resp)
-
-
-    await client.close()
-
-
-vaa = "0x010000000001005deefe8dd16b7cb0b87c85c81a7ff60508454e9a5fb4ce3c28db6f8c5b1d0c752138bc97a9d372ab8617393402dc3ef37f67f38eb8adcaf49dbdc3a44d00a264006516a07900000000001540440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9000000000000007e00030000000000000000000000000000000000000000000000000000000000989298069b8857feab8184fb687f634618c035dac439dc1aeb3b5598a0f000000000010001ceda17841d79db34bd17721d2024343b5d9dd0320626958e10f4cf3d800a719e000135fbfedfe4ba06b311b86ae1d2064e08e583e6d550524307fc626648c4718c0c0138e121709ad96bd37a2f87022932336e9a290f62aef3d41dae00b1547c6f1938"
-
-asyncio.run(hellotoken_redeem_native_transfer_with_payload(vaa))
\ No newline at end of file
+    async with HelloTokenClient() as hello_token:
+        confirmed = await hello_token.send_native_tokens_with_payload(
+            recipient_chain,
+            wrapped_sol_mint,
+            wrapped_sol_account,
+            amount,
+            recipient_address
+        )
+        print(await confirmed)
+
+
+if __name__ == '__main__':
+    vaa = "0x010000000001005deefe8dd16b7cb0b87c85c81a7ff60508454e9a5fb4ce3c28db6f8c5b1d0c752138bc97a9d372ab8617393402dc3ef37f67f38eb8adcaf49dbdc3a44d00a264006516a07900000000001540440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9000000000000007e00030000000000000000000000000000000000000000000000000000000000989298069b8857feab8184fb687f634618c035dac439dc1aeb3b5598a0f000000000010001ceda17841d79db34bd17721d2024343b5d9dd0320626958e10f4cf3d800a719e000135fbfedfe4ba06b311b86ae1d2064e08e583e6d550524307fc626648c4718c0c0138e121709ad96bd37a2f87022932336e9a290f62aef3d41dae00b1547c6f1938"
+
+    asyncio.run(hellotoken_redeem_native_transfer_with_payload(vaa))
@@ -1,88 +1,196 @@
+from collections import OrderedDict
+from types import MappingProxyType
 from eth_utils import keccak
+import functools
 import json
+import os
+import struct
+import threading
 
 from solders.pubkey import Pubkey
 from solders.system_program import ID as SYSTEM_PROGRAM_ID
 from spl.token.constants import TOKEN_PROGRAM_ID
 from solders.sysvar import RENT
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
 from base58 import b58encode
 from spl.token.instructions import get_associated_token_address
 
+import payloads
+from payloads import decode_payload
+from pda_store import PdaStore
+
+
+class PdaCache:
+    def __init__(self, maxsize: int = 4096, store: Optional[PdaStore] = None):
+        self.maxsize = maxsize
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find_program_address(self, seeds: List[bytes], program_id: Pubkey) -> Tuple[Pubkey, int]:
+        key = (bytes(program_id), tuple(bytes(seed) for seed in seeds))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+
+        entry = None
+        if self.store is not None:
+            stored = self.store.get(key[0], key[1])
+            if stored is not None:
+                entry = (Pubkey.from_bytes(stored[0]), stored[1])
+                self.store_hits += 1
+
+        if entry is None:
+            entry = Pubkey.find_program_address(list(key[1]), program_id)
+            if self.store is not None:
+                self.store.put(key[0], key[1], bytes(entry[0]), entry[1])
+
+        self._insert(key, entry)
+
+        return entry
+
+    def _insert(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def warm(self):
+        if self.store is None:
+            return 0
+        # items() yields the most recently used rows first, insert those last so the LRU keeps them longest
+        rows = list(self.store.items(limit=self.maxsize))
+        for program_id, seeds, address, bump in reversed(rows):
+            self._insert((program_id, seeds), (Pubkey.from_bytes(address), bump))
+        return len(rows)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "store_hits": self.store_hits,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.store_hits = 0
+
+
+# shared by every derive* helper below
+pda_cache = PdaCache()
+
+if os.environ.get("PDA_STORE_PATH"):
+    pda_cache.store = PdaStore(os.environ["PDA_STORE_PATH"])
+
+
+def usePdaStore(path: str, warm: bool = True) -> PdaStore:
+    pda_cache.store = PdaStore(path)
+    if warm:
+        pda_cache.warm()
+    return pda_cache.store
+
+
+def findProgramAddress(seeds: List[bytes], program_id: Pubkey) -> Tuple[Pubkey, int]:
+    return pda_cache.find_program_address(seeds, program_id)
+
+
+@functools.lru_cache()
+def _parsePubkey(address: str) -> Pubkey:
+    return Pubkey.from_string(address)
+
+
+def toPubkey(address: Union[str, Pubkey]) -> Pubkey:
+    if isinstance(address, str):
+        return _parsePubkey(address)
+    return address
+
+
+def toBytes(value: Union[bytes, bytearray, memoryview, str]) -> bytes:
+    # hex strings are only accepted at the CLI edge, everything else stays binary
+    if isinstance(value, str):
+        return bytes.fromhex(value.replace("0x", ""))
+    if isinstance(value, bytes):
+        return value
+    return bytes(value)
+
 
 def deriveWormholeEmitterKey(emitter_program_id: str):
-    program_id = Pubkey.from_string(emitter_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"emitter"], program_id)
+    program_id = toPubkey(emitter_program_id)
+    program_address, _nonce = findProgramAddress([b"emitter"], program_id)
     return program_address
 
 
 def deriveEmitterSequenceKey(emitter: Pubkey, wormhole_program_id: str):
-    program_id = Pubkey.from_string(wormhole_program_id)
+    program_id = toPubkey(wormhole_program_id)
     seed = [b"Sequence"]
     seed.append(bytes(emitter))
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(seed, program_id)
 
     return program_address
 
 
 def deriveWormholeBridgeDataKey(wormhole_program_id: str):
-    program_id = Pubkey.from_string(wormhole_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"Bridge"], program_id)
+    program_id = toPubkey(wormhole_program_id)
+    program_address, _nonce = findProgramAddress([b"Bridge"], program_id)
     return program_address
 
 
 def deriveFeeCollectorKey(wormhole_program_id: str):
-    program_id = Pubkey.from_string(wormhole_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"fee_collector"], program_id)
+    program_id = toPubkey(wormhole_program_id)
+    program_address, _nonce = findProgramAddress([b"fee_collector"], program_id)
     return program_address
 
 
 def deriveSenderConfigKey(hello_token_program_id: Union[str, Pubkey]):
-    if isinstance(hello_token_program_id, str):
-        program_id = Pubkey.from_string(hello_token_program_id)
-    else:
-        program_id = hello_token_program_id
-    program_address, _nonce = Pubkey.find_program_address([b"sender"], program_id)
+    program_id = toPubkey(hello_token_program_id)
+    program_address, _nonce = findProgramAddress([b"sender"], program_id)
     return program_address
 
 
 def deriveRedeemerConfigKey(hello_token_program_id: Union[str, Pubkey]):
-    if isinstance(hello_token_program_id, str):
-        program_id = Pubkey.from_string(hello_token_program_id)
-    else:
-        program_id = hello_token_program_id
-    program_address, _nonce = Pubkey.find_program_address([b"redeemer"], program_id)
+    program_id = toPubkey(hello_token_program_id)
+    program_address, _nonce = findProgramAddress([b"redeemer"], program_id)
     return program_address
 
 
 def deriveForeignContractKey(hello_token_program_id: Union[str, Pubkey], chain: int):
-    if isinstance(hello_token_program_id, str):
-        program_id = Pubkey.from_string(hello_token_program_id)
-    else:
-        program_id = hello_token_program_id
+    program_id = toPubkey(hello_token_program_id)
 
     seed = [b"foreign_contract"]
     seed.append(chain.to_bytes(length=2, byteorder="little", signed=False))
-    program_address, _nonce = Pubkey.find_program_address(
+    program_address, _nonce = findProgramAddress(
         seed,
         program_id
     )
     return program_address
 
+def tokenTransferMessageSeeds(next_seq: int) -> List[bytes]:
+    seed = [b"bridged"]
+    seed.append(next_seq.to_bytes(length=8, byteorder="little", signed=False))
+    return seed
+
+
 def deriveTokenTransferMessageKey(
         hello_token_program_id: Union[str, Pubkey],
         next_seq: int
 ):
-    if isinstance(hello_token_program_id, str):
-        program_id = Pubkey.from_string(hello_token_program_id)
-    else:
-        program_id = hello_token_program_id
+    program_id = toPubkey(hello_token_program_id)
 
-    seed = [b"bridged"]
-    seed.append(next_seq.to_bytes(length=8, byteorder="little", signed=False))
-
-    program_address, _nonce = Pubkey.find_program_address(
-        seed,
+    program_address, _nonce = findProgramAddress(
+        tokenTransferMessageSeeds(next_seq),
         program_id
     )
     return program_address
@@ -95,12 +203,12 @@ def deriveForeignEndPointKey(
 ):
     assert chain != 1, "emitterChain == CHAIN_ID_SOLANA cannot exist as foreign token bridge emitter"
 
-    program_id = Pubkey.from_string(token_bridge_program_id)
+    program_id = toPubkey(token_bridge_program_id)
 
     seed = [chain.to_bytes(length=2, byteorder="big", signed=False)]
     seed.append(bytes(foreign_contract))
 
-    program_address, _nonce = Pubkey.find_program_address(
+    program_address, _nonce = findProgramAddress(
         seed,
         program_id
     )
@@ -126,164 +234,361 @@ def getWormholeDerivedAccounts(
 
 
 def deriveTokenBridgeConfigKey(token_bridge_program_id: str):
-    program_id = Pubkey.from_string(token_bridge_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"config"], program_id)
+    program_id = toPubkey(token_bridge_program_id)
+    program_address, _nonce = findProgramAddress([b"config"], program_id)
     return program_address
 
 
 def deriveAuthoritySignerKey(token_bridge_program_id: str):
-    program_id = Pubkey.from_string(token_bridge_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"authority_signer"], program_id)
+    program_id = toPubkey(token_bridge_program_id)
+    program_address, _nonce = findProgramAddress([b"authority_signer"], program_id)
     return program_address
 
 def deriveCustodyKey(
         token_bridge_program_id: str,
         native_mint: Pubkey,
 ):
-    program_id = Pubkey.from_string(token_bridge_program_id)
-    program_address, _nonce = Pubkey.find_program_address([bytes(native_mint)], program_id)
+    program_id = toPubkey(token_bridge_program_id)
+    program_address, _nonce = findProgramAddress([bytes(native_mint)], program_id)
     return program_address
 
 def deriveCustodySignerKey(token_bridge_program_id: str):
-    program_id = Pubkey.from_string(token_bridge_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"custody_signer"], program_id)
+    program_id = toPubkey(token_bridge_program_id)
+    program_address, _nonce = findProgramAddress([b"custody_signer"], program_id)
     return program_address
 
 
 def deriveMintAuthorityKey(token_bridge_program_id: str):
-    program_id = Pubkey.from_string(token_bridge_program_id)
-    program_address, _nonce = Pubkey.find_program_address([b"mint_signer"], program_id)
+    program_id = toPubkey(token_bridge_program_id)
+    program_address, _nonce = findProgramAddress([b"mint_signer"], program_id)
     return program_address
 
 
+class Deployment:
+    __slots__ = (
+        "token_bridge_program",
+        "wormhole_program",
+        "hello_token_program",
+        "token_bridge_config",
+        "token_bridge_authority_signer",
+        "token_bridge_custody_signer",
+        "token_bridge_mint_authority",
+        "wormhole_bridge",
+        "wormhole_fee_collector",
+        "token_bridge_emitter",
+        "token_bridge_sequence",
+        "sender_config",
+        "redeemer_config",
+        "bumps",
+    )
+
+    def __init__(
+            self,
+            token_bridge_program_id: Union[str, Pubkey],
+            wormhole_program_id: Union[str, Pubkey],
+            hello_token_program_id: Union[str, Pubkey, None] = None
+    ):
+        token_bridge_program = toPubkey(token_bridge_program_id)
+        wormhole_program = toPubkey(wormhole_program_id)
+
+        seeds = {
+            "token_bridge_config": ([b"config"], token_bridge_program),
+            "token_bridge_authority_signer": ([b"authority_signer"], token_bridge_program),
+            "token_bridge_custody_signer": ([b"custody_signer"], token_bridge_program),
+            "token_bridge_mint_authority": ([b"mint_signer"], token_bridge_program),
+            "wormhole_bridge": ([b"Bridge"], wormhole_program),
+            "wormhole_fee_collector": ([b"fee_collector"], wormhole_program),
+            "token_bridge_emitter": ([b"emitter"], token_bridge_program),
+        }
+
+        if hello_token_program_id is not None:
+            hello_token_program = toPubkey(hello_token_program_id)
+            seeds["sender_config"] = ([b"sender"], hello_token_program)
+            seeds["redeemer_config"] = ([b"redeemer"], hello_token_program)
+        else:
+            hello_token_program = None
+
+        addresses = {}
+        bumps = {}
+        for name, (seed, program_id) in seeds.items():
+            addresses[name], bumps[name] = findProgramAddress(seed, program_id)
+
+        addresses["token_bridge_sequence"], bumps["token_bridge_sequence"] = findProgramAddress(
+            [b"Sequence", bytes(addresses["token_bridge_emitter"])],
+            wormhole_program
+        )
+
+        set_attr = object.__setattr__
+        set_attr(self, "token_bridge_program", token_bridge_program)
+        set_attr(self, "wormhole_program", wormhole_program)
+        set_attr(self, "hello_token_program", hello_token_program)
+        set_attr(self, "sender_config", None)
+        set_attr(self, "redeemer_config", None)
+        for name, address in addresses.items():
+            set_attr(self, name, address)
+        set_attr(self, "bumps", MappingProxyType(bumps))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return (
+            f"Deployment(token_bridge={self.token_bridge_program}, "
+            f"wormhole={self.wormhole_program}, "
+            f"hello_token={self.hello_token_program})"
+        )
+
+
+@functools.lru_cache()
+def _getDeployment(token_bridge_program_id: str, wormhole_program_id: str, hello_token_program_id: str):
+    return Deployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id)
+
+
+def getDeployment(
+        token_bridge_program_id: Union[str, Pubkey],
+        wormhole_program_id: Union[str, Pubkey],
+        hello_token_program_id: Union[str, Pubkey, None] = None
+) -> Deployment:
+    return _getDeployment(
+        str(token_bridge_program_id),
+        str(wormhole_program_id),
+        None if hello_token_program_id is None else str(hello_token_program_id)
+    )
+
+
+def resolveDeployment(
+        token_bridge_program_id: Union[str, Pubkey, None],
+        wormhole_program_id: Union[str, Pubkey, None],
+        hello_token_program_id: Union[str, Pubkey, None] = None,
+        deployment: Deployment = None
+) -> Deployment:
+    # the bundle builders take their program ids from deployment when one is given; ids
+    # passed alongside it may be None, otherwise they have to name the same programs
+    if deployment is None:
+        return getDeployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id)
+
+    for program_id, expected in (
+            (token_bridge_program_id, deployment.token_bridge_program),
+            (wormhole_program_id, deployment.wormhole_program),
+            (hello_token_program_id, deployment.hello_token_program)
+    ):
+        if program_id is not None and toPubkey(program_id) != expected:
+            raise ValueError(f"program id {program_id} does not match {deployment}")
+    return deployment
+
+
 def getTokenBridgeDerivedAccounts(
-        token_bridge_program_id: str,
-        wormhole_program_id: str
+        token_bridge_program_id: Optional[str],
+        wormhole_program_id: Optional[str],
+        deployment: Deployment = None
 ):
-    wormhole_accounts = getWormholeDerivedAccounts(token_bridge_program_id, wormhole_program_id)
+    deployment = resolveDeployment(token_bridge_program_id, wormhole_program_id, deployment=deployment)
 
     return {
-        "token_bridge_config": deriveTokenBridgeConfigKey(token_bridge_program_id),
-        "token_bridge_authority_signer": deriveAuthoritySignerKey(token_bridge_program_id),
-        "token_bridge_custody_signer": deriveCustodySignerKey(token_bridge_program_id),
-        "token_bridge_mint_authority": deriveMintAuthorityKey(token_bridge_program_id),
-        "wormhole_bridge": wormhole_accounts[0],
-        "token_bridge_emitter": wormhole_accounts[1],
-        "wormhole_fee_collector": wormhole_accounts[2],
-        "token_bridge_sequence": wormhole_accounts[3]
+        "token_bridge_config": deployment.token_bridge_config,
+        "token_bridge_authority_signer": deployment.token_bridge_authority_signer,
+        "token_bridge_custody_signer": deployment.token_bridge_custody_signer,
+        "token_bridge_mint_authority": deployment.token_bridge_mint_authority,
+        "wormhole_bridge": deployment.wormhole_bridge,
+        "token_bridge_emitter": deployment.token_bridge_emitter,
+        "wormhole_fee_collector": deployment.wormhole_fee_collector,
+        "token_bridge_sequence": deployment.token_bridge_sequence
     }
 
 def deriveWrappedMintKey(
         token_bridge_program_id: str,
         token_chain: int,
-        token_address: Union[str, bytes]
+        token_address: Union[str, bytes, memoryview]
 ):
     assert token_chain != 1, "tokenChain == CHAIN_ID_SOLANA does not have wrapped mint key"
 
-    if isinstance(token_address, str):
-        token_address = bytes.fromhex(token_address.replace("0x", ""))
+    token_address = toBytes(token_address)
 
-    program_id = Pubkey.from_string(token_bridge_program_id)
+    program_id = toPubkey(token_bridge_program_id)
 
     seed = [b"wrapped"]
     seed.append(token_chain.to_bytes(length=2, byteorder="big", signed=False))
     seed.append(token_address)
 
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(seed, program_id)
     return program_address
 
+def postedVaaSeeds(hash: Union[str, bytes, memoryview]) -> List[bytes]:
+    seed = [b"PostedVAA"]
+    seed.append(toBytes(hash))
+    return seed
+
+
 def derivePostedVaaKey(
         wormhole_program_id: str,
-        hash: Union[str, bytes]
+        hash: Union[str, bytes, memoryview]
 ):
-    if isinstance(hash, str):
-        hash = bytes.fromhex(hash.replace("0x", ""))
-
-    program_id = Pubkey.from_string(wormhole_program_id)
+    program_id = toPubkey(wormhole_program_id)
 
-    seed = [b"PostedVAA"]
-    seed.append(hash)
-
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(postedVaaSeeds(hash), program_id)
     return program_address
 
 def deriveGuardianSetKey(
         wormhole_program_id: str,
         index: int
 ):
-    program_id = Pubkey.from_string(wormhole_program_id)
+    program_id = toPubkey(wormhole_program_id)
 
     seed = [b"GuardianSet"]
     seed.append(index.to_bytes(length=4, byteorder="big", signed=False))
 
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(seed, program_id)
     return program_address
 
-def deriveClaimKey(
-        token_bridge_program_id: str,
-        emitter_address: Union[str, bytes],
+def claimSeeds(
+        emitter_address: Union[str, bytes, memoryview],
         emitter_chain: int,
         sequence: int
-):
-    if isinstance(emitter_address, str):
-        emitter_address = bytes.fromhex(emitter_address.replace("0x", ""))
+) -> List[bytes]:
+    emitter_address = toBytes(emitter_address)
 
     assert len(emitter_address) == 32, "address.length != 32"
 
-    program_id = Pubkey.from_string(token_bridge_program_id)
-
     seed = [emitter_address]
     seed.append(emitter_chain.to_bytes(length=2, byteorder="big", signed=False))
     seed.append(sequence.to_bytes(length=8, byteorder="big", signed=False))
+    return seed
+
+
+def deriveClaimKey(
+        token_bridge_program_id: str,
+        emitter_address: Union[str, bytes, memoryview],
+        emitter_chain: int,
+        sequence: int
+):
+    program_id = toPubkey(token_bridge_program_id)
 
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(claimSeeds(emitter_address, emitter_chain, sequence), program_id)
     return program_address
 
 def deriveWrappedMetaKey(
         token_bridge_program_id: str,
         mint_key: Pubkey
 ):
-    program_id = Pubkey.from_string(token_bridge_program_id)
+    program_id = toPubkey(token_bridge_program_id)
 
     seed = [b"meta"]
     seed.append(bytes(mint_key))
 
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(seed, program_id)
     return program_address
 
 def deriveTmpTokenAccountKey(
         hello_token_program_id: Union[str, Pubkey],
         wrapped_mint: Pubkey
 ):
-    if isinstance(hello_token_program_id, str):
-        program_id = Pubkey.from_string(hello_token_program_id)
-    else:
-        program_id = hello_token_program_id
+    program_id = toPubkey(hello_token_program_id)
 
     seed = [b"tmp"]
     seed.append(bytes(wrapped_mint))
 
-    program_address, _nonce = Pubkey.find_program_address(seed, program_id)
+    program_address, _nonce = findProgramAddress(seed, program_id)
     return program_address
 
+class ForeignEndpoint:
+    __slots__ = ("chain", "foreign_contract", "token_bridge_foreign_endpoint", "emitter_address")
+
+    def __init__(self, chain: int, foreign_contract: Pubkey, token_bridge_foreign_endpoint: Pubkey, emitter_address: bytes):
+        self.chain = chain
+        self.foreign_contract = foreign_contract
+        self.token_bridge_foreign_endpoint = token_bridge_foreign_endpoint
+        self.emitter_address = emitter_address
+
+    def __repr__(self):
+        return (
+            f"ForeignEndpoint(chain={self.chain}, "
+            f"foreign_contract={self.foreign_contract}, "
+            f"token_bridge_foreign_endpoint={self.token_bridge_foreign_endpoint}, "
+            f"emitter_address=0x{self.emitter_address.hex()})"
+        )
+
+
+class ForeignContractTable:
+    # chain id -> foreign contract / token bridge endpoint PDAs, derived once
+    def __init__(self, deployment: Deployment, registered: Optional[Dict[int, Union[str, bytes]]] = None):
+        self.deployment = deployment
+        self._entries: Dict[int, ForeignEndpoint] = {}
+        for chain, emitter_address in (registered or {}).items():
+            self.refresh(chain, emitter_address)
+
+    def endpoint(self, chain: int, emitter_address: Union[str, bytes, memoryview]) -> ForeignEndpoint:
+        # the PDAs a registration of emitter_address would use, without recording it
+        emitter_address = toBytes(emitter_address)
+
+        return ForeignEndpoint(
+            chain,
+            deriveForeignContractKey(self.deployment.hello_token_program, chain),
+            deriveForeignEndPointKey(self.deployment.token_bridge_program, chain, emitter_address),
+            emitter_address
+        )
+
+    def put(self, entry: ForeignEndpoint) -> ForeignEndpoint:
+        self._entries[entry.chain] = entry
+        return entry
+
+    def refresh(self, chain: int, emitter_address: Union[str, bytes, memoryview]) -> ForeignEndpoint:
+        return self.put(self.endpoint(chain, emitter_address))
+
+    def get(self, chain: int) -> Optional[ForeignEndpoint]:
+        return self._entries.get(chain)
+
+    def chains(self) -> List[int]:
+        return list(self._entries)
+
+    def __contains__(self, chain: int):
+        return chain in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def getForeignAccounts(
+        deployment: Deployment,
+        foreign_table: Optional[ForeignContractTable],
+        chain: int,
+        emitter_address: Union[bytes, None] = None
+) -> Tuple[Pubkey, Optional[Pubkey]]:
+    entry = None if foreign_table is None else foreign_table.get(chain)
+    if entry is not None and (emitter_address is None or bytes(emitter_address) == entry.emitter_address):
+        return entry.foreign_contract, entry.token_bridge_foreign_endpoint
+
+    foreign_contract_key = deriveForeignContractKey(deployment.hello_token_program, chain)
+    if emitter_address is None:
+        return foreign_contract_key, None
+
+    return foreign_contract_key, deriveForeignEndPointKey(deployment.token_bridge_program, chain, emitter_address)
+
+
 def getRedeemWrappedTransferAccounts(
-        token_bridge_program_id: str,
-        wormhole_program_id: str,
-        hello_token_program_id: str,
+        token_bridge_program_id: Optional[str],
+        wormhole_program_id: Optional[str],
+        hello_token_program_id: Optional[str],
         payer: Pubkey,
-        vaa: Union[str, bytes],
+        vaa: Union[bytes, memoryview, str],
+        deployment: Deployment = None,
+        foreign_table: ForeignContractTable = None
 ):
-    parsed_vaa = ParsedVaa.parse_vaa(vaa)
+    deployment = resolveDeployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id, deployment)
+
+    parsed_vaa = LazyParsedVaa.parse_vaa(vaa)
     token_transfer = TokenTransfer.parse_token_transfer_payload(parsed_vaa.payload)
 
     wrapped_mint_key = deriveWrappedMintKey(
-        token_bridge_program_id,
+        deployment.token_bridge_program,
         token_transfer.token_chain,
         token_transfer.token_address
     )
 
     tmp_token_key = deriveTmpTokenAccountKey(
-        hello_token_program_id,
+        deployment.hello_token_program,
         wrapped_mint_key
     )
 
@@ -292,55 +597,56 @@ def getRedeemWrappedTransferAccounts(
     recipient_token_key = get_associated_token_address(recipient_key, wrapped_mint_key)
     payer_token_key = get_associated_token_address(payer, wrapped_mint_key)
 
-    redeemer_config_key = deriveRedeemerConfigKey(hello_token_program_id)
-    foreign_contract_key = deriveForeignContractKey(
-        hello_token_program_id,
-        parsed_vaa.emitter_chain
+    foreign_contract_key, foreign_endpoint_key = getForeignAccounts(
+        deployment,
+        foreign_table,
+        parsed_vaa.emitter_chain,
+        parsed_vaa.emitter_address
     )
 
     return {
-        "vaa": derivePostedVaaKey(wormhole_program_id, parsed_vaa.hash),
+        "vaa": derivePostedVaaKey(deployment.wormhole_program, parsed_vaa.hash),
         "tmp_token_key": tmp_token_key,
-        "redeemer_config_key": redeemer_config_key,
+        "redeemer_config_key": deployment.redeemer_config,
         "payer_token_key": payer_token_key,
         "recipient": recipient_key,
         "recipient_token_key": recipient_token_key,
         "foreign_contract_key": foreign_contract_key,
-        "token_bridge_config": deriveTokenBridgeConfigKey(token_bridge_program_id),
+        "token_bridge_config": deployment.token_bridge_config,
         "token_bridge_claim": deriveClaimKey(
-            token_bridge_program_id,
+            deployment.token_bridge_program,
             parsed_vaa.emitter_address,
             parsed_vaa.emitter_chain,
             parsed_vaa.sequence
         ),
-        "token_bridge_foreign_endpoint": deriveForeignEndPointKey(
-            token_bridge_program_id,
-            parsed_vaa.emitter_chain,
-            parsed_vaa.emitter_address
-        ),
+        "token_bridge_foreign_endpoint": foreign_endpoint_key,
         "token_bridge_wrapped_mint": wrapped_mint_key,
         "token_bridge_wrapped_meta": deriveWrappedMetaKey(
-            token_bridge_program_id,
+            deployment.token_bridge_program,
             wrapped_mint_key
         ),
-        "token_bridge_mint_authority": deriveMintAuthorityKey(token_bridge_program_id),
-        "wormhole_program": Pubkey.from_string(wormhole_program_id),
-        "token_bridge_program": Pubkey.from_string(token_bridge_program_id)
+        "token_bridge_mint_authority": deployment.token_bridge_mint_authority,
+        "wormhole_program": deployment.wormhole_program,
+        "token_bridge_program": deployment.token_bridge_program
     }
 
 def getRedeemNativeTransferAccounts(
-        token_bridge_program_id: str,
-        wormhole_program_id: str,
-        hello_token_program_id: str,
+        token_bridge_program_id: Optional[str],
+        wormhole_program_id: Optional[str],
+        hello_token_program_id: Optional[str],
         payer: Pubkey,
-        vaa: Union[str, bytes],
-        native_mint: Pubkey
+        vaa: Union[bytes, memoryview, str],
+        native_mint: Pubkey,
+        deployment: Deployment = None,
+        foreign_table: ForeignContractTable = None
 ):
-    parsed_vaa = ParsedVaa.parse_vaa(vaa)
+    deployment = resolveDeployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id, deployment)
+
+    parsed_vaa = LazyParsedVaa.parse_vaa(vaa)
     token_transfer = TokenTransfer.parse_token_transfer_payload(parsed_vaa.payload)
 
     tmp_token_key = deriveTmpTokenAccountKey(
-        hello_token_program_id,
+        deployment.hello_token_program,
         native_mint
     )
 
@@ -349,149 +655,127 @@ def getRedeemNativeTransferAccounts(
     recipient_token_key = get_associated_token_address(recipient_key, native_mint)
     payer_token_key = get_associated_token_address(payer, native_mint)
 
-    redeemer_config_key = deriveRedeemerConfigKey(hello_token_program_id)
-    foreign_contract_key = deriveForeignContractKey(
-        hello_token_program_id,
-        parsed_vaa.emitter_chain
+    foreign_contract_key, foreign_endpoint_key = getForeignAccounts(
+        deployment,
+        foreign_table,
+        parsed_vaa.emitter_chain,
+        parsed_vaa.emitter_address
     )
 
 
     return {
         "payer_token_account": payer_token_key,
-        "redeemer_config": redeemer_config_key,
+        "redeemer_config": deployment.redeemer_config,
         "foreign_contract": foreign_contract_key,
         "recipient_token_account": recipient_token_key,
         "recipient": recipient_key,
         "tmp_token_account": tmp_token_key,
-        "wormhole_program": Pubkey.from_string(wormhole_program_id),
-        "token_bridge_program": Pubkey.from_string(token_bridge_program_id),
-        "token_bridge_config": deriveTokenBridgeConfigKey(token_bridge_program_id),
-        "vaa": derivePostedVaaKey(wormhole_program_id, parsed_vaa.hash),
+        "wormhole_program": deployment.wormhole_program,
+        "token_bridge_program": deployment.token_bridge_program,
+        "token_bridge_config": deployment.token_bridge_config,
+        "vaa": derivePostedVaaKey(deployment.wormhole_program, parsed_vaa.hash),
         "token_bridge_claim": deriveClaimKey(
-            token_bridge_program_id,
+            deployment.token_bridge_program,
             parsed_vaa.emitter_address,
             parsed_vaa.emitter_chain,
             parsed_vaa.sequence
         ),
-        "token_bridge_foreign_endpoint": deriveForeignEndPointKey(
-            token_bridge_program_id,
-            parsed_vaa.emitter_chain,
-            parsed_vaa.emitter_address
-        ),
+        "token_bridge_foreign_endpoint": foreign_endpoint_key,
         "token_bridge_custody": deriveCustodyKey(
-            token_bridge_program_id,
+            deployment.token_bridge_program,
             native_mint
         ),
-        "token_bridge_custody_signer": deriveCustodySignerKey(
-            token_bridge_program_id
-        )
+        "token_bridge_custody_signer": deployment.token_bridge_custody_signer
     }
 
 def getSendWrappedTransferAccounts(
-        token_bridge_program_id: str,
-        wormhole_program_id: str,
-        hello_token_program_id: str,
+        token_bridge_program_id: Optional[str],
+        wormhole_program_id: Optional[str],
+        hello_token_program_id: Optional[str],
         recipient_chain: int,
         recipient_token: bytes,
+        deployment: Deployment = None,
+        foreign_table: ForeignContractTable = None
 ):
+    deployment = resolveDeployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id, deployment)
+
     wrapped_mint_key = deriveWrappedMintKey(
-        token_bridge_program_id,
+        deployment.token_bridge_program,
         recipient_chain,
         recipient_token
     )
 
     tmp_token_key = deriveTmpTokenAccountKey(
-        hello_token_program_id,
+        deployment.hello_token_program,
         wrapped_mint_key
     )
 
-    send_config_key = deriveSenderConfigKey(hello_token_program_id)
-
-    foreign_contract_key = deriveForeignContractKey(
-        hello_token_program_id,
+    foreign_contract_key, _foreign_endpoint_key = getForeignAccounts(
+        deployment,
+        foreign_table,
         recipient_chain
     )
 
-    token_bridge_emitter, token_bridge_sequence = getEmitterKeys(
-        token_bridge_program_id,
-        wormhole_program_id
-    )
-
-    bridge_data_key = deriveWormholeBridgeDataKey(wormhole_program_id)
-    fee_collector_key = deriveFeeCollectorKey(wormhole_program_id)
-
-    authority_signer_key = deriveAuthoritySignerKey(token_bridge_program_id)
-
     return {
-        "send_config": send_config_key,
+        "send_config": deployment.sender_config,
         "foreign_contract": foreign_contract_key,
         "token_bridge_wrapped_mint": wrapped_mint_key,
         "tmp_token_account": tmp_token_key,
-        "wormhole_program": Pubkey.from_string(wormhole_program_id),
-        "token_bridge_program": Pubkey.from_string(token_bridge_program_id),
+        "wormhole_program": deployment.wormhole_program,
+        "token_bridge_program": deployment.token_bridge_program,
         "token_bridge_wrapped_meta": deriveWrappedMetaKey(
-            token_bridge_program_id,
+            deployment.token_bridge_program,
             wrapped_mint_key
         ),
-        "token_bridge_config": deriveTokenBridgeConfigKey(token_bridge_program_id),
-        "token_bridge_authority_signer": authority_signer_key,
-        "wormhole_bridge": bridge_data_key,
-        "token_bridge_emitter": token_bridge_emitter,
-        "token_bridge_sequence": token_bridge_sequence,
-        "wormhole_fee_collector": fee_collector_key,
+        "token_bridge_config": deployment.token_bridge_config,
+        "token_bridge_authority_signer": deployment.token_bridge_authority_signer,
+        "wormhole_bridge": deployment.wormhole_bridge,
+        "token_bridge_emitter": deployment.token_bridge_emitter,
+        "token_bridge_sequence": deployment.token_bridge_sequence,
+        "wormhole_fee_collector": deployment.wormhole_fee_collector,
     }
 
 def getSendNativeTransferAccounts(
-        token_bridge_program_id: str,
-        wormhole_program_id: str,
-        hello_token_program_id: str,
+        token_bridge_program_id: Optional[str],
+        wormhole_program_id: Optional[str],
+        hello_token_program_id: Optional[str],
         recipient_chain: int,
-        native_mint_key: Pubkey
+        native_mint_key: Pubkey,
+        deployment: Deployment = None,
+        foreign_table: ForeignContractTable = None
 ):
+    deployment = resolveDeployment(token_bridge_program_id, wormhole_program_id, hello_token_program_id, deployment)
+
     tmp_token_key = deriveTmpTokenAccountKey(
-        hello_token_program_id,
+        deployment.hello_token_program,
         native_mint_key
     )
 
-    send_config_key = deriveSenderConfigKey(hello_token_program_id)
-
-    foreign_contract_key = deriveForeignContractKey(
-        hello_token_program_id,
+    foreign_contract_key, _foreign_endpoint_key = getForeignAccounts(
+        deployment,
+        foreign_table,
         recipient_chain
     )
 
-    token_bridge_emitter, token_bridge_sequence = getEmitterKeys(
-        token_bridge_program_id,
-        wormhole_program_id
-    )
-
-    bridge_data_key = deriveWormholeBridgeDataKey(wormhole_program_id)
-    fee_collector_key = deriveFeeCollectorKey(wormhole_program_id)
-
-    authority_signer_key = deriveAuthoritySignerKey(token_bridge_program_id)
-
-    token_bridge_config = deriveTokenBridgeConfigKey(token_bridge_program_id)
     token_bridge_custody = deriveCustodyKey(
-        token_bridge_program_id,
+        deployment.token_bridge_program,
         native_mint_key
     )
 
-    custody_signer_key = deriveCustodySignerKey(token_bridge_program_id)
-
     return {
-        "send_config": send_config_key,
+        "send_config": deployment.sender_config,
         "foreign_contract": foreign_contract_key,
         "tmp_token_account": tmp_token_key,
-        "wormhole_program": Pubkey.from_string(wormhole_program_id),
-        "token_bridge_program": Pubkey.from_string(token_bridge_program_id),
-        "token_bridge_config": token_bridge_config,
+        "wormhole_program": deployment.wormhole_program,
+        "token_bridge_program": deployment.token_bridge_program,
+        "token_bridge_config": deployment.token_bridge_config,
         "token_bridge_custody": token_bridge_custody,
-        "token_bridge_authority_signer": authority_signer_key,
-        "token_bridge_custody_signer": custody_signer_key,
-        "wormhole_bridge": bridge_data_key,
-        "token_bridge_emitter": token_bridge_emitter,
-        "token_bridge_sequence": token_bridge_sequence,
-        "wormhole_fee_collector": fee_collector_key
+        "token_bridge_authority_signer": deployment.token_bridge_authority_signer,
+        "token_bridge_custody_signer": deployment.token_bridge_custody_signer,
+        "wormhole_bridge": deployment.wormhole_bridge,
+        "token_bridge_emitter": deployment.token_bridge_emitter,
+        "token_bridge_sequence": deployment.token_bridge_sequence,
+        "wormhole_fee_collector": deployment.wormhole_fee_collector
     }
 
 class ParsedVaa:
@@ -546,11 +830,8 @@ class ParsedVaa:
         }
 
     @classmethod
-    def parse_vaa(cls, vaa: Union[bytes, str]):
-        if isinstance(vaa, str):
-            signed_vaa = bytearray(bytes.fromhex(vaa.replace("0x", "")))
-        else:
-            signed_vaa = bytearray(vaa)
+    def parse_vaa(cls, vaa: Union[bytes, bytearray, memoryview, str]):
+        signed_vaa = memoryview(toBytes(vaa) if isinstance(vaa, str) else vaa).cast("B")
 
         sig_start = 6
         num_signers = signed_vaa[5]
@@ -577,14 +858,105 @@ class ParsedVaa:
             int.from_bytes(body[42:50], byteorder="big"),
             body[50],
             bytes(body[51:]),
-            keccak(body)
+            keccak(body.tobytes())
         )
 
 
+class LazyParsedVaa:
+    # same interface as ParsedVaa, but fields are decoded from the signed VAA on access
+    __slots__ = ("_vaa", "_body_start", "_guardian_signatures", "_hash")
+
+    _SIG_START = 6
+    _SIG_LENGTH = 66
+    _U16 = struct.Struct(">H")
+    _U32 = struct.Struct(">I")
+    _U64 = struct.Struct(">Q")
+
+    def __init__(self, vaa: memoryview):
+        self._vaa = vaa
+        self._body_start = self._SIG_START + self._SIG_LENGTH * vaa[5]
+        self._guardian_signatures = None
+        self._hash = None
+
+    @classmethod
+    def parse_vaa(cls, vaa: Union[bytes, bytearray, memoryview, str]):
+        if isinstance(vaa, str):
+            vaa = toBytes(vaa)
+        return cls(memoryview(vaa).cast("B"))
+
+    @property
+    def raw(self) -> memoryview:
+        return self._vaa
+
+    @property
+    def version(self):
+        return self._vaa[0]
+
+    @property
+    def guardian_set_index(self):
+        return self._U32.unpack_from(self._vaa, 1)[0]
+
+    @property
+    def guardian_signatures(self):
+        if self._guardian_signatures is None:
+            vaa = self._vaa
+            signatures = []
+            for start in range(self._SIG_START, self._body_start, self._SIG_LENGTH):
+                signatures.append({
+                    "index": vaa[start],
+                    "signature": bytes(vaa[start + 1:start + self._SIG_LENGTH]),
+                })
+            self._guardian_signatures = signatures
+        return self._guardian_signatures
+
+    @property
+    def body(self) -> memoryview:
+        return self._vaa[self._body_start:]
+
+    @property
+    def timestamp(self):
+        return self._U32.unpack_from(self._vaa, self._body_start)[0]
+
+    @property
+    def nonce(self):
+        return self._U32.unpack_from(self._vaa, self._body_start + 4)[0]
+
+    @property
+    def emitter_chain(self):
+        return self._U16.unpack_from(self._vaa, self._body_start + 8)[0]
+
+    @property
+    def emitter_address(self) -> memoryview:
+        return self._vaa[self._body_start + 10:self._body_start + 42]
+
+    @property
+    def sequence(self):
+        return self._U64.unpack_from(self._vaa, self._body_start + 42)[0]
+
+    @property
+    def consistency_level(self):
+        return self._vaa[self._body_start + 50]
+
+    @property
+    def payload(self) -> memoryview:
+        return self._vaa[self._body_start + 51:]
+
+    @property
+    def hash(self) -> bytes:
+        if self._hash is None:
+            self._hash = keccak(self.body.tobytes())
+        return self._hash
+
+    def __str__(self):
+        return json.dumps(self.format_json(), indent=2)
+
+    format_json = ParsedVaa.format_json
+
+
 class TokenTransfer:
-    Transfer = 1
-    AttestMeta = 2
-    TransferWithPayload = 3
+    Transfer = payloads.TRANSFER
+    AttestMeta = payloads.ATTEST_META
+    TransferWithPayload = payloads.TRANSFER_WITH_PAYLOAD
 
     def __init__(
             self,
@@ -617,7 +989,7 @@ class TokenTransfer:
             "amount": self.amount,
             "tokenAddress": "0x"+self.token_address.hex(),
             "tokenChain": self.token_chain,
-            "redeemer": b58encode(self.redeemer).decode("utf-8") if self.redeemer_chain == 1 else "0x"+self.redeemer.hex(),
+            "redeemer": b58encode(bytes(self.redeemer)).decode("utf-8") if self.redeemer_chain == 1 else "0x"+self.redeemer.hex(),
             "redeemerChain": self.redeemer_chain,
             "fee": self.fee,
             "fromEmitter": "0x"+self.from_emitter.hex(),
@@ -625,61 +997,42 @@ class TokenTransfer:
         }
 
     @classmethod
-    def parse_token_transfer_payload(cls, payload: Union[bytes, str]):
-        if isinstance(payload, str):
-            payload = bytes.fromhex(payload.replace("0x", ""))
-
-        payload_type = payload[0]
-        if payload_type not in (cls.Transfer, cls.TransferWithPayload):
-            raise ValueError("not token bridge transfer VAA")
-
-        amount_bytes = payload[1:33]
-        amount = int.from_bytes(amount_bytes, byteorder='big')
-
-        token_address = payload[33:65]
-
-        token_chain_bytes = payload[65:67]
-        token_chain = int.from_bytes(token_chain_bytes, byteorder='big')
-
-        redeemer = payload[67:99]
-
-        redeemer_chain_bytes = payload[99:101]
-        redeemer_chain = int.from_bytes(redeemer_chain_bytes, byteorder='big')
-
-        if payload_type == cls.Transfer:
-            fee_bytes = payload[101:133]
-            fee = int.from_bytes(fee_bytes, byteorder='big')
-        else:
-            fee = None
-
-        if payload_type == cls.TransferWithPayload:
-            from_emitter = payload[101:133]
-        else:
-            from_emitter = None
-
-        token_transfer_payload = payload[133:]
-
-        return TokenTransfer(
-            payload_type,
-            amount,
-            token_address,
-            token_chain,
-            redeemer,
-            redeemer_chain,
-            fee,
-            from_emitter,
-            token_transfer_payload
-        )
+    def parse_token_transfer_payload(cls, payload: Union[bytes, memoryview, str]):
+        # the payloads registry does the decoding, this keeps the redeem-side field names
+        record = decode_payload(payload)
+        if isinstance(record, payloads.Transfer):
+            return TokenTransfer(
+                record.payload_id,
+                record.amount,
+                record.token_address,
+                record.token_chain,
+                record.to,
+                record.to_chain,
+                record.fee,
+                None,
+                b""
+            )
+        if isinstance(record, payloads.TransferWithPayload):
+            return TokenTransfer(
+                record.payload_id,
+                record.amount,
+                record.token_address,
+                record.token_chain,
+                record.to,
+                record.to_chain,
+                None,
+                record.from_address,
+                record.payload
+            )
+        raise ValueError("not token bridge transfer VAA")
 
     def recipient(self):
         assert len(self.token_transfer_payload) == 33, "decode recipient fail"
 
-        print(f"recipient: {b58encode(self.token_transfer_payload[1:]).decode()}")
-
-        return self.token_transfer_payload[1:]
+        return bytes(self.token_transfer_payload[1:])
 
 
-def parseTokenTransferVaa(vaa: Union[bytes, str]):
+def parseTokenTransferVaa(vaa: Union[bytes, memoryview, str]):
     parsed = ParsedVaa.parse_vaa(vaa)
     token_transfer = TokenTransfer.parse_token_transfer_payload(parsed.payload)
 
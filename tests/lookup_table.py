@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import struct
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solana.transaction import Transaction
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.system_program import ID as SYS_PROGRAM_ID
+from solders.sysvar import CLOCK, RENT
+from solders.transaction import VersionedTransaction
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+from blockhash import SLOT_SECONDS
+from help import Deployment, findProgramAddress
+
+ADDRESS_LOOKUP_TABLE_PROGRAM_ID = Pubkey.from_string("AddressLookupTab1e1111111111111111111111111")
+
+# ProgramInstruction variants, bincode encoded with a u32 tag
+_CREATE_LOOKUP_TABLE = 0
+_EXTEND_LOOKUP_TABLE = 2
+
+# type tag, deactivation_slot, last_extended_slot, last_extended_slot_start_index,
+# authority option + key, padding
+LOOKUP_TABLE_META_SIZE = 56
+
+# keeps an extend transaction well under the packet size limit
+MAX_ADDRESSES_PER_EXTEND = 20
+
+
+def deriveLookupTableAddress(authority: Pubkey, recent_slot: int) -> Tuple[Pubkey, int]:
+    return findProgramAddress(
+        [bytes(authority), recent_slot.to_bytes(length=8, byteorder="little", signed=False)],
+        ADDRESS_LOOKUP_TABLE_PROGRAM_ID
+    )
+
+
+def create_lookup_table(authority: Pubkey, payer: Pubkey, recent_slot: int) -> Tuple[Instruction, Pubkey]:
+    lookup_table, bump = deriveLookupTableAddress(authority, recent_slot)
+    data = struct.pack("<IQB", _CREATE_LOOKUP_TABLE, recent_slot, bump)
+    keys = [
+        AccountMeta(pubkey=lookup_table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    return Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM_ID, data, keys), lookup_table
+
+
+def extend_lookup_table(
+        lookup_table: Pubkey,
+        authority: Pubkey,
+        payer: Pubkey,
+        new_addresses: Sequence[Pubkey]
+) -> Instruction:
+    data = struct.pack("<IQ", _EXTEND_LOOKUP_TABLE, len(new_addresses)) + b"".join(
+        bytes(address) for address in new_addresses
+    )
+    keys = [
+        AccountMeta(pubkey=lookup_table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    return Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM_ID, data, keys)
+
+
+def decode_lookup_table_addresses(data: bytes) -> List[Pubkey]:
+    data = memoryview(data)
+    return [
+        Pubkey.from_bytes(bytes(data[start:start + 32]))
+        for start in range(LOOKUP_TABLE_META_SIZE, len(data) - 31, 32)
+    ]
+
+
+def static_accounts(deployment: Deployment) -> List[Pubkey]:
+    # accounts every HelloToken send / redeem references regardless of mint or VAA
+    return [
+        deployment.hello_token_program,
+        deployment.token_bridge_program,
+        deployment.wormhole_program,
+        deployment.sender_config,
+        deployment.redeemer_config,
+        deployment.token_bridge_config,
+        deployment.token_bridge_authority_signer,
+        deployment.token_bridge_custody_signer,
+        deployment.token_bridge_mint_authority,
+        deployment.wormhole_bridge,
+        deployment.wormhole_fee_collector,
+        deployment.token_bridge_emitter,
+        deployment.token_bridge_sequence,
+        SYS_PROGRAM_ID,
+        TOKEN_PROGRAM_ID,
+        ASSOCIATED_TOKEN_PROGRAM_ID,
+        RENT,
+        CLOCK,
+    ]
+
+
+def compile_v0(
+        payer: Keypair,
+        instructions: Sequence[Instruction],
+        lookup_tables: Sequence[AddressLookupTableAccount],
+        recent_blockhash: Hash,
+        signers: Sequence[Keypair] = ()
+) -> VersionedTransaction:
+    message = MessageV0.try_compile(payer.pubkey(), list(instructions), list(lookup_tables), recent_blockhash)
+    return VersionedTransaction(message, [payer, *signers])
+
+
+class LookupTableManager:
+    # creates, extends and remembers one address lookup table owned by the payer.
+    # The table address is cached in a small json file so restarts reuse it.
+
+    def __init__(
+            self,
+            client: AsyncClient,
+            payer: Keypair,
+            path: Optional[str] = None,
+            commitment: Commitment = Confirmed
+    ):
+        self.client = client
+        self.payer = payer
+        self.path = path
+        self.commitment = commitment
+        self.address: Optional[Pubkey] = None
+        self.addresses: List[Pubkey] = []
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                cached = json.load(file)
+            if cached.get("authority") == str(payer.pubkey()):
+                self.address = Pubkey.from_string(cached["address"])
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"authority": str(self.payer.pubkey()), "address": str(self.address)}, file)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def account(self) -> Optional[AddressLookupTableAccount]:
+        if self.address is None:
+            return None
+        return AddressLookupTableAccount(key=self.address, addresses=self.addresses)
+
+    async def load(self) -> List[Pubkey]:
+        resp = await self.client.get_account_info(self.address, self.commitment)
+        if resp.value is None:
+            raise ValueError(f"lookup table {self.address} does not exist")
+        self.addresses = decode_lookup_table_addresses(resp.value.data)
+        return self.addresses
+
+    async def _send(self, *instructions: Instruction):
+        tx = Transaction(fee_payer=self.payer.pubkey())
+        for ix in instructions:
+            tx.add(ix)
+        resp = await self.client.send_transaction(tx, self.payer)
+        await self.client.confirm_transaction(resp.value, self.commitment)
+
+    async def ensure(self, addresses: Iterable[Pubkey]) -> AddressLookupTableAccount:
+        # makes sure every address is in the table, creating it first if needed
+        if self.address is not None:
+            try:
+                await self.load()
+            except ValueError:
+                self.address = None
+                self.addresses = []
+
+        known = set(self.addresses)
+        missing = [address for address in dict.fromkeys(addresses) if address not in known]
+        payer = self.payer.pubkey()
+
+        if self.address is None:
+            slot = (await self.client.get_slot(self.commitment)).value
+            create_ix, self.address = create_lookup_table(payer, payer, slot)
+            first, missing = missing[:MAX_ADDRESSES_PER_EXTEND], missing[MAX_ADDRESSES_PER_EXTEND:]
+            await self._send(create_ix, extend_lookup_table(self.address, payer, payer, first))
+            self.addresses = list(first)
+            self._save()
+
+        for start in range(0, len(missing), MAX_ADDRESSES_PER_EXTEND):
+            chunk = missing[start:start + MAX_ADDRESSES_PER_EXTEND]
+            await self._send(extend_lookup_table(self.address, payer, payer, chunk))
+            self.addresses.extend(chunk)
+
+        if len(self.addresses) > len(known):
+            # new entries can only be used from the slot after they were added
+            await asyncio.sleep(SLOT_SECONDS)
+        return self.account
@@ -0,0 +1,159 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.message import Message
+from solders.pubkey import Pubkey
+
+# maximum serialized transaction size, signatures included
+PACKET_DATA_SIZE = 1232
+
+# per transaction compute unit cap
+MAX_COMPUTE_UNITS = 1_400_000
+
+# compute units a legacy transaction gets per instruction without a compute budget instruction
+DEFAULT_INSTRUCTION_UNITS = 200_000
+
+_SIGNATURE_SIZE = 64
+_KEY_SIZE = 32
+_HEADER_SIZE = 3
+_BLOCKHASH_SIZE = 32
+
+
+def compact_u16_size(value: int) -> int:
+    # length of the shortvec prefix Solana uses for every array in a message
+    if value < 0x80:
+        return 1
+    if value < 0x4000:
+        return 2
+    return 3
+
+
+def instruction_size(ix: Instruction) -> int:
+    # program id index, account indexes and data; keys themselves are counted once per message
+    return (
+        1
+        + compact_u16_size(len(ix.accounts)) + len(ix.accounts)
+        + compact_u16_size(len(ix.data)) + len(ix.data)
+    )
+
+
+def _message_size(signers: int, keys: int, instructions: int, body: int) -> int:
+    return (
+        compact_u16_size(signers) + _SIGNATURE_SIZE * signers
+        + _HEADER_SIZE
+        + compact_u16_size(keys) + _KEY_SIZE * keys
+        + _BLOCKHASH_SIZE
+        + compact_u16_size(instructions) + body
+    )
+
+
+def transaction_size(payer: Pubkey, instructions: Sequence[Instruction]) -> int:
+    # exact size of the signed legacy transaction carrying these instructions
+    batch = _Batch(payer)
+    for ix in instructions:
+        batch.add(ix, 0)
+    return batch.size()
+
+
+class _Batch:
+    __slots__ = ("instructions", "keys", "signers", "body", "units")
+
+    def __init__(self, payer: Pubkey):
+        self.instructions: List[Instruction] = []
+        # the fee payer always signs, program ids and accounts are deduplicated into one key list
+        self.keys: Set[Pubkey] = {payer}
+        self.signers: Set[Pubkey] = {payer}
+        self.body = 0
+        self.units = 0
+
+    def size(self) -> int:
+        return _message_size(len(self.signers), len(self.keys), len(self.instructions), self.body)
+
+    def size_with(self, ix: Instruction) -> int:
+        keys = self.keys | {ix.program_id} | {meta.pubkey for meta in ix.accounts}
+        signers = self.signers | {meta.pubkey for meta in ix.accounts if meta.is_signer}
+        return _message_size(len(signers), len(keys), len(self.instructions) + 1, self.body + instruction_size(ix))
+
+    def add(self, ix: Instruction, units: int):
+        self.instructions.append(ix)
+        self.keys.add(ix.program_id)
+        for meta in ix.accounts:
+            self.keys.add(meta.pubkey)
+            if meta.is_signer:
+                self.signers.add(meta.pubkey)
+        self.body += instruction_size(ix)
+        self.units += units
+
+
+class TransactionPacker:
+    # collects instructions and first-fit packs them into as few legacy transactions
+    # as the packet size and compute budget allow. An instruction added with `after`
+    # lands either later in the same transaction or in a later transaction than each
+    # of the handles it depends on, so transactions must be sent in order.
+
+    def __init__(
+            self,
+            payer: Pubkey,
+            max_size: int = PACKET_DATA_SIZE,
+            compute_budget: int = MAX_COMPUTE_UNITS
+    ):
+        self.payer = payer
+        self.max_size = max_size
+        self.compute_budget = compute_budget
+        self._instructions: List[Instruction] = []
+        self._units: List[int] = []
+        self._after: List[Sequence[int]] = []
+
+    def __len__(self):
+        return len(self._instructions)
+
+    @property
+    def has_dependencies(self) -> bool:
+        # when True the packed transactions have to land one after another
+        return any(self._after)
+
+    def add(self, ix: Instruction, units: int = DEFAULT_INSTRUCTION_UNITS, after: Iterable[int] = ()) -> int:
+        # returns a handle other instructions can depend on
+        after = tuple(after)
+        handle = len(self._instructions)
+        for dependency in after:
+            if not 0 <= dependency < handle:
+                raise ValueError(f"unknown dependency {dependency}")
+        if units > self.compute_budget:
+            raise ValueError(f"instruction needs {units} compute units, budget is {self.compute_budget}")
+        if transaction_size(self.payer, [ix]) > self.max_size:
+            raise ValueError("instruction does not fit in a transaction on its own")
+        self._instructions.append(ix)
+        self._units.append(units)
+        self._after.append(after)
+        return handle
+
+    def extend(self, instructions: Iterable[Instruction], units: int = DEFAULT_INSTRUCTION_UNITS) -> List[int]:
+        return [self.add(ix, units) for ix in instructions]
+
+    def pack(self) -> List[List[Instruction]]:
+        batches: List[_Batch] = []
+        placed: Dict[int, int] = {}
+        for handle, ix in enumerate(self._instructions):
+            units = self._units[handle]
+            earliest = max((placed[dependency] for dependency in self._after[handle]), default=0)
+            target: Optional[int] = None
+            for index in range(earliest, len(batches)):
+                batch = batches[index]
+                if batch.units + units <= self.compute_budget and batch.size_with(ix) <= self.max_size:
+                    target = index
+                    break
+            if target is None:
+                batches.append(_Batch(self.payer))
+                target = len(batches) - 1
+            batches[target].add(ix, units)
+            placed[handle] = target
+        return [batch.instructions for batch in batches]
+
+    def messages(self, recent_blockhash: Hash) -> List[Message]:
+        # ready to sign, in the order they have to be sent
+        return [
+            Message.new_with_blockhash(instructions, self.payer, recent_blockhash)
+            for instructions in self.pack()
+        ]
@@ -0,0 +1,236 @@
+import struct
+from collections import Counter
+from typing import Callable, Dict, Optional, Union
+
+from base58 import b58encode
+
+# token bridge payload ids
+TRANSFER = 1
+ATTEST_META = 2
+TRANSFER_WITH_PAYLOAD = 3
+
+# payload_id, amount, token_address, token_chain, to, to_chain, fee / from_address
+_TRANSFER_LAYOUT = struct.Struct(">B32s32sH32sH32s")
+# payload_id, token_address, token_chain, decimals, symbol, name
+_ATTEST_META_LAYOUT = struct.Struct(">B32sHB32s32s")
+
+
+def _u256(raw: bytes) -> int:
+    return int.from_bytes(raw, byteorder="big")
+
+
+def _padded_string(raw: bytes) -> str:
+    return raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+
+
+def _address_json(address: bytes, chain: int) -> str:
+    return b58encode(address).decode("utf-8") if chain == 1 else "0x" + address.hex()
+
+
+class Transfer:
+    __slots__ = ("amount", "token_address", "token_chain", "to", "to_chain", "fee")
+
+    payload_id = TRANSFER
+
+    def __init__(self, amount, token_address, token_chain, to, to_chain, fee):
+        self.amount = amount
+        self.token_address = token_address
+        self.token_chain = token_chain
+        self.to = to
+        self.to_chain = to_chain
+        self.fee = fee
+
+    def format_json(self):
+        return {
+            "payloadType": self.payload_id,
+            "amount": self.amount,
+            "tokenAddress": "0x" + self.token_address.hex(),
+            "tokenChain": self.token_chain,
+            "to": _address_json(self.to, self.to_chain),
+            "toChain": self.to_chain,
+            "fee": self.fee,
+        }
+
+
+class AttestMeta:
+    __slots__ = ("token_address", "token_chain", "decimals", "symbol_bytes", "name_bytes")
+
+    payload_id = ATTEST_META
+
+    def __init__(self, token_address, token_chain, decimals, symbol_bytes, name_bytes):
+        self.token_address = token_address
+        self.token_chain = token_chain
+        self.decimals = decimals
+        self.symbol_bytes = symbol_bytes
+        self.name_bytes = name_bytes
+
+    @property
+    def symbol(self) -> str:
+        return _padded_string(self.symbol_bytes)
+
+    @property
+    def name(self) -> str:
+        return _padded_string(self.name_bytes)
+
+    def format_json(self):
+        return {
+            "payloadType": self.payload_id,
+            "tokenAddress": "0x" + self.token_address.hex(),
+            "tokenChain": self.token_chain,
+            "decimals": self.decimals,
+            "symbol": self.symbol,
+            "name": self.name,
+        }
+
+
+class TransferWithPayload:
+    __slots__ = ("amount", "token_address", "token_chain", "to", "to_chain", "from_address", "payload")
+
+    payload_id = TRANSFER_WITH_PAYLOAD
+
+    def __init__(self, amount, token_address, token_chain, to, to_chain, from_address, payload):
+        self.amount = amount
+        self.token_address = token_address
+        self.token_chain = token_chain
+        self.to = to
+        self.to_chain = to_chain
+        self.from_address = from_address
+        self.payload = payload
+
+    def format_json(self):
+        return {
+            "payloadType": self.payload_id,
+            "amount": self.amount,
+            "tokenAddress": "0x" + self.token_address.hex(),
+            "tokenChain": self.token_chain,
+            "to": _address_json(self.to, self.to_chain),
+            "toChain": self.to_chain,
+            "fromAddress": "0x" + self.from_address.hex(),
+            "payload": "0x" + self.payload.hex(),
+        }
+
+
+def decode_transfer(payload: memoryview) -> Transfer:
+    _, amount, token_address, token_chain, to, to_chain, fee = _TRANSFER_LAYOUT.unpack_from(payload)
+    return Transfer(_u256(amount), token_address, token_chain, to, to_chain, _u256(fee))
+
+
+def decode_attest_meta(payload: memoryview) -> AttestMeta:
+    _, token_address, token_chain, decimals, symbol, name = _ATTEST_META_LAYOUT.unpack_from(payload)
+    return AttestMeta(token_address, token_chain, decimals, symbol, name)
+
+
+def decode_transfer_with_payload(payload: memoryview) -> TransferWithPayload:
+    _, amount, token_address, token_chain, to, to_chain, from_address = _TRANSFER_LAYOUT.unpack_from(payload)
+    return TransferWithPayload(
+        _u256(amount),
+        token_address,
+        token_chain,
+        to,
+        to_chain,
+        from_address,
+        payload[_TRANSFER_LAYOUT.size:]
+    )
+
+
+def pack_transfer_into(buffer, offset: int, amount: int, token_address: bytes, token_chain: int,
+                       to: bytes, to_chain: int, fee: int) -> int:
+    _TRANSFER_LAYOUT.pack_into(
+        buffer, offset, TRANSFER, amount.to_bytes(32, "big"), token_address, token_chain, to, to_chain,
+        fee.to_bytes(32, "big")
+    )
+    return _TRANSFER_LAYOUT.size
+
+
+def pack_attest_meta_into(buffer, offset: int, token_address: bytes, token_chain: int, decimals: int,
+                          symbol: Union[str, bytes], name: Union[str, bytes]) -> int:
+    if isinstance(symbol, str):
+        symbol = symbol.encode("utf-8")
+    if isinstance(name, str):
+        name = name.encode("utf-8")
+    _ATTEST_META_LAYOUT.pack_into(buffer, offset, ATTEST_META, token_address, token_chain, decimals, symbol, name)
+    return _ATTEST_META_LAYOUT.size
+
+
+def pack_transfer_with_payload_into(buffer, offset: int, amount: int, token_address: bytes, token_chain: int,
+                                    to: bytes, to_chain: int, from_address: bytes, payload: bytes) -> int:
+    _TRANSFER_LAYOUT.pack_into(
+        buffer, offset, TRANSFER_WITH_PAYLOAD, amount.to_bytes(32, "big"), token_address, token_chain, to,
+        to_chain, from_address
+    )
+    start = offset + _TRANSFER_LAYOUT.size
+    buffer[start:start + len(payload)] = payload
+    return _TRANSFER_LAYOUT.size + len(payload)
+
+
+def encode_transfer(amount, token_address, token_chain, to, to_chain, fee) -> bytes:
+    buffer = bytearray(_TRANSFER_LAYOUT.size)
+    pack_transfer_into(buffer, 0, amount, token_address, token_chain, to, to_chain, fee)
+    return bytes(buffer)
+
+
+def encode_attest_meta(token_address, token_chain, decimals, symbol, name) -> bytes:
+    buffer = bytearray(_ATTEST_META_LAYOUT.size)
+    pack_attest_meta_into(buffer, 0, token_address, token_chain, decimals, symbol, name)
+    return bytes(buffer)
+
+
+def encode_transfer_with_payload(amount, token_address, token_chain, to, to_chain, from_address, payload) -> bytes:
+    buffer = bytearray(_TRANSFER_LAYOUT.size + len(payload))
+    pack_transfer_with_payload_into(buffer, 0, amount, token_address, token_chain, to, to_chain, from_address, payload)
+    return bytes(buffer)
+
+
+def transfer_with_payload_size(payload_length: int) -> int:
+    return _TRANSFER_LAYOUT.size + payload_length
+
+
+class PayloadRegistry:
+    def __init__(self):
+        self._decoders: Dict[int, Callable[[memoryview], object]] = {}
+        self.decoded = Counter()
+        self.unknown = Counter()
+        self.malformed = Counter()
+
+    def register(self, payload_id: int, decoder: Callable[[memoryview], object]):
+        self._decoders[payload_id] = decoder
+
+    def decode(self, payload: Union[bytes, bytearray, memoryview, str]) -> Optional[object]:
+        if isinstance(payload, str):
+            payload = bytes.fromhex(payload.replace("0x", ""))
+        payload = memoryview(payload)
+        if len(payload) == 0:
+            self.malformed[None] += 1
+            return None
+
+        payload_id = payload[0]
+        decoder = self._decoders.get(payload_id)
+        if decoder is None:
+            self.unknown[payload_id] += 1
+            return None
+
+        try:
+            record = decoder(payload)
+        except struct.error:
+            self.malformed[payload_id] += 1
+            return None
+
+        self.decoded[payload_id] += 1
+        return record
+
+    def stats(self):
+        return {
+            "decoded": dict(self.decoded),
+            "unknown": dict(self.unknown),
+            "malformed": dict(self.malformed),
+        }
+
+
+token_bridge_payloads = PayloadRegistry()
+token_bridge_payloads.register(TRANSFER, decode_transfer)
+token_bridge_payloads.register(ATTEST_META, decode_attest_meta)
+token_bridge_payloads.register(TRANSFER_WITH_PAYLOAD, decode_transfer_with_payload)
+
+
+def decode_payload(payload: Union[bytes, bytearray, memoryview, str]) -> Optional[object]:
+    return token_bridge_payloads.decode(payload)
@@ -0,0 +1,122 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from solders.pubkey import Pubkey
+
+from help import (
+    claimSeeds,
+    pda_cache,
+    postedVaaSeeds,
+    toPubkey,
+    tokenTransferMessageSeeds,
+)
+
+
+class BatchDerivation:
+    def __init__(self, keys: List[Pubkey], elapsed: float, workers: int):
+        self.keys = keys
+        self.elapsed = elapsed
+        # processes the derivation actually ran on, 1 when it ran serially
+        self.workers = workers
+
+    @property
+    def throughput(self) -> float:
+        if self.elapsed <= 0:
+            return float("inf")
+        return len(self.keys) / self.elapsed
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, index):
+        return self.keys[index]
+
+    def __str__(self):
+        return f"derived {len(self.keys)} keys in {self.elapsed:.3f}s " \
+               f"({self.throughput:.0f} keys/s, workers={self.workers})"
+
+
+def _findChunk(program_id: bytes, chunk: List[List[bytes]]) -> List[Tuple[bytes, int]]:
+    # runs in the pool, straight bump searches without the shared cache or its store
+    program_id = Pubkey.from_bytes(program_id)
+    results = []
+    for seeds in chunk:
+        address, bump = Pubkey.find_program_address(seeds, program_id)
+        results.append((bytes(address), bump))
+    return results
+
+
+def _chunks(items: Sequence, chunk_size: int) -> Iterable[list]:
+    for start in range(0, len(items), chunk_size):
+        yield list(items[start:start + chunk_size])
+
+
+def _deriveBatch(
+        program_id: Union[str, Pubkey],
+        seeds: List[List[bytes]],
+        workers: Optional[int],
+        chunk_size: int
+) -> BatchDerivation:
+    workers = workers or os.cpu_count() or 1
+    program_id = bytes(toPubkey(program_id))
+    chunks = list(_chunks(seeds, chunk_size))
+
+    start = time.perf_counter()
+    if workers == 1 or len(chunks) <= 1:
+        used = 1
+        results = [_findChunk(program_id, chunk) for chunk in chunks]
+    else:
+        used = min(workers, len(chunks))
+        with ProcessPoolExecutor(max_workers=used) as executor:
+            # map() yields chunk results in submission order
+            results = list(executor.map(_findChunk, [program_id] * len(chunks), chunks))
+    found = [entry for chunk in results for entry in chunk]
+    keys = [Pubkey.from_bytes(address) for address, _bump in found]
+
+    # the parent records everything in one write instead of a write per key
+    if pda_cache.store is not None:
+        pda_cache.store.put_many([
+            (program_id, entry_seeds, address, bump)
+            for entry_seeds, (address, bump) in zip(seeds, found)
+        ])
+    elapsed = time.perf_counter() - start
+
+    return BatchDerivation(keys, elapsed, used)
+
+
+def deriveClaimKeys(
+        token_bridge_program_id: Union[str, Pubkey],
+        claims: Sequence[Tuple[Union[str, bytes], int, int]],
+        workers: Optional[int] = None,
+        chunk_size: int = 4096
+) -> BatchDerivation:
+    seeds = [claimSeeds(emitter_address, emitter_chain, sequence) for emitter_address, emitter_chain, sequence in claims]
+    return _deriveBatch(token_bridge_program_id, seeds, workers, chunk_size)
+
+
+def derivePostedVaaKeys(
+        wormhole_program_id: Union[str, Pubkey],
+        hashes: Sequence[Union[str, bytes]],
+        workers: Optional[int] = None,
+        chunk_size: int = 4096
+) -> BatchDerivation:
+    return _deriveBatch(wormhole_program_id, [postedVaaSeeds(vaa_hash) for vaa_hash in hashes], workers, chunk_size)
+
+
+def deriveTokenTransferMessageKeys(
+        hello_token_program_id: Union[str, Pubkey],
+        sequences: Sequence[int],
+        workers: Optional[int] = None,
+        chunk_size: int = 4096
+) -> BatchDerivation:
+    return _deriveBatch(
+        hello_token_program_id,
+        [tokenTransferMessageSeeds(next_seq) for next_seq in sequences],
+        workers,
+        chunk_size
+    )
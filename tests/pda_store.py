@@ -0,0 +1,196 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def encode_seeds(seeds: Sequence[bytes]) -> bytes:
+    # each seed is at most 32 bytes, so a one byte length prefix is enough
+    return b"".join(bytes([len(seed)]) + seed for seed in seeds)
+
+
+def decode_seeds(raw: bytes) -> Tuple[bytes, ...]:
+    seeds = []
+    i = 0
+    while i < len(raw):
+        length = raw[i]
+        seeds.append(raw[i + 1:i + 1 + length])
+        i += 1 + length
+    return tuple(seeds)
+
+
+# connection of the writer thread
+_writer_local = threading.local()
+
+# store hits refresh an entry's `used` time at most this often
+TOUCH_INTERVAL = 3600
+
+
+# sqlite in WAL mode, so relayer workers on one host can share the file. New entries
+# and store hits are buffered and handed to a writer thread flush_size at a time, so
+# deriving addresses never waits on a write transaction.
+class PdaStore:
+    def __init__(self, path: str, timeout: float = 30.0, flush_size: int = 1024):
+        self.path = path
+        self.timeout = timeout
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writes: List[Future] = []
+        # (program_id, encoded seeds) -> (address, bump, used)
+        self._pending: Dict[Tuple[bytes, bytes], Tuple[bytes, int, int]] = {}
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pda ("
+            "program_id BLOB NOT NULL, "
+            "seeds BLOB NOT NULL, "
+            "address BLOB NOT NULL, "
+            "bump INTEGER NOT NULL, "
+            "used INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (program_id, seeds)"
+            ") WITHOUT ROWID"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(pda)")]
+        if "used" not in columns:
+            # files written before entries were timestamped
+            conn.execute("ALTER TABLE pda ADD COLUMN used INTEGER NOT NULL DEFAULT 0")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections and the writer thread must not be shared with forked workers
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._connect()
+            self._writer = ThreadPoolExecutor(max_workers=1, initializer=self._init_writer)
+            self._writes = []
+            self._pid = os.getpid()
+        return self._conn
+
+    def _init_writer(self):
+        # the writer thread keeps its own connection, WAL lets it commit while reads go on
+        _writer_local.conn = self._connect()
+
+    def get(self, program_id: bytes, seeds: Sequence[bytes]) -> Optional[Tuple[bytes, int]]:
+        key = (program_id, encode_seeds(seeds))
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending[0], pending[1]
+            row = self._connection().execute(
+                "SELECT address, bump, used FROM pda WHERE program_id = ? AND seeds = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (bytes(row[0]), row[1])
+            if time.time() - row[2] > TOUCH_INTERVAL:
+                # remember the hit so warm() prefers it, written with the next batch
+                self._buffer(key, entry[0], entry[1])
+        return entry
+
+    def put(self, program_id: bytes, seeds: Sequence[bytes], address: bytes, bump: int):
+        with self._lock:
+            self._buffer((program_id, encode_seeds(seeds)), address, bump)
+
+    def _buffer(self, key: Tuple[bytes, bytes], address: bytes, bump: int):
+        # caller holds self._lock
+        self._pending[key] = (address, bump, int(time.time()))
+        if len(self._pending) >= self.flush_size:
+            self._submit()
+
+    def _submit(self):
+        # caller holds self._lock
+        pending, self._pending = self._pending, {}
+        rows = [
+            (program_id, seeds, address, bump, used)
+            for (program_id, seeds), (address, bump, used) in pending.items()
+        ]
+        self._connection()
+        self._writes = [write for write in self._writes if not write.done()]
+        self._writes.append(self._writer.submit(self._write_batch, rows))
+
+    def _write_batch(self, rows):
+        self._write(_writer_local.conn, rows)
+
+    def put_many(self, entries: Sequence[Tuple[bytes, Sequence[bytes], bytes, int]]):
+        used = int(time.time())
+        rows = [
+            (program_id, encode_seeds(seeds), address, bump, used)
+            for program_id, seeds, address, bump in entries
+        ]
+        with self._lock:
+            self._write(self._connection(), rows)
+
+    def flush(self):
+        # waits for the writer thread, then writes whatever is still buffered in the
+        # calling thread; also runs at exit, after the writer thread is shut down
+        with self._lock:
+            # a forked child inherits the parent's futures, its writer thread did not survive the fork
+            writes = self._writes if self._pid == os.getpid() else []
+            self._writes = []
+        for write in writes:
+            write.result()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._write(self._connection(), [
+                    (program_id, seeds, address, bump, used)
+                    for (program_id, seeds), (address, bump, used) in pending.items()
+                ])
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO pda (program_id, seeds, address, bump, used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (program_id, seeds) DO UPDATE SET used = MAX(used, excluded.used)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def items(self, limit: Optional[int] = None) -> Iterator[Tuple[bytes, Tuple[bytes, ...], bytes, int]]:
+        # most recently derived or loaded first
+        self.flush()
+        query = "SELECT program_id, seeds, address, bump FROM pda ORDER BY used DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._connection().execute(query).fetchall()
+        for program_id, seeds, address, bump in rows:
+            yield bytes(program_id), decode_seeds(bytes(seeds)), bytes(address), bump
+
+    def __len__(self):
+        self.flush()
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM pda").fetchone()[0]
+
+    def close(self):
+        # flush() already skips writes a forked child inherited, and entries that were
+        # only buffered still need a connection to land
+        self.flush()
+        with self._lock:
+            if self._pid == os.getpid():
+                self._writer.shutdown()
+                self._conn.close()
+            self._conn = None
+            self._writer = None
+            self._writes = []
+            self._pid = None
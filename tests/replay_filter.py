@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Set, Union
+
+from help import LazyParsedVaa, toBytes
+from hellotoken.errors.custom import AlreadyRedeemed
+
+# same layout as the deriveClaimKey seeds: emitter_address, emitter_chain, sequence
+_CLAIM_KEY = struct.Struct(">32sHQ")
+
+
+def claim_key(emitter_address: Union[bytes, memoryview, str], emitter_chain: int, sequence: int) -> bytes:
+    emitter_address = toBytes(emitter_address)
+    assert len(emitter_address) == 32, "address.length != 32"
+    return _CLAIM_KEY.pack(emitter_address, emitter_chain, sequence)
+
+
+def vaa_claim_key(vaa: Union[bytes, memoryview, str, LazyParsedVaa]) -> bytes:
+    if not isinstance(vaa, LazyParsedVaa):
+        vaa = LazyParsedVaa.parse_vaa(vaa)
+    return claim_key(vaa.emitter_address, vaa.emitter_chain, vaa.sequence)
+
+
+class ClaimFilter:
+    # set of redeemed (emitter, chain, sequence) claims, optionally persisted to sqlite
+    # so restarts keep their history. Writes go through a writer thread, callers only
+    # ever touch the in-memory set.
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._claimed: Set[bytes] = set()
+        self._in_flight: Set[bytes] = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writes: List[Future] = []
+
+        if path is not None:
+            self._claimed.update(bytes(key) for (key,) in self._connection().execute("SELECT claim FROM claims"))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS claims (claim BLOB PRIMARY KEY) WITHOUT ROWID")
+            self._conn = conn
+            # the writer must not be shared with forked workers either
+            self._writer = ThreadPoolExecutor(max_workers=1)
+            self._writes = []
+            self._pid = os.getpid()
+        return self._conn
+
+    def is_claimed_key(self, key: bytes) -> bool:
+        return key in self._claimed
+
+    def is_claimed(self, emitter_address: Union[bytes, str], emitter_chain: int, sequence: int) -> bool:
+        return self.is_claimed_key(claim_key(emitter_address, emitter_chain, sequence))
+
+    def is_duplicate(self, vaa: Union[bytes, memoryview, str, LazyParsedVaa]) -> bool:
+        key = vaa_claim_key(vaa)
+        with self._lock:
+            return key in self._in_flight or self.is_claimed_key(key)
+
+    def acquire(self, vaa: Union[bytes, memoryview, str, LazyParsedVaa]) -> bool:
+        # False when the transfer was already redeemed or another task is redeeming it
+        key = vaa_claim_key(vaa)
+        with self._lock:
+            if key in self._in_flight or self.is_claimed_key(key):
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def release(self, vaa: Union[bytes, memoryview, str, LazyParsedVaa], redeemed: bool = False):
+        key = vaa_claim_key(vaa)
+        with self._lock:
+            self._in_flight.discard(key)
+        if redeemed:
+            self.mark_claimed_keys([key])
+
+    def release_with_error(self, vaa: Union[bytes, memoryview, str, LazyParsedVaa], error) -> bool:
+        # AlreadyRedeemed means someone else won the race, which still counts as claimed
+        redeemed = isinstance(error, AlreadyRedeemed)
+        self.release(vaa, redeemed)
+        return redeemed
+
+    def mark_claimed(self, emitter_address: Union[bytes, str], emitter_chain: int, sequence: int):
+        self.mark_claimed_keys([claim_key(emitter_address, emitter_chain, sequence)])
+
+    def mark_claimed_keys(self, keys: Iterable[bytes]):
+        keys = list(keys)
+        with self._lock:
+            self._claimed.update(keys)
+            if self.path is not None:
+                conn = self._connection()
+                self._writes = [write for write in self._writes if not write.done()]
+                self._writes.append(self._writer.submit(self._write, conn, keys))
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, keys: List[bytes]):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR IGNORE INTO claims (claim) VALUES (?)", [(key,) for key in keys])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        # waits until every claim marked so far is on disk
+        with self._lock:
+            writes = self._writes if self._pid == os.getpid() else []
+            self._writes = []
+        for write in writes:
+            write.result()
+
+    def filter(self, vaas: Iterable[Union[bytes, memoryview, str]]) -> Iterator[Union[bytes, memoryview, str]]:
+        # drop already claimed VAAs and repeats within the stream itself
+        seen = set()
+        for vaa in vaas:
+            key = vaa_claim_key(vaa)
+            if key in seen:
+                continue
+            seen.add(key)
+            with self._lock:
+                if key in self._in_flight or self.is_claimed_key(key):
+                    continue
+            yield vaa
+
+    def __len__(self):
+        return len(self._claimed)
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self.flush()
+            self._writer.shutdown()
+            self._conn.close()
+        self._conn = None
+        self._writer = None
+        self._pid = None
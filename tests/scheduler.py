@@ -0,0 +1,171 @@
+import asyncio
+import functools
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from solana.transaction import Transaction
+from solders.pubkey import Pubkey
+
+from blockhash import SLOT_SECONDS
+
+
+def write_set(tx: Transaction, ignore: Iterable[Pubkey] = ()) -> FrozenSet[Pubkey]:
+    # accounts the transaction takes a write lock on
+    return frozenset(
+        meta.pubkey
+        for ix in tx.instructions
+        for meta in ix.accounts
+        if meta.is_writable
+    ).difference(ignore)
+
+
+class _Queued:
+    __slots__ = ("tx", "args", "accounts", "future")
+
+    def __init__(self, tx, args, accounts, future):
+        self.tx = tx
+        self.args = args
+        self.accounts = accounts
+        self.future = future
+
+
+class WriteLockScheduler:
+    # holds transactions back so that no account is write-locked by more than
+    # max_writes_per_slot of them per slot. Each dispatch round walks the queue in
+    # order and sends whatever fits; a transaction may overtake queued ones only when
+    # it shares no writable account with them, so non-conflicting work goes first
+    # while transactions on the same accounts keep their order. Sends released in the
+    # same round are concurrent, except that a transaction waits for the send of the
+    # previous one on any of its writable accounts, so those reach the RPC node in order.
+
+    def __init__(
+            self,
+            send: Callable[..., Awaitable],
+            ignore: Iterable[Pubkey] = (),
+            max_writes_per_slot: int = 4,
+            slot_seconds: float = SLOT_SECONDS,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.send = send
+        # accounts every transaction writes, e.g. the fee payer, never count as contention
+        self.ignore = frozenset(ignore)
+        self.max_writes_per_slot = max_writes_per_slot
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+        self.dispatched = 0
+        self.deferred = 0
+        self._queue: List[_Queued] = []
+        self._writes: Counter = Counter()
+        # the latest send per writable account, later ones on that account wait for it
+        self._tails: Dict[Pubkey, asyncio.Task] = {}
+        self._slot_start = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def submit(self, tx: Transaction, *args) -> asyncio.Future:
+        # resolves to whatever send(tx, *args) returns once the transaction went out
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(_Queued(tx, args, write_set(tx, self.ignore), future))
+        self._wakeup.set()
+        return future
+
+    async def _send(self, queued: _Queued, after: Set[asyncio.Task]):
+        if after:
+            # only the order matters here, a failed predecessor is its own caller's problem
+            await asyncio.wait(after)
+        try:
+            result = await self.send(queued.tx, *queued.args)
+        except BaseException as e:
+            if not queued.future.done():
+                queued.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            if not queued.future.done():
+                queued.future.set_result(result)
+
+    def _chain(self, queued: _Queued):
+        after = {self._tails[account] for account in queued.accounts if account in self._tails}
+        task = asyncio.ensure_future(self._send(queued, after))
+        for account in queued.accounts:
+            self._tails[account] = task
+        task.add_done_callback(functools.partial(self._untail, queued.accounts))
+
+    def _untail(self, accounts: FrozenSet[Pubkey], task: asyncio.Task):
+        for account in accounts:
+            if self._tails.get(account) is task:
+                del self._tails[account]
+
+    def dispatch(self) -> int:
+        # sends everything the current slot still has room for, returns how many went out
+        now = self.clock()
+        if now - self._slot_start >= self.slot_seconds:
+            self._slot_start = now
+            self._writes.clear()
+
+        blocked: Set[Pubkey] = set()
+        remaining: List[_Queued] = []
+        sent = 0
+        for queued in self._queue:
+            if queued.future.done():
+                continue
+            accounts = queued.accounts
+            if blocked.isdisjoint(accounts) and all(
+                    self._writes[account] < self.max_writes_per_slot for account in accounts
+            ):
+                self._writes.update(accounts)
+                self._chain(queued)
+                sent += 1
+            else:
+                blocked.update(accounts)
+                remaining.append(queued)
+
+        self._queue = remaining
+        self.dispatched += sent
+        self.deferred += len(remaining)
+        return sent
+
+    async def run(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            self.dispatch()
+            if self._queue:
+                # whatever is left waits for the next slot, or for new submissions
+                # that might fit into this one
+                self._wakeup.clear()
+                delay = self._slot_start + self.slot_seconds - self.clock()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(delay, 0))
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queued in self._queue:
+            if not queued.future.done():
+                queued.future.cancel()
+        self._queue.clear()
@@ -0,0 +1,162 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solders.pubkey import Pubkey
+
+from help import deriveTokenTransferMessageKey
+
+
+class SequenceAllocator:
+    # hands out Wormhole emitter sequences optimistically, so several sends can be in
+    # flight at once with distinct wormhole_message PDAs.
+    #
+    # This only works while the sends land in sequence order: HelloToken checks the
+    # message PDA against the live token_bridge_sequence, so once one reservation fails
+    # or is dropped, every later reservation is invalid too. Sends ahead of the on-chain
+    # sequence also skip preflight, so that only shows up after the confirmation round
+    # trip. A failed release therefore rewinds the allocator to the failed sequence and
+    # starts a new epoch; the invalidated sends fail with ConstraintSeeds and have to be
+    # rebuilt on a fresh reservation (HelloTokenClient.send_sequenced does that).
+
+    def __init__(self, client: AsyncClient, sequence_account: Pubkey, commitment: Commitment = Confirmed):
+        self.client = client
+        self.sequence_account = sequence_account
+        self.commitment = commitment
+        # last sequence known to be used on chain
+        self.onchain: Optional[int] = None
+        self.epoch = 0
+        self._next: Optional[int] = None
+        # sequence every epoch after the first rewound to, _rewinds[e - 1] started epoch e
+        self._rewinds: List[int] = []
+        self._in_flight: Set[Tuple[int, int]] = set()
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self.resyncs = 0
+
+    async def sync(self) -> int:
+        resp = await self.client.get_account_info(self.sequence_account, self.commitment)
+        self.onchain = int.from_bytes(resp.value.data, byteorder='little')
+        # reservations below the on-chain sequence can never land any more
+        self._next = self.onchain + 1 if self._next is None else max(self._next, self.onchain + 1)
+        self._stale = False
+        self.resyncs += 1
+        return self.onchain
+
+    async def reserve(self) -> Tuple[int, int]:
+        # returns (sequence, epoch), both go back into release()
+        async with self._lock:
+            if self._stale or self._next is None:
+                await self.sync()
+            sequence = self._next
+            self._next += 1
+            self._in_flight.add((sequence, self.epoch))
+            return sequence, self.epoch
+
+    def is_ahead(self, sequence: int) -> bool:
+        # True when earlier reservations still have to land first, so preflight against
+        # the current bank state would reject it
+        return self.onchain is None or sequence > self.onchain + 1
+
+    def release(self, sequence: int, epoch: int, landed: bool):
+        self._in_flight.discard((sequence, epoch))
+        if landed:
+            self.onchain = sequence if self.onchain is None else max(self.onchain, sequence)
+            return
+        # a failure only matters if its sequence was not handed out again since, i.e. it
+        # lies below every rewind made after its epoch
+        if any(sequence >= rewind for rewind in self._rewinds[epoch:]):
+            return
+        if self._next is not None and sequence >= self._next:
+            return
+        self._next = sequence
+        self._rewinds.append(sequence)
+        self.epoch += 1
+        # re-read the account before the next reservation in case sends landed meanwhile
+        self._stale = True
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+class MessageKeyWindow:
+    # wormhole_message PDAs for the next `size` sequences, derived in a background
+    # task so building a send instruction never runs a bump search itself
+
+    def __init__(self, program_id: Pubkey, size: int = 64, low_water: int = 16, batch_size: int = 16):
+        self.program_id = program_id
+        self.size = size
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.base: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._keys: Dict[int, Pubkey] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def advance(self, sequence: int):
+        # sequences below `sequence` are consumed, drop them and top the window up
+        self.base = sequence
+        for stale in [key for key in self._keys if key < sequence]:
+            del self._keys[stale]
+        if len(self._keys) <= self.size - self.low_water:
+            self._wakeup.set()
+
+    def get(self, sequence: int) -> Pubkey:
+        key = self._keys.pop(sequence, None)
+        if key is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            key = deriveTokenTransferMessageKey(self.program_id, sequence)
+        # a resync can move back below base, keys above it stay valid either way
+        self.advance(sequence + 1)
+        return key
+
+    def _derive(self, sequences: List[int]) -> List[Tuple[int, Pubkey]]:
+        return [(sequence, deriveTokenTransferMessageKey(self.program_id, sequence)) for sequence in sequences]
+
+    async def fill(self):
+        loop = asyncio.get_running_loop()
+        while self.base is not None:
+            base = self.base
+            missing = [
+                sequence for sequence in range(base, base + self.size)
+                if sequence not in self._keys
+            ][:self.batch_size]
+            if not missing:
+                return
+            # bump searches run off the event loop, one batch at a time
+            derived = await loop.run_in_executor(None, self._derive, missing)
+            for sequence, key in derived:
+                if sequence >= self.base:
+                    self._keys[sequence] = key
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.fill()
+            except Exception as e:
+                print(f"wormhole message pre-derivation failed: {e}")
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from solana.rpc.commitment import Confirmed, Finalized
+from solana.transaction import Transaction
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.system_program import TransferParams, transfer
+
+from blockhash import SLOT_SECONDS, BlockhashProvider
+
+payer = Keypair()
+
+
+class FakeClient:
+    # every get_latest_blockhash returns a new blockhash valid for 150 blocks from `height`
+    commitment = Finalized
+
+    def __init__(self):
+        self.height = 1000
+        self.blockhashes = 0
+        self.commitments = []
+        self.sent = []
+
+    async def get_latest_blockhash(self, commitment):
+        self.commitments.append(commitment)
+        self.blockhashes += 1
+        value = SimpleNamespace(blockhash=Hash.new_unique(), last_valid_block_height=self.height + 150)
+        return SimpleNamespace(value=value)
+
+    async def get_block_height(self, commitment):
+        return SimpleNamespace(value=self.height)
+
+    async def send_raw_transaction(self, raw, opts):
+        self.sent.append((raw, opts))
+        return SimpleNamespace(value="signature")
+
+
+def transaction() -> Transaction:
+    ix = transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=payer.pubkey(), lamports=1))
+    return Transaction(fee_payer=payer.pubkey()).add(ix)
+
+
+def age(provider: BlockhashProvider, blocks: int):
+    # pretend the last refresh happened `blocks` slots ago
+    provider.refreshed_at = time.monotonic() - blocks * SLOT_SECONDS - SLOT_SECONDS / 2
+
+
+def test_defaults_to_confirmed():
+    async def main():
+        client = FakeClient()
+        provider = BlockhashProvider(client)
+        await provider.latest()
+        assert client.commitments == [Confirmed]
+
+    asyncio.run(main())
+
+
+def test_expiry_estimate():
+    async def main():
+        provider = BlockhashProvider(FakeClient(), resign_margin=30)
+        await provider.refresh()
+        assert provider.estimated_block_height() == 1000
+        assert not provider.is_expiring(1150)
+        age(provider, 119)
+        assert provider.estimated_block_height() == 1119
+        assert not provider.is_expiring(1150)
+        age(provider, 120)
+        assert provider.is_expiring(1150)
+
+    asyncio.run(main())
+
+
+def test_usable_refreshes_expiring_blockhash():
+    async def main():
+        client = FakeClient()
+        provider = BlockhashProvider(client)
+        first, _ = await provider.usable()
+        assert await provider.usable() == (first, 1150)
+        age(provider, 140)
+        client.height = 1140
+        second, last_valid_block_height = await provider.usable()
+        assert second != first
+        assert last_valid_block_height == 1290
+        assert client.blockhashes == 2
+
+    asyncio.run(main())
+
+
+def test_send_signs_and_resigns():
+    async def main():
+        client = FakeClient()
+        provider = BlockhashProvider(client)
+        tx = transaction()
+        _resp, last_valid_block_height = await provider.send(tx, payer)
+        first = tx.recent_blockhash
+        assert tx.verify_signatures()
+        # preflight has to see the blockhash at the commitment it was fetched at
+        assert client.sent[0][1].preflight_commitment == Confirmed
+        assert provider.resigned == 0
+
+        # still fresh, sent again as is
+        await provider.send(tx, payer, last_valid_block_height=last_valid_block_height)
+        assert tx.recent_blockhash == first
+        assert provider.resigned == 0
+
+        age(provider, 140)
+        client.height = 1140
+        await provider.send(tx, payer, last_valid_block_height=last_valid_block_height)
+        assert tx.recent_blockhash != first
+        assert tx.verify_signatures()
+        assert provider.resigned == 1
+
+    asyncio.run(main())
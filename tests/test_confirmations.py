@@ -0,0 +1,25 @@
+from solders.pubkey import Pubkey
+from solders.transaction_status import InstructionErrorCustom, TransactionErrorInstructionError
+
+from confirmations import program_error
+from hellotoken.errors.anchor import ConstraintSeeds
+from hellotoken.errors.custom import AlreadyRedeemed
+from hellotoken.program_id import PROGRAM_ID
+
+other_program = Pubkey.new_unique()
+
+
+def failed(index: int, code: int) -> TransactionErrorInstructionError:
+    return TransactionErrorInstructionError(index, InstructionErrorCustom(code))
+
+
+def test_program_error_decodes_hello_token_errors():
+    program_ids = [other_program, PROGRAM_ID]
+    assert isinstance(program_error(failed(1, 6022), program_ids), AlreadyRedeemed)
+    assert isinstance(program_error(failed(1, 2006), program_ids), ConstraintSeeds)
+
+
+def test_program_error_ignores_other_programs():
+    assert program_error(failed(0, 6022), [other_program, PROGRAM_ID]) is None
+    assert program_error(failed(2, 6022), [other_program, PROGRAM_ID]) is None
+    assert program_error("AccountInUse", [PROGRAM_ID]) is None
@@ -0,0 +1,48 @@
+import pytest
+from solders.pubkey import Pubkey
+
+from hellotoken.program_id import PROGRAM_ID
+from help import (
+    Deployment,
+    deriveSenderConfigKey,
+    getDeployment,
+    getSendNativeTransferAccounts,
+    getTokenBridgeDerivedAccounts,
+    resolveDeployment,
+)
+
+token_bridge = "DZnkkTmCiFWfYTfT41X3Rd1kDgozqzxWaHqsw6W4x2oe"
+wormhole = "3u8hJUVTA4jH1wYAyUur7FFZVQ8H635K3tSHHF4ssjQ5"
+hello_token = str(PROGRAM_ID)
+
+
+def test_deployment_is_shared_and_immutable():
+    deployment = getDeployment(token_bridge, wormhole, hello_token)
+    assert getDeployment(Pubkey.from_string(token_bridge), wormhole, hello_token) is deployment
+    assert deployment.sender_config == deriveSenderConfigKey(hello_token)
+    with pytest.raises(AttributeError):
+        deployment.sender_config = Pubkey.default()
+
+
+def test_resolve_prefers_the_deployment():
+    deployment = getDeployment(token_bridge, wormhole, hello_token)
+    assert resolveDeployment(None, None, None, deployment) is deployment
+    assert resolveDeployment(token_bridge, wormhole, hello_token, deployment) is deployment
+    assert resolveDeployment(token_bridge, wormhole, hello_token) is deployment
+
+
+def test_mismatched_program_id_is_rejected():
+    deployment = getDeployment(token_bridge, wormhole, hello_token)
+    other = str(Pubkey.new_unique())
+    with pytest.raises(ValueError):
+        resolveDeployment(other, wormhole, hello_token, deployment)
+    with pytest.raises(ValueError):
+        getSendNativeTransferAccounts(token_bridge, wormhole, other, 2, Pubkey.new_unique(), deployment=deployment)
+
+
+def test_builders_only_need_the_deployment():
+    deployment = Deployment(token_bridge, wormhole, hello_token)
+    mint = Pubkey.new_unique()
+    assert getSendNativeTransferAccounts(None, None, None, 2, mint, deployment=deployment) == \
+        getSendNativeTransferAccounts(token_bridge, wormhole, hello_token, 2, mint)
+    assert getTokenBridgeDerivedAccounts(None, None, deployment=deployment)["wormhole_bridge"] == deployment.wormhole_bridge
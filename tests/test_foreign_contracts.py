@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from solders.keypair import Keypair
+
+import hello_token
+from hellotoken.accounts.foreign_contract import ForeignContract
+from help import ForeignContractTable, deriveForeignContractKey, deriveForeignEndPointKey, getForeignAccounts
+from replay_filter import ClaimFilter
+
+deployment = hello_token.deployment
+emitter = hello_token.token_bridge_emitter_sui
+foreign_contract_key = deriveForeignContractKey(deployment.hello_token_program, 21)
+endpoint_key = deriveForeignEndPointKey(deployment.token_bridge_program, 21, emitter)
+
+
+def test_table_derives_once():
+    table = ForeignContractTable(deployment, {21: emitter.hex()})
+    entry = table.get(21)
+    assert entry.foreign_contract == foreign_contract_key
+    assert entry.token_bridge_foreign_endpoint == endpoint_key
+    assert entry.emitter_address == emitter
+    assert table.chains() == [21]
+
+    assert getForeignAccounts(deployment, table, 21, emitter) == (foreign_contract_key, endpoint_key)
+    # a different emitter is derived again instead of answered from the table
+    other = bytes(32)
+    assert getForeignAccounts(deployment, table, 21, other)[1] == deriveForeignEndPointKey(
+        deployment.token_bridge_program, 21, other
+    )
+
+
+def test_endpoint_does_not_record():
+    table = ForeignContractTable(deployment)
+    assert table.endpoint(21, emitter).token_bridge_foreign_endpoint == endpoint_key
+    assert 21 not in table
+    table.refresh(21, emitter)
+    assert len(table) == 1
+
+
+def client() -> hello_token.HelloTokenClient:
+    return hello_token.HelloTokenClient(
+        payer=Keypair(), foreign_table=ForeignContractTable(deployment), claims=ClaimFilter(), guardian_sets=None
+    )
+
+
+def test_register_records_only_confirmed():
+    hello = client()
+    confirmations = []
+
+    async def send(tx):
+        confirmations.append(asyncio.get_running_loop().create_future())
+        return confirmations[-1]
+
+    hello.send = send
+
+    async def main():
+        await hello.register_foreign_contract(21, emitter)
+        confirmations[-1].set_exception(RuntimeError("transaction failed"))
+        await asyncio.sleep(0)
+        assert 21 not in hello.foreign_table
+
+        await hello.register_foreign_contract(21, emitter)
+        assert 21 not in hello.foreign_table
+        confirmations[-1].set_result("signature")
+        await asyncio.sleep(0)
+        assert hello.foreign_table.get(21).token_bridge_foreign_endpoint == endpoint_key
+
+    asyncio.run(main())
+
+
+class FakeClient:
+    # one registered ForeignContract account and the token bridge endpoint it points at
+    async def get_program_accounts(self, program_id, encoding, filters):
+        data = ForeignContract.discriminator + ForeignContract.layout.build(dict(
+            chain=21, address=list(hello_token.hello_emitter_sui), token_bridge_foreign_endpoint=endpoint_key
+        ))
+        account = SimpleNamespace(pubkey=foreign_contract_key, account=SimpleNamespace(data=data))
+        return SimpleNamespace(value=[account])
+
+    async def get_multiple_accounts(self, keys):
+        assert keys == [endpoint_key]
+        return SimpleNamespace(value=[SimpleNamespace(data=(21).to_bytes(2, "little") + emitter)])
+
+
+def test_load_foreign_contracts():
+    hello = client()
+    hello.client = FakeClient()
+    assert asyncio.run(hello.load_foreign_contracts()) == 1
+    entry = hello.foreign_table.get(21)
+    assert entry.foreign_contract == foreign_contract_key
+    assert entry.token_bridge_foreign_endpoint == endpoint_key
+    assert entry.emitter_address == emitter
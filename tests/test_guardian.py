@@ -0,0 +1,153 @@
+import asyncio
+import struct
+from types import SimpleNamespace
+
+from guardian import GuardianSet, GuardianSetCache, quorum, verify_vaa
+from help import deriveGuardianSetKey
+from vaa_builder import MockGuardianSet, VaaBuilder
+
+guardians = MockGuardianSet.deterministic(7, index=3)
+emitter = bytes(range(32))
+
+# version, guardian_set_index, num_signatures, then index + 65 byte signature each
+_SIG_START = 6
+_SIG_LENGTH = 66
+
+
+def build(num_signers=None) -> bytes:
+    return VaaBuilder(guardians, num_signers).build(2, emitter, 1, b"hello")
+
+
+def test_quorum():
+    assert quorum(1) == 1
+    assert quorum(7) == 5
+    assert quorum(19) == 13
+    assert guardians.quorum == 5
+
+
+def test_verify_with_quorum():
+    result = verify_vaa(build(5), guardians.guardian_set)
+    assert result
+    assert result.num_valid == 5
+    assert result.quorum == 5
+
+
+def test_verify_without_quorum():
+    result = verify_vaa(build(4), guardians.guardian_set)
+    assert not result
+    assert result.error == "no quorum"
+
+
+def test_tampered_signature():
+    raw = bytearray(build())
+    # flip a bit in the r value of the third signature
+    raw[_SIG_START + 2 * _SIG_LENGTH + 10] ^= 1
+    result = verify_vaa(bytes(raw), guardians.guardian_set)
+    assert not result
+    assert result.num_valid == 2
+    assert "guardian 2" in result.error
+
+
+def test_tampered_body():
+    raw = bytearray(build())
+    raw[-1] ^= 1
+    result = verify_vaa(bytes(raw), guardians.guardian_set)
+    assert not result
+    assert result.num_valid == 0
+
+
+def test_signatures_out_of_order():
+    raw = bytearray(build())
+    first = _SIG_START
+    second = _SIG_START + _SIG_LENGTH
+    raw[first:second], raw[second:second + _SIG_LENGTH] = raw[second:second + _SIG_LENGTH], raw[first:second]
+    result = verify_vaa(bytes(raw), guardians.guardian_set)
+    assert not result
+    assert "ascending" in result.error
+
+
+def test_wrong_guardian_set():
+    other = MockGuardianSet.deterministic(7, seed=1, index=3)
+    result = verify_vaa(build(), other.guardian_set)
+    assert not result
+    assert result.num_valid == 0
+
+    result = verify_vaa(build(), GuardianSet(4, guardians.guardian_set.keys))
+    assert not result
+    assert "index mismatch" in result.error
+
+
+def test_expired_guardian_set():
+    guardian_set = GuardianSet(3, guardians.guardian_set.keys, expiration_time=100)
+    assert verify_vaa(build(), guardian_set)
+    assert not verify_vaa(build(), guardian_set, now=101)
+
+
+def test_signature_layout():
+    raw = build(2)
+    assert struct.unpack_from(">BIB", raw) == (1, 3, 2)
+    assert raw[_SIG_START] == 0
+    assert raw[_SIG_START + _SIG_LENGTH] == 1
+
+
+WORMHOLE = "3u8hJUVTA4jH1wYAyUur7FFZVQ8H635K3tSHHF4ssjQ5"
+
+
+def key(index: int):
+    return deriveGuardianSetKey(WORMHOLE, index)
+
+
+class FakeConn:
+    # serves encoded GuardianSetData accounts and records which ones were read
+    def __init__(self):
+        self.accounts = {}
+        self.fetched = []
+
+    def store(self, guardian_set: GuardianSet):
+        data = struct.pack("<II", guardian_set.index, len(guardian_set.keys)) + b"".join(guardian_set.keys)
+        data += struct.pack("<II", guardian_set.creation_time, guardian_set.expiration_time)
+        self.accounts[key(guardian_set.index)] = data
+
+    async def get_account_info(self, account, commitment=None):
+        self.fetched.append(account)
+        data = self.accounts.get(account)
+        return SimpleNamespace(value=None if data is None else SimpleNamespace(data=data))
+
+
+def test_cache_verifies_against_fetched_set():
+    conn = FakeConn()
+    conn.store(guardians.guardian_set)
+    cache = GuardianSetCache(WORMHOLE)
+
+    async def main():
+        assert await cache.verify(conn, build())
+        assert await cache.verify(conn, build())
+        result = await cache.verify(conn, VaaBuilder(MockGuardianSet.deterministic(1, index=9)).build(2, emitter, 1, b""))
+        assert not result
+        assert result.error == "unknown guardian set"
+
+    asyncio.run(main())
+    assert conn.fetched == [key(3), key(9)]
+
+
+def test_cache_refetches_superseded_sets():
+    conn = FakeConn()
+    conn.store(guardians.guardian_set)
+    cache = GuardianSetCache(WORMHOLE)
+    rotated = MockGuardianSet.deterministic(7, seed=2, index=4)
+
+    async def main():
+        assert await cache.verify(conn, build())
+
+        # rotation: the next set is added and the old one gets its expiration time
+        conn.store(rotated.guardian_set)
+        conn.store(GuardianSet(3, guardians.guardian_set.keys, expiration_time=100))
+        assert await cache.verify(conn, VaaBuilder(rotated).build(2, emitter, 2, b""))
+
+        assert not await cache.verify(conn, build())
+        assert cache.get(3).expiration_time == 100
+        # fetched again only once
+        assert not await cache.verify(conn, build())
+
+    asyncio.run(main())
+    assert conn.fetched == [key(3), key(4), key(3)]
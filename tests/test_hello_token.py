@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+
+import hello_token
+from replay_filter import ClaimFilter
+
+
+class FakeClient:
+    # answers the blockhash calls, fails when the sequence account is read
+    clients = []
+
+    def __init__(self, endpoint):
+        self.closed = False
+        FakeClient.clients.append(self)
+
+    async def is_connected(self):
+        return True
+
+    async def get_latest_blockhash(self, commitment):
+        return SimpleNamespace(value=SimpleNamespace(blockhash=Hash.default(), last_valid_block_height=1150))
+
+    async def get_block_height(self, commitment):
+        return SimpleNamespace(value=1000)
+
+    async def get_account_info(self, *args, **kwargs):
+        raise ConnectionError("rpc went away")
+
+    async def close(self):
+        self.closed = True
+
+
+def test_failed_open_closes_the_client(monkeypatch):
+    monkeypatch.setattr(hello_token, "AsyncClient", FakeClient)
+    client = hello_token.HelloTokenClient(payer=Keypair(), claims=ClaimFilter(), guardian_sets=None)
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await client.open()
+        # nothing the failed open started is left running
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert tasks == []
+
+    asyncio.run(main())
+    assert client.client is None
+    assert client.blockhashes is None
+    assert client.confirmations is None
+    assert FakeClient.clients[-1].closed
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from help import LazyParsedVaa, ParsedVaa
+from vaa_builder import MockGuardianSet, VaaBuilder
+
+guardians = MockGuardianSet.deterministic(7, index=3)
+emitter = bytes(range(32))
+
+
+def build(payload: bytes = b"hello") -> bytes:
+    return VaaBuilder(guardians).build(21, emitter, 42, payload, timestamp=1700000000, nonce=9, consistency_level=15)
+
+
+def test_fields_match_parsed_vaa():
+    raw = build()
+    lazy = LazyParsedVaa.parse_vaa(raw)
+    parsed = ParsedVaa.parse_vaa(raw)
+    assert lazy.version == 1
+    assert lazy.guardian_set_index == 3
+    assert lazy.timestamp == 1700000000
+    assert lazy.nonce == 9
+    assert lazy.emitter_chain == 21
+    assert lazy.emitter_address == emitter
+    assert lazy.sequence == 42
+    assert lazy.consistency_level == 15
+    assert lazy.payload == b"hello"
+    assert lazy.guardian_signatures == parsed.guardian_signatures
+    assert lazy.hash == parsed.hash
+    assert json.loads(str(lazy)) == json.loads(str(parsed))
+
+
+def test_hex_input():
+    raw = build()
+    assert LazyParsedVaa.parse_vaa("0x" + raw.hex()).sequence == 42
+    assert LazyParsedVaa.parse_vaa(raw.hex()).sequence == 42
+
+
+def test_fields_are_views_into_the_signed_vaa():
+    raw = bytearray(build())
+    lazy = LazyParsedVaa.parse_vaa(raw)
+    payload = lazy.payload
+    assert isinstance(payload, memoryview)
+    assert payload.obj is raw
+    assert lazy.emitter_address.obj is raw
+    assert lazy.body.obj is raw
+
+    raw[-1] = ord("!")
+    assert bytes(lazy.payload) == b"hell!"
+
+
+def test_slots():
+    lazy = LazyParsedVaa.parse_vaa(build())
+    with pytest.raises(AttributeError):
+        lazy.extra = 1
+
+
+def test_signatures_and_hash_are_decoded_once():
+    lazy = LazyParsedVaa.parse_vaa(build())
+    assert lazy.guardian_signatures is lazy.guardian_signatures
+    assert lazy.hash is lazy.hash
@@ -0,0 +1,108 @@
+import asyncio
+import struct
+from types import SimpleNamespace
+
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+import lookup_table
+from hello_token import deployment
+from lookup_table import (
+    ADDRESS_LOOKUP_TABLE_PROGRAM_ID, LOOKUP_TABLE_META_SIZE, LookupTableManager, compile_v0, create_lookup_table,
+    decode_lookup_table_addresses, deriveLookupTableAddress, extend_lookup_table, static_accounts
+)
+
+payer = Keypair()
+
+
+def test_create_and_extend_encoding():
+    ix, table = create_lookup_table(payer.pubkey(), payer.pubkey(), 1234)
+    assert ix.program_id == ADDRESS_LOOKUP_TABLE_PROGRAM_ID
+    assert table == deriveLookupTableAddress(payer.pubkey(), 1234)[0]
+    tag, slot, bump = struct.unpack("<IQB", ix.data)
+    assert (tag, slot, bump) == (0, 1234, deriveLookupTableAddress(payer.pubkey(), 1234)[1])
+    assert ix.accounts[0].pubkey == table
+
+    addresses = [Pubkey.new_unique() for _ in range(3)]
+    ix = extend_lookup_table(table, payer.pubkey(), payer.pubkey(), addresses)
+    assert struct.unpack_from("<IQ", ix.data) == (2, 3)
+    assert ix.data[12:] == b"".join(bytes(address) for address in addresses)
+
+
+def account_data(addresses) -> bytes:
+    return bytes(LOOKUP_TABLE_META_SIZE) + b"".join(bytes(address) for address in addresses)
+
+
+def test_decode_addresses():
+    addresses = static_accounts(deployment)
+    assert decode_lookup_table_addresses(account_data(addresses)) == addresses
+    assert decode_lookup_table_addresses(bytes(LOOKUP_TABLE_META_SIZE)) == []
+
+
+def test_v0_transaction_uses_the_table():
+    addresses = static_accounts(deployment)
+    manager = LookupTableManager(None, payer)
+    manager.address = Pubkey.new_unique()
+    manager.addresses = addresses
+
+    ix = Instruction(deployment.hello_token_program, b"", [AccountMeta(key, False, False) for key in addresses[3:]])
+    tx = compile_v0(payer, [ix], [manager.account], Hash.default())
+    lookups = tx.message.address_table_lookups
+    assert [lookup.account_key for lookup in lookups] == [manager.address]
+    # only the payer and the invoked program stay in the static keys
+    assert tx.message.account_keys == [payer.pubkey(), deployment.hello_token_program]
+
+
+class FakeClient:
+    def __init__(self):
+        self.tables = {}
+        self.sent = []
+
+    async def get_slot(self, commitment):
+        return SimpleNamespace(value=77)
+
+    async def get_account_info(self, address, commitment):
+        addresses = self.tables.get(address)
+        return SimpleNamespace(value=None if addresses is None else SimpleNamespace(data=account_data(addresses)))
+
+    async def send_transaction(self, tx, signer):
+        self.sent.append([struct.unpack_from("<I", ix.data)[0] for ix in tx.instructions])
+        for ix in tx.instructions:
+            table = ix.accounts[0].pubkey
+            if struct.unpack_from("<I", ix.data)[0] == 0:
+                self.tables[table] = []
+            else:
+                self.tables[table] += decode_lookup_table_addresses(bytes(LOOKUP_TABLE_META_SIZE) + ix.data[12:])
+        return SimpleNamespace(value="signature")
+
+    async def confirm_transaction(self, signature, commitment):
+        pass
+
+
+def test_manager_creates_extends_and_remembers(tmp_path, monkeypatch):
+    monkeypatch.setattr(lookup_table, "SLOT_SECONDS", 0)
+    path = str(tmp_path / "lookup_table.json")
+    client = FakeClient()
+    addresses = [Pubkey.new_unique() for _ in range(lookup_table.MAX_ADDRESSES_PER_EXTEND + 5)]
+
+    manager = LookupTableManager(client, payer, path)
+    account = asyncio.run(manager.ensure(addresses))
+    assert account.key == deriveLookupTableAddress(payer.pubkey(), 77)[0]
+    assert list(account.addresses) == addresses
+    # create with the first chunk, then one more extend
+    assert client.sent == [[0, 2], [2]]
+
+    # a restart reuses the table and only adds what is missing
+    restarted = LookupTableManager(client, payer, path)
+    assert restarted.address == account.key
+    extra = Pubkey.new_unique()
+    asyncio.run(restarted.ensure(addresses + [extra]))
+    assert client.sent[-1] == [2]
+    assert list(restarted.account.addresses) == addresses + [extra]
+    asyncio.run(restarted.ensure(addresses))
+    assert len(client.sent) == 3
+
+    # the cached table belongs to another payer
+    assert LookupTableManager(client, Keypair(), path).address is None
@@ -0,0 +1,67 @@
+import pytest
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.transaction import Transaction
+
+from packer import PACKET_DATA_SIZE, TransactionPacker, transaction_size
+
+payer = Keypair()
+program_id = Pubkey.new_unique()
+
+
+def instruction(data_size: int, num_accounts: int = 2) -> Instruction:
+    accounts = [AccountMeta(Pubkey.new_unique(), False, True) for _ in range(num_accounts)]
+    return Instruction(program_id, bytes(data_size), accounts)
+
+
+def signed_size(instructions) -> int:
+    message = Message.new_with_blockhash(instructions, payer.pubkey(), Hash.default())
+    return len(bytes(Transaction([payer], message, Hash.default())))
+
+
+def test_transaction_size_is_exact():
+    for instructions in ([instruction(10)], [instruction(200, 5), instruction(0, 0)], [instruction(300, 20)]):
+        assert transaction_size(payer.pubkey(), instructions) == signed_size(instructions)
+
+
+def test_oversized_instruction_rejected():
+    packer = TransactionPacker(payer.pubkey())
+    with pytest.raises(ValueError):
+        packer.add(instruction(PACKET_DATA_SIZE))
+    with pytest.raises(ValueError):
+        packer.add(instruction(10), units=packer.compute_budget + 1)
+    assert len(packer) == 0
+
+
+def test_pack_respects_packet_size():
+    packer = TransactionPacker(payer.pubkey())
+    packer.extend(instruction(300, 3) for _ in range(10))
+    packed = packer.pack()
+    assert len(packed) > 1
+    assert sum(len(instructions) for instructions in packed) == 10
+    for instructions in packed:
+        assert signed_size(instructions) <= PACKET_DATA_SIZE
+
+
+def test_pack_respects_compute_budget():
+    packer = TransactionPacker(payer.pubkey(), compute_budget=500_000)
+    packer.extend([instruction(10) for _ in range(5)], units=200_000)
+    assert [len(instructions) for instructions in packer.pack()] == [2, 2, 1]
+
+
+def test_dependencies_never_move_earlier():
+    packer = TransactionPacker(payer.pubkey())
+    big = packer.add(instruction(900))
+    second = packer.add(instruction(900))
+    small_ix = instruction(10)
+    packer.add(small_ix, after=[second])
+    assert packer.has_dependencies
+    packed = packer.pack()
+    # the small instruction would fit next to the first, but has to follow the second
+    assert [len(instructions) for instructions in packed] == [1, 2]
+    assert packed[1][1] == small_ix
+    with pytest.raises(ValueError):
+        packer.add(instruction(10), after=[big + 10])
@@ -0,0 +1,72 @@
+from help import TokenTransfer
+from payloads import (
+    AttestMeta,
+    Transfer,
+    TransferWithPayload,
+    PayloadRegistry,
+    TRANSFER,
+    decode_payload,
+    decode_transfer,
+    encode_attest_meta,
+    encode_transfer,
+    encode_transfer_with_payload,
+)
+from vaa_builder import encode_hello_token_message
+
+token_address = bytes(range(32))
+to = bytes(range(32, 64))
+from_address = bytes(range(64, 96))
+
+
+def test_transfer_round_trip():
+    record = decode_payload(encode_transfer(2 ** 200 + 1, token_address, 2, to, 1, 42))
+    assert isinstance(record, Transfer)
+    assert record.amount == 2 ** 200 + 1
+    assert record.token_address == token_address
+    assert record.token_chain == 2
+    assert record.to == to
+    assert record.to_chain == 1
+    assert record.fee == 42
+
+
+def test_attest_meta_round_trip():
+    record = decode_payload(encode_attest_meta(token_address, 2, 8, "WETH", "Wrapped Ether"))
+    assert isinstance(record, AttestMeta)
+    assert record.decimals == 8
+    assert record.symbol == "WETH"
+    assert record.name == "Wrapped Ether"
+
+
+def test_transfer_with_payload_round_trip():
+    message = encode_hello_token_message(to)
+    raw = encode_transfer_with_payload(1000, token_address, 21, to, 1, from_address, message)
+    record = decode_payload("0x" + raw.hex())
+    assert isinstance(record, TransferWithPayload)
+    assert record.amount == 1000
+    assert record.token_chain == 21
+    assert record.from_address == from_address
+    assert bytes(record.payload) == message
+
+
+def test_registry_counts_unknown_and_malformed():
+    registry = PayloadRegistry()
+    registry.register(TRANSFER, decode_transfer)
+    assert registry.decode(b"") is None
+    assert registry.decode(b"\x07") is None
+    assert registry.decode(encode_transfer(1, token_address, 2, to, 1, 0)[:40]) is None
+    assert registry.decode(encode_transfer(1, token_address, 2, to, 1, 0)).amount == 1
+    assert registry.stats() == {"decoded": {1: 1}, "unknown": {7: 1}, "malformed": {None: 1, 1: 1}}
+
+
+def test_token_transfer_uses_the_registry():
+    message = encode_hello_token_message(to)
+    transfer = TokenTransfer.parse_token_transfer_payload(
+        encode_transfer_with_payload(1000, token_address, 21, to, 1, from_address, message)
+    )
+    assert (transfer.payload_type, transfer.amount, transfer.token_chain) == (3, 1000, 21)
+    assert transfer.redeemer == to
+    assert transfer.from_emitter == from_address
+    assert transfer.recipient() == to
+
+    transfer = TokenTransfer.parse_token_transfer_payload(encode_transfer(7, token_address, 2, to, 1, 3))
+    assert (transfer.payload_type, transfer.amount, transfer.fee) == (1, 7, 3)
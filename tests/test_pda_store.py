@@ -0,0 +1,103 @@
+import os
+from types import SimpleNamespace
+
+from solders.pubkey import Pubkey
+
+import pda_store
+from help import PdaCache
+from pda_store import PdaStore, decode_seeds, encode_seeds
+
+program_id = Pubkey.new_unique()
+
+
+def seeds(i: int):
+    return [b"emitter", i.to_bytes(8, "big")]
+
+
+def clock(monkeypatch, now: int):
+    monkeypatch.setattr(pda_store, "time", SimpleNamespace(time=lambda: now))
+
+
+def test_seed_encoding():
+    raw = encode_seeds([b"", b"a", bytes(32)])
+    assert decode_seeds(raw) == (b"", b"a", bytes(32))
+
+
+def test_buffered_entries_are_visible_and_persist(tmp_path):
+    path = str(tmp_path / "pda.db")
+    store = PdaStore(path, flush_size=4)
+    address, bump = Pubkey.find_program_address(seeds(1), program_id)
+    store.put(bytes(program_id), seeds(1), bytes(address), bump)
+    # buffered, not written yet
+    assert store.get(bytes(program_id), seeds(1)) == (bytes(address), bump)
+    store.close()
+
+    reopened = PdaStore(path)
+    assert reopened.get(bytes(program_id), seeds(1)) == (bytes(address), bump)
+    assert reopened.get(bytes(program_id), seeds(2)) is None
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_batches_go_to_the_writer_thread(tmp_path):
+    store = PdaStore(str(tmp_path / "pda.db"), flush_size=2)
+    for i in range(5):
+        store.put(bytes(program_id), seeds(i), bytes(32), i)
+    # two full batches were handed off, one entry is still buffered
+    assert len(store._pending) == 1
+    assert len(store) == 5
+    store.close()
+
+
+def test_forked_worker_writes_through_its_own_connection(tmp_path):
+    path = str(tmp_path / "pda.db")
+    store = PdaStore(path)
+    store.put(bytes(program_id), seeds(1), bytes(32), 1)
+    store.flush()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            store.put(bytes(program_id), seeds(2), bytes(32), 2)
+            store.flush()
+            ok = store.get(bytes(program_id), seeds(1)) == (bytes(32), 1)
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    assert store.get(bytes(program_id), seeds(2)) == (bytes(32), 2)
+    store.close()
+
+
+def test_items_are_most_recently_used_first(tmp_path, monkeypatch):
+    store = PdaStore(str(tmp_path / "pda.db"))
+    for i in range(3):
+        clock(monkeypatch, 1000 + i)
+        store.put(bytes(program_id), seeds(i), bytes(32), i)
+    assert [bump for *_, bump in store.items()] == [2, 1, 0]
+
+    # a hit on a stale entry moves it to the front
+    clock(monkeypatch, 1000 + pda_store.TOUCH_INTERVAL + 10)
+    assert store.get(bytes(program_id), seeds(0)) == (bytes(32), 0)
+    assert [bump for *_, bump in store.items(limit=2)] == [0, 2]
+    store.close()
+
+
+def test_cache_warms_from_store(tmp_path, monkeypatch):
+    store = PdaStore(str(tmp_path / "pda.db"))
+    cache = PdaCache(store=store)
+    for i in range(3):
+        clock(monkeypatch, 1000 + i)
+        cache.find_program_address(seeds(i), program_id)
+    assert cache.stats()["misses"] == 3
+
+    # the newest entries survive a warm into a smaller cache
+    warmed = PdaCache(maxsize=2, store=store)
+    assert warmed.warm() == 2
+    assert warmed.find_program_address(seeds(2), program_id) == Pubkey.find_program_address(seeds(2), program_id)
+    assert warmed.stats()["hits"] == 1
+    warmed.find_program_address(seeds(0), program_id)
+    assert warmed.stats()["store_hits"] == 1
+    store.close()
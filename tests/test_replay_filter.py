@@ -0,0 +1,68 @@
+from hellotoken.errors.custom import AlreadyRedeemed, InvalidRecipient
+from replay_filter import ClaimFilter, claim_key, vaa_claim_key
+from vaa_builder import MockGuardianSet, VaaBuilder
+
+emitter = bytes(range(32))
+builder = VaaBuilder(MockGuardianSet.deterministic(1))
+
+
+def vaa(sequence: int) -> bytes:
+    return builder.build(2, emitter, sequence, b"payload")
+
+
+def test_claim_key_normalises_addresses():
+    key = claim_key(emitter, 2, 7)
+    assert claim_key("0x" + emitter.hex(), 2, 7) == key
+    assert claim_key(memoryview(emitter), 2, 7) == key
+    assert vaa_claim_key(vaa(7)) == key
+
+
+def test_acquire_and_release():
+    claims = ClaimFilter()
+    assert claims.acquire(vaa(1))
+    # in flight, a second redeem of the same transfer is refused
+    assert not claims.acquire(vaa(1))
+    assert claims.is_duplicate(vaa(1))
+    assert claims.acquire(vaa(2))
+
+    claims.release(vaa(1))
+    assert not claims.is_duplicate(vaa(1))
+    assert claims.acquire(vaa(1))
+
+    claims.release(vaa(1), redeemed=True)
+    assert not claims.acquire(vaa(1))
+    assert claims.is_claimed(emitter, 2, 1)
+    assert len(claims) == 1
+
+
+def test_release_with_error():
+    claims = ClaimFilter()
+    claims.acquire(vaa(1))
+    claims.acquire(vaa(2))
+    assert claims.release_with_error(vaa(1), AlreadyRedeemed())
+    assert not claims.release_with_error(vaa(2), InvalidRecipient())
+    assert claims.is_claimed(emitter, 2, 1)
+    assert not claims.is_claimed(emitter, 2, 2)
+    assert claims.acquire(vaa(2))
+
+
+def test_filter_drops_claimed_and_repeated():
+    claims = ClaimFilter()
+    claims.mark_claimed(emitter, 2, 1)
+    claims.acquire(vaa(2))
+    assert list(claims.filter([vaa(1), vaa(2), vaa(3), vaa(3), vaa(4)])) == [vaa(3), vaa(4)]
+
+
+def test_claims_persist(tmp_path):
+    path = str(tmp_path / "claims.db")
+    claims = ClaimFilter(path)
+    claims.acquire(vaa(1))
+    claims.release(vaa(1), redeemed=True)
+    claims.mark_claimed_keys([claim_key(emitter, 2, 5), claim_key(emitter, 2, 6)])
+    claims.close()
+
+    reopened = ClaimFilter(path)
+    assert len(reopened) == 3
+    assert not reopened.acquire(vaa(5))
+    assert reopened.acquire(vaa(2))
+    reopened.close()
@@ -0,0 +1,119 @@
+import asyncio
+
+from solana.transaction import Transaction
+from solders.instruction import AccountMeta, Instruction
+from solders.pubkey import Pubkey
+
+from scheduler import WriteLockScheduler, write_set
+
+program_id = Pubkey.new_unique()
+payer = Pubkey.new_unique()
+hot = Pubkey.new_unique()
+cold = Pubkey.new_unique()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def transaction(tag: int, *writable: Pubkey) -> Transaction:
+    accounts = [AccountMeta(payer, True, True)] + [AccountMeta(account, False, True) for account in writable]
+    return Transaction().add(Instruction(program_id, bytes([tag]), accounts))
+
+
+def tag(tx: Transaction) -> int:
+    return tx.instructions[0].data[0]
+
+
+def slots(transactions, max_writes_per_slot=2):
+    # dispatches slot by slot on a fake clock, returns the tags sent in each slot
+    clock = Clock()
+    sent = []
+
+    async def record(tx):
+        sent.append(tag(tx))
+        return tag(tx)
+
+    async def main():
+        scheduler = WriteLockScheduler(record, [payer], max_writes_per_slot, slot_seconds=1.0, clock=clock)
+        futures = [scheduler.submit(tx) for tx in transactions]
+        rounds = []
+        total = 0
+        while len(scheduler):
+            scheduler.dispatch()
+            # let the sends released in this slot run before the clock moves on
+            while total + len(sent) < scheduler.dispatched:
+                await asyncio.sleep(0)
+            # sends within a slot are concurrent, only which slot they landed in matters here
+            rounds.append(sorted(sent))
+            total += len(sent)
+            sent.clear()
+            clock.now += 1.0
+        assert await asyncio.gather(*futures) == [tag(tx) for tx in transactions]
+        return rounds, scheduler
+
+    return asyncio.run(main())
+
+
+def test_write_set_ignores_payer():
+    assert write_set(transaction(0, hot), [payer]) == frozenset([hot])
+
+
+def test_spreads_writes_over_slots():
+    rounds, scheduler = slots([transaction(i, hot) for i in range(5)])
+    assert rounds == [[0, 1], [2, 3], [4]]
+    assert scheduler.dispatched == 5
+    assert scheduler.deferred == 3 + 1
+
+
+def test_unrelated_transactions_overtake():
+    rounds, _scheduler = slots([transaction(0, hot), transaction(1, hot), transaction(2, hot), transaction(3, cold)])
+    assert rounds == [[0, 1, 3], [2]]
+
+
+def test_blocked_accounts_keep_their_order():
+    # 2 waits for hot, so 3 sharing hot and cold must not overtake it even though cold has room
+    rounds, _scheduler = slots([
+        transaction(0, hot), transaction(1, hot), transaction(2, hot), transaction(3, hot, cold), transaction(4, cold)
+    ])
+    assert rounds == [[0, 1], [2, 3, 4]]
+
+
+def test_new_slot_resets_counts():
+    clock = Clock()
+
+    async def main():
+        scheduler = WriteLockScheduler(lambda tx: asyncio.sleep(0), [payer], 1, slot_seconds=1.0, clock=clock)
+        scheduler.submit(transaction(0, hot))
+        scheduler.submit(transaction(1, hot))
+        assert scheduler.dispatch() == 1
+        clock.now += 0.5
+        assert scheduler.dispatch() == 0
+        clock.now += 0.5
+        assert scheduler.dispatch() == 1
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_same_account_sends_stay_ordered():
+    arrived = []
+
+    async def send(tx):
+        # later sends finish their own work first, the scheduler still has to keep the order
+        await asyncio.sleep(0.001 * (8 - tag(tx)))
+        arrived.append(tag(tx))
+
+    async def main():
+        scheduler = WriteLockScheduler(send, [payer], 8, slot_seconds=1.0, clock=Clock())
+        futures = [scheduler.submit(transaction(i, hot if i % 2 else cold)) for i in range(8)]
+        scheduler.dispatch()
+        await asyncio.gather(*futures)
+
+    asyncio.run(main())
+    assert [i for i in arrived if i % 2] == [1, 3, 5, 7]
+    assert [i for i in arrived if not i % 2] == [0, 2, 4, 6]
@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+from solders.pubkey import Pubkey
+
+from help import deriveTokenTransferMessageKey
+from sequence import MessageKeyWindow, SequenceAllocator
+
+
+class FakeClient:
+    # the token bridge sequence account, a little endian u64
+    def __init__(self, sequence: int):
+        self.sequence = sequence
+        self.reads = 0
+
+    async def get_account_info(self, account, commitment):
+        self.reads += 1
+        return SimpleNamespace(value=SimpleNamespace(data=self.sequence.to_bytes(8, "little")))
+
+
+def allocator(sequence: int = 10):
+    client = FakeClient(sequence)
+    return client, SequenceAllocator(client, Pubkey.new_unique())
+
+
+def test_concurrent_reservations_are_distinct():
+    client, sequences = allocator()
+
+    async def main():
+        return await asyncio.gather(*[sequences.reserve() for _ in range(5)])
+
+    assert asyncio.run(main()) == [(11, 0), (12, 0), (13, 0), (14, 0), (15, 0)]
+    assert client.reads == 1
+    assert sequences.in_flight == 5
+    assert not sequences.is_ahead(11)
+    assert sequences.is_ahead(12)
+
+
+def test_landed_release_moves_onchain():
+    _client, sequences = allocator()
+
+    async def main():
+        first = await sequences.reserve()
+        second = await sequences.reserve()
+        sequences.release(*second, landed=True)
+        sequences.release(*first, landed=True)
+
+    asyncio.run(main())
+    assert sequences.onchain == 12
+    assert sequences.in_flight == 0
+    assert sequences.epoch == 0
+
+
+def test_failure_rewinds_once():
+    client, sequences = allocator()
+
+    async def main():
+        reserved = [await sequences.reserve() for _ in range(3)]
+        sequences.release(*reserved[0], landed=True)
+        # 12 failed, so 13 was built on a message PDA that can not land either
+        sequences.release(*reserved[1], landed=False)
+        assert sequences.epoch == 1
+        sequences.release(*reserved[2], landed=False)
+        assert sequences.epoch == 1
+
+        # the next reservation re-reads the account and hands 12 out again
+        retry = await sequences.reserve()
+        assert retry == (12, 1)
+        assert client.reads == 2
+
+        # the old epoch's failure of 12 is stale now, the new one rewinds again
+        sequences.release(12, 0, landed=False)
+        assert sequences.epoch == 1
+        sequences.release(*retry, landed=False)
+        assert sequences.epoch == 2
+        return await sequences.reserve()
+
+    assert asyncio.run(main()) == (12, 2)
+
+
+def test_resync_skips_sequences_used_elsewhere():
+    client, sequences = allocator()
+
+    async def main():
+        reserved = await sequences.reserve()
+        # another sender used 11 through 20 meanwhile
+        client.sequence = 20
+        sequences.release(*reserved, landed=False)
+        return await sequences.reserve()
+
+    assert asyncio.run(main()) == (21, 1)
+    assert sequences.onchain == 20
+    assert sequences.resyncs == 2
+
+
+def test_message_key_window():
+    program_id = Pubkey.new_unique()
+
+    async def main():
+        window = MessageKeyWindow(program_id, size=8, low_water=2, batch_size=3)
+        # nothing to derive until the first sequence is known
+        await window.fill()
+        assert len(window) == 0
+
+        window.advance(100)
+        await window.fill()
+        assert sorted(window._keys) == list(range(100, 108))
+
+        assert window.get(100) == deriveTokenTransferMessageKey(program_id, 100)
+        assert window.hits == 1
+        # a sequence outside the window is derived on the spot
+        assert window.get(200) == deriveTokenTransferMessageKey(program_id, 200)
+        assert window.misses == 1
+        # everything below the last sequence used is dropped
+        assert len(window) == 0
+
+    asyncio.run(main())
+
+
+def test_message_key_window_refills_in_the_background():
+    program_id = Pubkey.new_unique()
+
+    async def main():
+        window = MessageKeyWindow(program_id, size=4, low_water=2, batch_size=4)
+        window.start()
+        window.advance(0)
+        while len(window) < 4:
+            await asyncio.sleep(0.01)
+
+        # using one key does not reach the low water mark, two do
+        window.get(0)
+        assert not window._wakeup.is_set()
+        window.get(1)
+        while len(window) < 4:
+            await asyncio.sleep(0.01)
+        assert sorted(window._keys) == [2, 3, 4, 5]
+        await window.stop()
+        assert window._task is None
+
+    asyncio.run(main())
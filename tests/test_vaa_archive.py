@@ -0,0 +1,75 @@
+import pytest
+
+from vaa_archive import MmapHashIndex, VaaArchive
+from vaa_builder import MockGuardianSet, VaaBuilder
+
+builder = VaaBuilder(MockGuardianSet.deterministic(3))
+emitter = bytes(range(32))
+
+
+def vaa(sequence: int) -> bytes:
+    return builder.build(21, emitter, sequence, b"payload %d" % sequence)
+
+
+def test_append_and_lookup(tmp_path):
+    archive = VaaArchive(str(tmp_path / "archive"))
+    assert archive.append(vaa(1))
+    assert not archive.append(vaa(1))
+    assert archive.append(vaa(3))
+    assert len(archive) == 2
+
+    found = archive.get(21, emitter, 1)
+    assert bytes(found.payload) == b"payload 1"
+    assert bytes(archive.get_by_hash(found.hash).raw) == vaa(1)
+    assert found.hash in archive
+    assert archive.get(21, emitter.hex(), 2) is None
+    assert [v.sequence for v in archive.scan(21, emitter, 0, 5)] == [1, 3]
+    archive.close()
+
+
+def test_index_capacity_is_a_power_of_two(tmp_path):
+    for capacity, expected in [(1, 2), (2, 2), (3, 4), (1000, 1024), (1024, 1024)]:
+        index = MmapHashIndex(str(tmp_path / f"{capacity}.idx"), 8, capacity)
+        assert index.capacity == expected
+        index.close()
+
+
+def test_index_grows(tmp_path):
+    index = MmapHashIndex(str(tmp_path / "hash.idx"), 8, capacity=4)
+    keys = [i.to_bytes(8, "big") for i in range(100)]
+    for offset, key in enumerate(keys):
+        assert index.put(key, offset)
+    assert not index.put(keys[0], 1000)
+    assert index.capacity == 256
+    assert index.count == 100
+    assert all(index.get(key) == offset for offset, key in enumerate(keys))
+    index.close()
+
+    reopened = MmapHashIndex(str(tmp_path / "hash.idx"), 8)
+    assert reopened.capacity == 256
+    assert dict(reopened.items()) == {key: offset for offset, key in enumerate(keys)}
+    reopened.close()
+
+    with pytest.raises(ValueError, match="byte keys"):
+        MmapHashIndex(str(tmp_path / "hash.idx"), 32)
+
+
+def test_readers_see_growth_by_another_writer(tmp_path):
+    path = str(tmp_path / "archive")
+    writer = VaaArchive(path, index_capacity=4)
+    reader = VaaArchive(path, index_capacity=4)
+    writer.append(vaa(0))
+    assert reader.get(21, emitter, 0).sequence == 0
+
+    # the writer's index files are replaced as they grow, the reader reloads them
+    for sequence in range(1, 20):
+        writer.append(vaa(sequence))
+    assert writer.by_hash.capacity > 4
+    assert reader.get(21, emitter, 19).sequence == 19
+    assert len(reader) == 20
+    writer.close()
+    reader.close()
+
+    reopened = VaaArchive(path)
+    assert [v.sequence for v in reopened.scan(21, emitter, 0, 20)] == list(range(20))
+    reopened.close()
@@ -0,0 +1,42 @@
+from help import LazyParsedVaa
+from payloads import decode_payload
+from vaa_builder import MockGuardianSet, VaaBuilder, encode_hello_token_message, generate_hello_token_vaas
+
+token_address = bytes(range(32))
+to = bytes(range(32, 64))
+from_address = bytes(range(64, 96))
+
+
+def test_vaa_builder_round_trip():
+    builder = VaaBuilder(MockGuardianSet.deterministic(3, index=4))
+    raw = builder.build_hello_token_transfer(
+        21, from_address, 7, 1000, token_address, 2, to, 1, from_address, to, timestamp=5, nonce=6
+    )
+    vaa = LazyParsedVaa.parse_vaa(raw)
+    assert vaa.guardian_set_index == 4
+    assert len(vaa.guardian_signatures) == 3
+    assert vaa.timestamp == 5
+    assert vaa.nonce == 6
+    assert vaa.emitter_chain == 21
+    assert bytes(vaa.emitter_address) == from_address
+    assert vaa.sequence == 7
+
+    record = decode_payload(vaa.payload)
+    assert record.amount == 1000
+    assert bytes(record.payload) == encode_hello_token_message(to)
+
+
+def test_generated_vaas_are_deterministic():
+    guardians = MockGuardianSet.deterministic(2)
+    first = list(generate_hello_token_vaas(VaaBuilder(guardians), 3, seed=9, start=10))
+    again = list(generate_hello_token_vaas(VaaBuilder(guardians), 2, seed=9, start=11))
+    assert first[1:] == again
+    assert [LazyParsedVaa.parse_vaa(raw).sequence for raw in first] == [10, 11, 12]
+    assert list(generate_hello_token_vaas(VaaBuilder(guardians), 1, seed=8, start=10)) != first[:1]
+
+
+def test_num_signers():
+    guardians = MockGuardianSet.deterministic(5)
+    vaa = LazyParsedVaa.parse_vaa(VaaBuilder(guardians, num_signers=2).build(2, from_address, 1, b"x"))
+    assert [signature["index"] for signature in vaa.guardian_signatures] == [0, 1]
+    assert bytes(vaa.payload) == b"x"
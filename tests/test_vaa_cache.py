@@ -0,0 +1,101 @@
+import asyncio
+import base64
+
+import httpx
+
+from vaa_cache import VaaCache
+from vaa_fetch import VaaFetcher
+
+emitter = "40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9"
+
+
+def blob_count(cache: VaaCache) -> int:
+    return cache._connection().execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+
+def test_put_and_get(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"))
+    assert cache.get(21, emitter, 1) is None
+    cache.put(21, bytes.fromhex(emitter), 1, b"first")
+    assert cache.get(21, "0x" + emitter.upper(), 1) == b"first"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_identical_vaas_share_a_blob(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"))
+    cache.put(21, emitter, 1, b"same")
+    cache.put(21, emitter, 2, b"same")
+    cache.put(21, emitter, 2, b"same")
+    assert blob_count(cache) == 1
+    assert cache.size() == 4
+
+
+def test_replaced_vaa_releases_old_blob(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"))
+    cache.put(21, emitter, 1, b"signed by 13")
+    cache.put(21, emitter, 2, b"shared")
+    cache.put(21, emitter, 3, b"shared")
+
+    # a re-observation with a different signature set replaces the bytes
+    cache.put(21, emitter, 1, b"signed by 19 guardians")
+    assert cache.get(21, emitter, 1) == b"signed by 19 guardians"
+    assert blob_count(cache) == 2
+    assert cache.size() == len(b"signed by 19 guardians") + len(b"shared")
+
+    # a blob still referenced by another key stays
+    cache.put(21, emitter, 2, b"other")
+    assert cache.get(21, emitter, 3) == b"shared"
+    assert cache.size() == len(b"signed by 19 guardians") + len(b"shared") + len(b"other")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"), max_bytes=1000)
+    for sequence in range(5):
+        cache.put(21, emitter, sequence, bytes([sequence]) * 300)
+    assert cache.size() <= 900
+    assert cache.get(21, emitter, 0) is None
+    assert cache.get(21, emitter, 4) is not None
+    assert blob_count(cache) * 300 == cache.size()
+
+
+def test_size_survives_reopen(tmp_path):
+    path = str(tmp_path / "vaa.db")
+    cache = VaaCache(path)
+    cache.put(21, emitter, 1, b"abc")
+    cache.close()
+    assert VaaCache(path).size() == 3
+
+
+def test_negative_entries_expire(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"), negative_ttl=60)
+    cache.put_unsigned(21, emitter, 1)
+    assert cache.is_unsigned(21, emitter, 1)
+    cache.put(21, emitter, 1, b"signed")
+    assert not cache.is_unsigned(21, emitter, 1)
+
+    expired = VaaCache(str(tmp_path / "expired.db"), negative_ttl=-1)
+    expired.put_unsigned(21, emitter, 1)
+    assert not expired.is_unsigned(21, emitter, 1)
+
+
+def test_fetch_retries_past_the_negative_entry(tmp_path):
+    cache = VaaCache(str(tmp_path / "vaa.db"))
+    responses = [httpx.Response(404, json={}), httpx.Response(200, json={"vaaBytes": base64.b64encode(b"signed").decode()})]
+    requests = []
+
+    def api(request):
+        requests.append(request)
+        return responses.pop(0)
+
+    async def main():
+        fetcher = VaaFetcher("http://guardian.test", backoff=0, cache=cache, transport=httpx.MockTransport(api))
+        async with fetcher:
+            vaa = await fetcher.fetch(21, emitter, 1)
+            # served from the cache from now on
+            assert await fetcher.fetch(21, emitter, 1) == vaa
+            return vaa
+
+    assert asyncio.run(main()) == b"signed"
+    assert len(requests) == 2
+    assert cache.get(21, emitter, 1) == b"signed"
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from payloads import encode_attest_meta, encode_transfer, encode_transfer_with_payload
+from vaa_builder import MockGuardianSet, VaaBuilder
+from vaa_columns import as_columns, join_length_prefixed, parse_vaa_columns, split_length_prefixed
+
+builder = VaaBuilder(MockGuardianSet.deterministic(3, index=2))
+emitter = bytes(range(32))
+token = bytes([7]) * 32
+to = bytes([9]) * 32
+
+
+def vaa(sequence: int, payload: bytes) -> bytes:
+    return builder.build(21, emitter, sequence, payload, timestamp=sequence * 10, nonce=sequence)
+
+
+def test_transfer_columns():
+    vaas = [
+        vaa(1, encode_transfer(1234, token, 2, to, 1, 0)),
+        vaa(2, encode_transfer_with_payload(5678, token, 21, to, 1, emitter, b"hello")),
+        vaa(3, encode_attest_meta(token, 2, 8, "USDC", "USD Coin")),
+        vaa(4, b""),
+    ]
+    parsed = parse_vaa_columns(vaas)
+    assert parsed["sequence"].tolist() == [1, 2, 3, 4]
+    assert parsed["timestamp"].tolist() == [10, 20, 30, 40]
+    assert parsed["guardian_set_index"].tolist() == [2] * 4
+    assert parsed["emitter_chain"].tolist() == [21] * 4
+    assert bytes(parsed["emitter_address"][0]) == emitter
+    assert parsed["payload_type"].tolist() == [1, 3, 2, 0]
+    assert parsed["amount"].tolist() == [1234, 5678, 0, 0]
+    assert parsed["token_chain"].tolist() == [2, 21, 0, 0]
+    assert bytes(parsed["redeemer"][1]) == to
+    assert not parsed["amount_overflow"].any()
+
+
+def test_amount_overflow():
+    vaas = [
+        vaa(1, encode_transfer(2 ** 64 - 1, token, 2, to, 1, 0)),
+        vaa(2, encode_transfer(2 ** 64, token, 2, to, 1, 0)),
+        vaa(3, encode_transfer(2 ** 200 + 5, token, 2, to, 1, 0)),
+    ]
+    parsed = parse_vaa_columns(vaas)
+    assert parsed["amount_overflow"].tolist() == [False, True, True]
+    # the low 64 bits are still there, callers decide what an overflowed row means
+    assert parsed["amount"].tolist() == [2 ** 64 - 1, 0, 5]
+
+
+def test_length_prefixed_buffer():
+    vaas = [vaa(sequence, encode_transfer(sequence, token, 2, to, 1, 0)) for sequence in range(5)]
+    buffer = join_length_prefixed(vaas)
+    starts, lengths = split_length_prefixed(buffer)
+    assert lengths.tolist() == [len(v) for v in vaas]
+    assert np.array_equal(parse_vaa_columns(buffer), parse_vaa_columns(vaas))
+    assert as_columns(parse_vaa_columns(buffer))["amount"].tolist() == list(range(5))
+
+    with pytest.raises(ValueError, match="truncated"):
+        split_length_prefixed(buffer[:-1])
+
+
+def test_short_vaa():
+    with pytest.raises(ValueError, match="VAA 1 is too short"):
+        parse_vaa_columns([vaa(1, b""), vaa(2, b"")[:-1]])
+    assert len(parse_vaa_columns([])) == 0
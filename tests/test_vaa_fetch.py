@@ -0,0 +1,200 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from vaa_fetch import BackfillCheckpoint, VaaFetcher, VaaNotFound, fetch_range, retry_missing
+
+emitter = "40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9"
+
+
+def vaa(sequence: int) -> bytes:
+    return b"vaa-%d" % sequence
+
+
+class GuardianApi:
+    # stand-in guardian API: each sequence answers with the queued statuses first, then
+    # 200 if it is signed and 404 otherwise
+    def __init__(self, signed=(), statuses=None):
+        self.signed = set(signed)
+        self.statuses = {sequence: list(codes) for sequence, codes in (statuses or {}).items()}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        chain, address, sequence = request.url.path.split("/")[-3:]
+        sequence = int(sequence)
+        self.requests.append(sequence)
+        assert (chain, address) == ("21", emitter)
+        queued = self.statuses.get(sequence)
+        if queued:
+            return httpx.Response(queued.pop(0), json={"code": 5, "message": "try again"})
+        if sequence not in self.signed:
+            return httpx.Response(404, json={"code": 5, "message": "requested VAA not found in store"})
+        return httpx.Response(200, json={"vaaBytes": base64.b64encode(vaa(sequence)).decode()})
+
+
+def fetcher(api: GuardianApi, retries: int = 3) -> VaaFetcher:
+    f = VaaFetcher("http://guardian.test", retries=retries, transport=httpx.MockTransport(api))
+    # record the backoff attempts instead of sleeping through them
+    f.delays = []
+
+    def retry_delay(attempt):
+        f.delays.append(attempt)
+        return 0
+
+    f._retry_delay = retry_delay
+    return f
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_fetch():
+    api = GuardianApi(signed=[7])
+
+    async def main():
+        async with fetcher(api) as f:
+            return await f.fetch(21, bytes.fromhex(emitter), 7)
+
+    assert run(main()) == vaa(7)
+    assert api.requests == [7]
+
+
+def test_not_signed_then_signed():
+    api = GuardianApi(signed=[7], statuses={7: [404, 404]})
+
+    async def main():
+        async with fetcher(api) as f:
+            return await f.fetch(21, emitter, 7), f.delays
+
+    assert run(main()) == (vaa(7), [0, 1])
+    assert api.requests == [7, 7, 7]
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_rate_limit_and_server_errors_back_off(status):
+    api = GuardianApi(signed=[7], statuses={7: [status, status]})
+
+    async def main():
+        async with fetcher(api) as f:
+            return await f.fetch(21, emitter, 7), f.delays
+
+    assert run(main()) == (vaa(7), [0, 1])
+
+
+def test_retry_delay_grows_and_is_capped():
+    f = VaaFetcher(backoff=0.5, max_backoff=4.0)
+    for attempt, base in [(0, 0.5), (1, 1.0), (2, 2.0), (5, 4.0)]:
+        assert base * 0.5 <= f._retry_delay(attempt) <= base * 1.5
+
+
+def test_exhausted_retries():
+    api = GuardianApi(statuses={8: [503, 503, 503]})
+
+    async def main():
+        async with fetcher(api, retries=2) as f:
+            await f.fetch(21, emitter, 7)
+
+    with pytest.raises(VaaNotFound) as e:
+        run(main())
+    assert e.value.sequence == 7
+    assert e.value.reason == "not signed"
+    assert api.requests == [7, 7, 7]
+
+    async def unavailable():
+        async with fetcher(api, retries=2) as f:
+            await f.fetch(21, emitter, 8)
+
+    with pytest.raises(VaaNotFound) as e:
+        run(unavailable())
+    assert e.value.reason == "HTTP 503"
+
+
+def test_fetch_range_is_ordered_and_checkpointed(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    # 12 is never signed, 11 only on the second try
+    api = GuardianApi(signed=[10, 11, 13, 14], statuses={11: [500]})
+
+    async def main(start, end):
+        checkpoint = BackfillCheckpoint(path)
+        async with fetcher(api, retries=1) as f:
+            return [sequence async for sequence, _vaa in fetch_range(f, 21, emitter, start, end, window=3, checkpoint=checkpoint)]
+
+    assert run(main(10, 15)) == [10, 11, 13, 14]
+    checkpoint = BackfillCheckpoint(path)
+    assert checkpoint.next_sequence == 15
+    assert checkpoint.missing == {12}
+
+    # a rerun resumes after the checkpoint instead of fetching the range again
+    api.requests.clear()
+    api.signed.add(15)
+    assert run(main(10, 16)) == [15]
+    assert api.requests == [15]
+
+    async def missing():
+        checkpoint = BackfillCheckpoint(path)
+        async with fetcher(api, retries=0) as f:
+            found = [sequence async for sequence, _vaa in retry_missing(f, 21, emitter, checkpoint)]
+        return found, checkpoint.missing
+
+    api.signed.add(12)
+    assert run(missing()) == ([12], set())
+    assert BackfillCheckpoint(path).missing == set()
+
+
+def test_interrupted_range_yields_the_last_sequence_again(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    api = GuardianApi(signed=range(5))
+
+    async def first():
+        checkpoint = BackfillCheckpoint(path)
+        async with fetcher(api) as f:
+            async for sequence, _vaa in fetch_range(f, 21, emitter, 0, 5, checkpoint=checkpoint):
+                if sequence == 2:
+                    break
+
+    async def rest():
+        checkpoint = BackfillCheckpoint(path)
+        async with fetcher(api) as f:
+            return [sequence async for sequence, _vaa in fetch_range(f, 21, emitter, 0, 5, checkpoint=checkpoint)]
+
+    run(first())
+    assert run(rest()) == [2, 3, 4]
+
+
+def test_checkpoint_state(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = BackfillCheckpoint(path)
+    assert checkpoint.next_sequence is None
+    assert checkpoint.contiguous is None
+
+    checkpoint.advance(4, found=False)
+    checkpoint.advance(5, found=True)
+    assert checkpoint.contiguous == 5
+    # nothing is written until save
+    assert BackfillCheckpoint(path).next_sequence is None
+    checkpoint.save()
+
+    loaded = BackfillCheckpoint(path)
+    assert (loaded.next_sequence, loaded.missing) == (6, {4})
+    loaded.advance(4, found=True)
+    assert loaded.missing == set()
+
+
+def test_checkpoint_is_saved_every_few_sequences(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    api = GuardianApi(signed=range(10))
+
+    async def main():
+        checkpoint = BackfillCheckpoint(path)
+        saved = []
+        async with fetcher(api) as f:
+            async for sequence, _vaa in fetch_range(f, 21, emitter, 0, 10, checkpoint=checkpoint, save_every=4):
+                saved.append(BackfillCheckpoint(path).next_sequence)
+        return saved
+
+    # sequence n is handed out before the checkpoint moves past it
+    assert run(main()) == [None] * 4 + [4] * 4 + [8] * 2
+    assert BackfillCheckpoint(path).next_sequence == 10
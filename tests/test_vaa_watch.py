@@ -0,0 +1,69 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from vaa_fetch import VaaFetcher
+from vaa_watch import SequenceWatcher
+
+emitter = "40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9"
+
+
+def test_backoff_and_errors():
+    # answers in order: not signed twice, a burst of two VAAs, then nothing, a 503 and a bad answer
+    responses = [
+        httpx.Response(404, json={}),
+        httpx.Response(404, json={}),
+        httpx.Response(200, json={"vaaBytes": base64.b64encode(b"vaa-5").decode()}),
+        httpx.Response(200, json={"vaaBytes": base64.b64encode(b"vaa-6").decode()}),
+        httpx.Response(404, json={}),
+        httpx.Response(503, json={}),
+        httpx.Response(400, json={"code": 3, "message": "invalid emitter"}),
+        httpx.Response(404, json={}),
+    ]
+    requested = []
+
+    def api(request):
+        requested.append(int(request.url.path.split("/")[-1]))
+        return responses.pop(0)
+
+    async def main():
+        async with VaaFetcher("http://guardian.test", transport=httpx.MockTransport(api)) as fetcher:
+            watcher = SequenceWatcher(fetcher, 21, emitter, 5, min_interval=1, max_interval=5, backoff_factor=2)
+            waits = []
+
+            async def wait():
+                # record the interval instead of sleeping, stop once every response is used
+                if not responses:
+                    raise asyncio.CancelledError
+                waits.append(watcher.interval)
+
+            watcher._wait = wait
+            with pytest.raises(asyncio.CancelledError):
+                await watcher.run()
+            return watcher, waits
+
+    watcher, waits = asyncio.run(main())
+    assert waits == [1, 2, 1, 2, 4]
+    assert requested == [5, 5, 5, 6, 7, 7, 7, 7]
+    assert watcher.next_sequence == 7
+    assert watcher.last_sequence == 6
+    assert watcher.delivered == 2
+    assert watcher.errors == 1
+    assert watcher.polls == 8
+    assert [watcher.queue.get_nowait() for _ in range(2)] == [(5, b"vaa-5"), (6, b"vaa-6")]
+
+
+def test_nudge_wakes_the_watcher():
+    async def main():
+        watcher = SequenceWatcher(VaaFetcher(), 21, emitter, 0, min_interval=0.1, max_interval=60)
+        watcher.interval = 60
+        waiting = asyncio.ensure_future(watcher._wait())
+        await asyncio.sleep(0)
+        watcher.nudge()
+        await asyncio.wait_for(waiting, 1)
+        assert watcher.interval == 0.1
+        assert watcher.last_sequence is None
+
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from typing import Iterator, Optional, Tuple, Union
+
+from help import LazyParsedVaa
+
+_RECORD_HEADER = struct.Struct("<I")
+_EMITTER_KEY = struct.Struct(">H32sQ")
+
+# magic, key_size, capacity, count
+_INDEX_HEADER = struct.Struct("<8sIQQ")
+_INDEX_MAGIC = b"HTVAAIDX"
+_INDEX_VALUE = struct.Struct("<Q")
+
+
+def _slot_hash(key: bytes) -> int:
+    # must be stable across processes, so no builtin hash()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class MmapHashIndex:
+    # open addressing table of fixed size keys -> segment offset, stored in
+    # a memory-mapped file. Values are offset + 1 so that 0 marks an empty slot.
+
+    def __init__(self, path: str, key_size: int, capacity: int = 1 << 16):
+        self.path = path
+        self.key_size = key_size
+        self.slot_size = key_size + _INDEX_VALUE.size
+        if not os.path.exists(path):
+            # slots are addressed with capacity - 1 as a mask, so round up to a power of two
+            self._create(path, 1 << max(capacity - 1, 1).bit_length())
+        self._map = None
+        self._inode = None
+        self.reload()
+
+    def _create(self, path: str, capacity: int):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.key_size, capacity, 0))
+            file.truncate(_INDEX_HEADER.size + capacity * self.slot_size)
+        os.replace(tmp_path, path)
+
+    def reload(self):
+        with open(self.path, "r+b") as file:
+            inode = os.fstat(file.fileno()).st_ino
+            if inode == self._inode:
+                return
+            new_map = mmap.mmap(file.fileno(), 0)
+
+        magic, key_size, capacity, _count = _INDEX_HEADER.unpack_from(new_map, 0)
+        if magic != _INDEX_MAGIC or key_size != self.key_size:
+            new_map.close()
+            raise ValueError(f"{self.path} is not a VAA index with {self.key_size} byte keys")
+        if capacity < 2 or capacity & (capacity - 1):
+            new_map.close()
+            raise ValueError(f"{self.path} has capacity {capacity}, expected a power of two")
+
+        if self._map is not None:
+            self._close_map()
+        self._map = new_map
+        self._inode = inode
+        self.capacity = capacity
+
+    def is_stale(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return False
+
+    @property
+    def count(self) -> int:
+        return _INDEX_HEADER.unpack_from(self._map, 0)[3]
+
+    def _probe(self, key: bytes) -> Tuple[int, int]:
+        # returns (slot position, value); value is 0 when the key is not present
+        mask = self.capacity - 1
+        slot = _slot_hash(key) & mask
+        key_size = self.key_size
+        while True:
+            position = _INDEX_HEADER.size + slot * self.slot_size
+            value = _INDEX_VALUE.unpack_from(self._map, position + key_size)[0]
+            if value == 0 or self._map[position:position + key_size] == key:
+                return position, value
+            slot = (slot + 1) & mask
+
+    def get(self, key: bytes) -> Optional[int]:
+        _position, value = self._probe(key)
+        if value == 0 and self.is_stale():
+            self.reload()
+            _position, value = self._probe(key)
+        return value - 1 if value else None
+
+    def put(self, key: bytes, offset: int) -> bool:
+        # callers must hold the archive write lock
+        if (self.count + 1) * 2 > self.capacity:
+            self._grow()
+
+        position, value = self._probe(key)
+        if value:
+            return False
+
+        # key first, value last: readers treat a zero value as an empty slot
+        self._map[position:position + self.key_size] = key
+        _INDEX_VALUE.pack_into(self._map, position + self.key_size, offset + 1)
+        _INDEX_HEADER.pack_into(self._map, 0, _INDEX_MAGIC, self.key_size, self.capacity, self.count + 1)
+        return True
+
+    def _grow(self):
+        entries = list(self.items())
+        capacity = self.capacity * 2
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w+b") as file:
+            file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.key_size, capacity, len(entries)))
+            file.truncate(_INDEX_HEADER.size + capacity * self.slot_size)
+            file.flush()
+            with mmap.mmap(file.fileno(), 0) as new_map:
+                mask = capacity - 1
+                for key, offset in entries:
+                    slot = _slot_hash(key) & mask
+                    while True:
+                        position = _INDEX_HEADER.size + slot * self.slot_size
+                        if _INDEX_VALUE.unpack_from(new_map, position + self.key_size)[0] == 0:
+                            break
+                        slot = (slot + 1) & mask
+                    new_map[position:position + self.key_size] = key
+                    _INDEX_VALUE.pack_into(new_map, position + self.key_size, offset + 1)
+                new_map.flush()
+        # readers still holding the old map keep a consistent, if stale, view
+        os.replace(tmp_path, self.path)
+        self.reload()
+
+    def items(self) -> Iterator[Tuple[bytes, int]]:
+        for slot in range(self.capacity):
+            position = _INDEX_HEADER.size + slot * self.slot_size
+            value = _INDEX_VALUE.unpack_from(self._map, position + self.key_size)[0]
+            if value:
+                yield bytes(self._map[position:position + self.key_size]), value - 1
+
+    def flush(self):
+        self._map.flush()
+
+    def _close_map(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # exported memoryviews keep the old map alive until they are released
+            pass
+
+    def close(self):
+        if self._map is not None:
+            self._close_map()
+            self._map = None
+            self._inode = None
+
+
+class VaaArchive:
+    def __init__(self, path: str, index_capacity: int = 1 << 16):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self._segment_path = os.path.join(path, "vaas.seg")
+        self._lock_path = os.path.join(path, "write.lock")
+        open(self._segment_path, "ab").close()
+
+        with self._write_lock():
+            self.by_hash = MmapHashIndex(os.path.join(path, "hash.idx"), 32, index_capacity)
+            self.by_emitter = MmapHashIndex(os.path.join(path, "emitter.idx"), _EMITTER_KEY.size, index_capacity)
+
+        self._segment = None
+        self._segment_size = 0
+        self._remap_segment()
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        # one writer at a time across processes, readers never lock
+        with open(self._lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _remap_segment(self):
+        size = os.path.getsize(self._segment_path)
+        if size == self._segment_size:
+            return
+        with open(self._segment_path, "rb") as file:
+            segment = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._segment is not None:
+            try:
+                self._segment.close()
+            except BufferError:
+                pass
+        self._segment = segment
+        self._segment_size = size
+
+    @staticmethod
+    def emitter_key(emitter_chain: int, emitter_address: Union[bytes, memoryview, str], sequence: int) -> bytes:
+        if isinstance(emitter_address, str):
+            emitter_address = bytes.fromhex(emitter_address.replace("0x", ""))
+        return _EMITTER_KEY.pack(emitter_chain, bytes(emitter_address), sequence)
+
+    def append(self, vaa: Union[bytes, memoryview, str]) -> bool:
+        parsed = LazyParsedVaa.parse_vaa(vaa)
+        raw = parsed.raw
+        vaa_hash = parsed.hash
+        emitter_key = self.emitter_key(parsed.emitter_chain, parsed.emitter_address, parsed.sequence)
+
+        with self._write_lock():
+            self.by_hash.reload()
+            self.by_emitter.reload()
+            if self.by_hash.get(vaa_hash) is not None:
+                return False
+
+            with open(self._segment_path, "ab") as segment:
+                offset = segment.tell()
+                segment.write(_RECORD_HEADER.pack(len(raw)))
+                segment.write(raw)
+                segment.flush()
+                os.fsync(segment.fileno())
+
+            # index only after the record is durable, so readers never see a dangling offset
+            self.by_emitter.put(emitter_key, offset)
+            self.by_hash.put(vaa_hash, offset)
+
+        return True
+
+    def raw(self, offset: int) -> memoryview:
+        if offset + _RECORD_HEADER.size > self._segment_size:
+            self._remap_segment()
+        length = _RECORD_HEADER.unpack_from(self._segment, offset)[0]
+        start = offset + _RECORD_HEADER.size
+        if start + length > self._segment_size:
+            self._remap_segment()
+        return memoryview(self._segment)[start:start + length]
+
+    def get_by_hash(self, vaa_hash: Union[bytes, str]) -> Optional[LazyParsedVaa]:
+        if isinstance(vaa_hash, str):
+            vaa_hash = bytes.fromhex(vaa_hash.replace("0x", ""))
+        offset = self.by_hash.get(bytes(vaa_hash))
+        if offset is None:
+            return None
+        return LazyParsedVaa(self.raw(offset))
+
+    def get(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int) -> Optional[LazyParsedVaa]:
+        offset = self.by_emitter.get(self.emitter_key(emitter_chain, emitter_address, sequence))
+        if offset is None:
+            return None
+        return LazyParsedVaa(self.raw(offset))
+
+    def scan(
+            self,
+            emitter_chain: int,
+            emitter_address: Union[bytes, str],
+            start: int,
+            end: int
+    ) -> Iterator[LazyParsedVaa]:
+        # sequences in [start, end), missing sequences are skipped
+        for sequence in range(start, end):
+            vaa = self.get(emitter_chain, emitter_address, sequence)
+            if vaa is not None:
+                yield vaa
+
+    def __contains__(self, vaa_hash: bytes):
+        return self.by_hash.get(bytes(vaa_hash)) is not None
+
+    def __len__(self):
+        if self.by_hash.is_stale():
+            self.by_hash.reload()
+        return self.by_hash.count
+
+    def close(self):
+        self.by_hash.close()
+        self.by_emitter.close()
+        if self._segment is not None:
+            try:
+                self._segment.close()
+            except BufferError:
+                pass
+            self._segment = None
+            self._segment_size = 0
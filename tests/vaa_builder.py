@@ -0,0 +1,228 @@
+import os
+import random
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from eth_keys.datatypes import PrivateKey
+from eth_utils import keccak
+
+from guardian import GuardianSet, vaa_digest
+from payloads import pack_transfer_with_payload_into, transfer_with_payload_size
+
+# tilt devnet guardian, never use outside of local testing
+DEVNET_GUARDIAN_PRIVATE_KEY = "cfb12303a19cde580bb4dd771639b0d26bc68353645571a8cff516ab2ee113a0"
+
+# HelloTokenMessage::Hello
+HELLO_PAYLOAD_ID = 1
+HELLO_MESSAGE_SIZE = 33
+
+_SIG_START = 6
+_SIG_LENGTH = 66
+_BODY_HEADER_SIZE = 51
+
+# version, guardian_set_index, num_signatures
+_HEADER = struct.Struct(">BIB")
+# timestamp, nonce, emitter_chain, emitter_address, sequence, consistency_level
+_BODY_HEADER = struct.Struct(">IIH32sQB")
+
+
+def encode_hello_token_message(recipient: bytes) -> bytes:
+    assert len(recipient) == 32, "recipient.length != 32"
+    return bytes([HELLO_PAYLOAD_ID]) + bytes(recipient)
+
+
+class MockGuardianSet:
+    def __init__(self, private_keys: Sequence[Union[bytes, str]], index: int = 0):
+        self.index = index
+        self.private_keys: List[bytes] = [
+            bytes.fromhex(private_key.replace("0x", "")) if isinstance(private_key, str) else bytes(private_key)
+            for private_key in private_keys
+        ]
+        self._private_keys = [PrivateKey(private_key) for private_key in self.private_keys]
+
+    @classmethod
+    def devnet(cls, index: int = 0) -> "MockGuardianSet":
+        return cls([DEVNET_GUARDIAN_PRIVATE_KEY], index)
+
+    @classmethod
+    def deterministic(cls, count: int, seed: int = 0, index: int = 0) -> "MockGuardianSet":
+        return cls([keccak(f"guardian/{seed}/{i}".encode()) for i in range(count)], index)
+
+    @property
+    def guardian_set(self) -> GuardianSet:
+        return GuardianSet(
+            self.index,
+            [private_key.public_key.to_canonical_address() for private_key in self._private_keys]
+        )
+
+    @property
+    def quorum(self) -> int:
+        return self.guardian_set.quorum
+
+    def __len__(self):
+        return len(self._private_keys)
+
+    def sign(self, digest: bytes, signers: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, bytes]]:
+        if signers is None:
+            signers = range(len(self._private_keys))
+        for index in signers:
+            yield index, self._private_keys[index].sign_msg_hash(digest).to_bytes()
+
+
+class VaaBuilder:
+    def __init__(
+            self,
+            guardians: MockGuardianSet,
+            num_signers: Optional[int] = None,
+            version: int = 1,
+            buffer_size: int = 4096
+    ):
+        self.guardians = guardians
+        # sign with every guardian by default, or only the first num_signers
+        self.signers = list(range(len(guardians) if num_signers is None else num_signers))
+        self.version = version
+        self._buffer = bytearray(buffer_size)
+
+    def _reserve(self, payload_length: int) -> Tuple[int, int]:
+        body_start = _SIG_START + _SIG_LENGTH * len(self.signers)
+        size = body_start + _BODY_HEADER_SIZE + payload_length
+        if size > len(self._buffer):
+            self._buffer = bytearray(max(size, 2 * len(self._buffer)))
+        return body_start, size
+
+    def _finish(self, body_start: int, size: int, header: tuple) -> bytes:
+        buf = self._buffer
+        _HEADER.pack_into(buf, 0, self.version, self.guardians.index, len(self.signers))
+        _BODY_HEADER.pack_into(buf, body_start, *header)
+
+        with memoryview(buf) as view:
+            digest = vaa_digest(view[body_start:size])
+
+        offset = _SIG_START
+        for index, signature in self.guardians.sign(digest, self.signers):
+            buf[offset] = index
+            buf[offset + 1:offset + _SIG_LENGTH] = signature
+            offset += _SIG_LENGTH
+
+        return bytes(buf[:size])
+
+    def build(
+            self,
+            emitter_chain: int,
+            emitter_address: bytes,
+            sequence: int,
+            payload: bytes,
+            timestamp: int = 0,
+            nonce: int = 0,
+            consistency_level: int = 1
+    ) -> bytes:
+        body_start, size = self._reserve(len(payload))
+        payload_start = body_start + _BODY_HEADER_SIZE
+        self._buffer[payload_start:size] = payload
+        return self._finish(
+            body_start,
+            size,
+            (timestamp, nonce, emitter_chain, emitter_address, sequence, consistency_level)
+        )
+
+    def build_hello_token_transfer(
+            self,
+            emitter_chain: int,
+            emitter_address: bytes,
+            sequence: int,
+            amount: int,
+            token_address: bytes,
+            token_chain: int,
+            to: bytes,
+            to_chain: int,
+            from_address: bytes,
+            recipient: bytes,
+            timestamp: int = 0,
+            nonce: int = 0,
+            consistency_level: int = 1
+    ) -> bytes:
+        # TransferWithPayload carrying a HelloTokenMessage, written straight into the buffer
+        body_start, size = self._reserve(transfer_with_payload_size(HELLO_MESSAGE_SIZE))
+        pack_transfer_with_payload_into(
+            self._buffer,
+            body_start + _BODY_HEADER_SIZE,
+            amount,
+            token_address,
+            token_chain,
+            to,
+            to_chain,
+            from_address,
+            encode_hello_token_message(recipient)
+        )
+        return self._finish(
+            body_start,
+            size,
+            (timestamp, nonce, emitter_chain, emitter_address, sequence, consistency_level)
+        )
+
+
+def generate_hello_token_vaas(
+        builder: VaaBuilder,
+        count: int,
+        seed: int = 0,
+        start: int = 0,
+        emitter_chain: int = 21,
+        emitter_address: bytes = bytes.fromhex("40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9"),
+        token_address: bytes = bytes.fromhex("bda28aeb93874baba2273db9c92fb7b7fe2f412352e9633c0258978a32620a23"),
+        token_chain: int = 21,
+        to: bytes = bytes.fromhex("ceda17841d79db34bd17721d2024343b5d9dd0320626958e10f4cf3d800a719e"),
+        to_chain: int = 1,
+        from_address: bytes = bytes.fromhex("35fbfedfe4ba06b311b86ae1d2064e08e583e6d550524307fc626648c4718c0c"),
+        base_timestamp: int = 1_700_000_000
+) -> Iterator[bytes]:
+    # each VAA only depends on (seed, sequence), so ranges can be generated by separate workers
+    for sequence in range(start, start + count):
+        rng = random.Random(seed * 0x1_0000_0000_0000_0000 + sequence)
+        yield builder.build_hello_token_transfer(
+            emitter_chain,
+            emitter_address,
+            sequence,
+            rng.randrange(1, 10 ** 12),
+            token_address,
+            token_chain,
+            to,
+            to_chain,
+            from_address,
+            rng.randbytes(32),
+            timestamp=base_timestamp + sequence,
+            nonce=rng.getrandbits(32)
+        )
+
+
+def _generateChunk(private_keys: List[bytes], index: int, num_signers: Optional[int], seed: int, start: int,
+                   count: int) -> List[bytes]:
+    builder = VaaBuilder(MockGuardianSet(private_keys, index), num_signers)
+    return list(generate_hello_token_vaas(builder, count, seed, start))
+
+
+def generate_hello_token_vaas_parallel(
+        guardians: MockGuardianSet,
+        count: int,
+        seed: int = 0,
+        start: int = 0,
+        num_signers: Optional[int] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 10000
+) -> Iterator[bytes]:
+    workers = workers or os.cpu_count() or 1
+    starts = list(range(start, start + count, chunk_size))
+    counts = [min(chunk_size, start + count - chunk_start) for chunk_start in starts]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(
+            _generateChunk,
+            [guardians.private_keys] * len(starts),
+            [guardians.index] * len(starts),
+            [num_signers] * len(starts),
+            [seed] * len(starts),
+            starts,
+            counts
+        )
+        for chunk in chunks:
+            yield from chunk
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Union
+
+from vaa_fetch import emitter_hex
+
+# VAAs are at most a few KiB, so the default keeps tens of thousands of them
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# how long a "not signed yet" answer is trusted before asking the guardians again
+DEFAULT_NEGATIVE_TTL = 5.0
+# hits only bump the LRU clock when it is older than this, so reads rarely write
+_TOUCH_INTERVAL = 60.0
+# eviction frees down to this fraction of max_bytes, so it does not run on every put
+_EVICT_TO = 0.9
+
+
+def content_digest(vaa: bytes) -> bytes:
+    return hashlib.blake2b(vaa, digest_size=32).digest()
+
+
+class VaaCache:
+    # read-through cache of signed VAAs keyed by (chain, emitter, sequence).
+    # Blobs are stored once by content digest, keys point at the digest, and
+    # unsigned answers are kept as short lived negative entries.
+
+    def __init__(
+            self,
+            path: str,
+            max_bytes: int = DEFAULT_MAX_BYTES,
+            negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+            timeout: float = 30.0
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared with forked workers
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "digest BLOB PRIMARY KEY, "
+                "vaa BLOB NOT NULL, "
+                "size INTEGER NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vaa_keys ("
+                "chain INTEGER NOT NULL, "
+                "emitter TEXT NOT NULL, "
+                "sequence INTEGER NOT NULL, "
+                "digest BLOB NOT NULL, "
+                "accessed REAL NOT NULL, "
+                "PRIMARY KEY (chain, emitter, sequence)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS vaa_keys_accessed ON vaa_keys (accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS vaa_keys_digest ON vaa_keys (digest)")
+            # running total of blob bytes, kept in the file so every process sees the same number
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM blobs"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS unsigned ("
+                "chain INTEGER NOT NULL, "
+                "emitter TEXT NOT NULL, "
+                "sequence INTEGER NOT NULL, "
+                "expires REAL NOT NULL, "
+                "PRIMARY KEY (chain, emitter, sequence)"
+                ") WITHOUT ROWID"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int) -> Optional[bytes]:
+        key = (emitter_chain, emitter_hex(emitter_address), sequence)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT b.vaa, k.accessed FROM vaa_keys k JOIN blobs b ON b.digest = k.digest "
+                "WHERE k.chain = ? AND k.emitter = ? AND k.sequence = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            vaa, accessed = row
+            if now - accessed > _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE vaa_keys SET accessed = ? WHERE chain = ? AND emitter = ? AND sequence = ?",
+                    (now, *key)
+                )
+        return bytes(vaa)
+
+    def is_unsigned(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT expires FROM unsigned WHERE chain = ? AND emitter = ? AND sequence = ?",
+                (emitter_chain, emitter_hex(emitter_address), sequence)
+            ).fetchone()
+            if row is None or row[0] < time.time():
+                return False
+            self.negative_hits += 1
+            return True
+
+    def put(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int, vaa: bytes):
+        vaa = bytes(vaa)
+        key = (emitter_chain, emitter_hex(emitter_address), sequence)
+        digest = content_digest(vaa)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO blobs (digest, vaa, size) VALUES (?, ?, ?)",
+                    (digest, vaa, len(vaa))
+                ).rowcount
+                added = len(vaa) if inserted else 0
+                previous = conn.execute(
+                    "SELECT digest FROM vaa_keys WHERE chain = ? AND emitter = ? AND sequence = ?",
+                    key
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO vaa_keys (chain, emitter, sequence, digest, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (*key, digest, time.time())
+                )
+                if previous is not None and bytes(previous[0]) != digest:
+                    # the key was re-observed with different bytes, e.g. another signature set
+                    added -= self._release(conn, previous[0])
+                if added:
+                    conn.execute("UPDATE meta SET value = value + ? WHERE key = 'bytes'", (added,))
+                conn.execute("DELETE FROM unsigned WHERE chain = ? AND emitter = ? AND sequence = ?", key)
+                total = self._total(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if total > self.max_bytes:
+            self.evict()
+
+    def put_unsigned(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO unsigned (chain, emitter, sequence, expires) VALUES (?, ?, ?, ?)",
+                (emitter_chain, emitter_hex(emitter_address), sequence, time.time() + self.negative_ttl)
+            )
+
+    @staticmethod
+    def _release(conn: sqlite3.Connection, digest: bytes) -> int:
+        # blobs are shared by content, free one only with its last key; returns the bytes freed
+        if conn.execute("SELECT 1 FROM vaa_keys WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None:
+            return 0
+        row = conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return 0
+        conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        return row[0]
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+
+    def size(self) -> int:
+        with self._lock:
+            return self._total(self._connection())
+
+    def evict(self):
+        # drop least recently used keys until the blobs fit in _EVICT_TO of max_bytes
+        with self._lock:
+            conn = self._connection()
+            if self._total(conn) <= self.max_bytes:
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # another process may have evicted while we waited for the write lock
+                total = self._total(conn)
+                target = self.max_bytes * _EVICT_TO
+                while total > target:
+                    oldest = conn.execute(
+                        "SELECT chain, emitter, sequence, digest FROM vaa_keys ORDER BY accessed LIMIT 1"
+                    ).fetchone()
+                    if oldest is None:
+                        break
+                    chain, emitter, sequence, digest = oldest
+                    conn.execute(
+                        "DELETE FROM vaa_keys WHERE chain = ? AND emitter = ? AND sequence = ?",
+                        (chain, emitter, sequence)
+                    )
+                    total -= self._release(conn, digest)
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'bytes'", (total,))
+                conn.execute("DELETE FROM unsigned WHERE expires < ?", (time.time(),))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "bytes": self.size(),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
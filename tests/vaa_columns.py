@@ -0,0 +1,131 @@
+import struct
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+
+from help import TokenTransfer
+
+VAA_DTYPE = np.dtype([
+    ("version", np.uint8),
+    ("guardian_set_index", np.uint32),
+    ("timestamp", np.uint32),
+    ("nonce", np.uint32),
+    ("emitter_chain", np.uint16),
+    ("emitter_address", np.uint8, (32,)),
+    ("sequence", np.uint64),
+    ("consistency_level", np.uint8),
+    ("payload_type", np.uint8),
+    # token bridge amounts are normalized to 8 decimals, so they fit a u64 in
+    # practice; rows where the upper 24 bytes are not zero set amount_overflow
+    ("amount", np.uint64),
+    ("amount_overflow", np.bool_),
+    ("token_chain", np.uint16),
+    ("token_address", np.uint8, (32,)),
+    ("redeemer", np.uint8, (32,)),
+    ("redeemer_chain", np.uint16),
+])
+
+_LENGTH_PREFIX = struct.Struct(">I")
+
+# offsets relative to the start of the body / token bridge payload
+_BODY_HEADER_SIZE = 51
+_TRANSFER_HEADER_SIZE = 133
+
+
+def split_length_prefixed(buffer: Union[bytes, memoryview]) -> Tuple[np.ndarray, np.ndarray]:
+    # every record is a u32 big-endian length followed by the signed VAA
+    starts = []
+    lengths = []
+    offset = 0
+    end = len(buffer)
+    while offset < end:
+        (length,) = _LENGTH_PREFIX.unpack_from(buffer, offset)
+        offset += _LENGTH_PREFIX.size
+        if offset + length > end:
+            raise ValueError(f"truncated VAA record at offset {offset - _LENGTH_PREFIX.size}")
+        starts.append(offset)
+        lengths.append(length)
+        offset += length
+    return np.asarray(starts, dtype=np.int64), np.asarray(lengths, dtype=np.int64)
+
+
+def join_length_prefixed(vaas: Sequence[bytes]) -> bytes:
+    return b"".join(_LENGTH_PREFIX.pack(len(vaa)) + bytes(vaa) for vaa in vaas)
+
+
+def _gather(buf: np.ndarray, offsets: np.ndarray, width: int) -> np.ndarray:
+    return buf[offsets[:, None] + np.arange(width, dtype=np.int64)]
+
+
+def _be_uint(buf: np.ndarray, offsets: np.ndarray, width: int) -> np.ndarray:
+    raw = np.ascontiguousarray(_gather(buf, offsets, width))
+    return raw.view(f">u{width}").ravel()
+
+
+def parse_vaa_columns(
+        vaas: Union[Sequence[bytes], bytes, memoryview],
+        starts: np.ndarray = None,
+        lengths: np.ndarray = None
+) -> np.ndarray:
+    if isinstance(vaas, (bytes, bytearray, memoryview)):
+        data = vaas
+        if starts is None or lengths is None:
+            starts, lengths = split_length_prefixed(data)
+    else:
+        lengths = np.fromiter((len(vaa) for vaa in vaas), dtype=np.int64, count=len(vaas))
+        starts = np.zeros(len(vaas), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        data = b"".join(vaas)
+
+    count = len(starts)
+    out = np.zeros(count, dtype=VAA_DTYPE)
+    if count == 0:
+        return out
+
+    # pad so fixed-width gathers near the end of the buffer stay in bounds
+    buf = np.concatenate((
+        np.frombuffer(data, dtype=np.uint8),
+        np.zeros(_BODY_HEADER_SIZE + _TRANSFER_HEADER_SIZE, dtype=np.uint8)
+    ))
+    ends = starts + lengths
+
+    num_signers = buf[starts + 5].astype(np.int64)
+    body = starts + 6 + 66 * num_signers
+    if np.any(body + _BODY_HEADER_SIZE > ends):
+        bad = int(np.argmax(body + _BODY_HEADER_SIZE > ends))
+        raise ValueError(f"VAA {bad} is too short")
+
+    out["version"] = buf[starts]
+    out["guardian_set_index"] = _be_uint(buf, starts + 1, 4)
+    out["timestamp"] = _be_uint(buf, body, 4)
+    out["nonce"] = _be_uint(buf, body + 4, 4)
+    out["emitter_chain"] = _be_uint(buf, body + 8, 2)
+    out["emitter_address"] = _gather(buf, body + 10, 32)
+    out["sequence"] = _be_uint(buf, body + 42, 8)
+    out["consistency_level"] = buf[body + 50]
+
+    payload = body + _BODY_HEADER_SIZE
+    has_payload = payload < ends
+    payload_type = np.where(has_payload, buf[payload], 0).astype(np.uint8)
+    out["payload_type"] = payload_type
+
+    is_transfer = (
+        ((payload_type == TokenTransfer.Transfer) | (payload_type == TokenTransfer.TransferWithPayload))
+        & (payload + _TRANSFER_HEADER_SIZE <= ends)
+    )
+    rows = np.flatnonzero(is_transfer)
+    if len(rows):
+        p = payload[rows]
+        out["amount_overflow"][rows] = _gather(buf, p + 1, 24).any(axis=1)
+        out["amount"][rows] = _be_uint(buf, p + 25, 8)
+        out["token_address"][rows] = _gather(buf, p + 33, 32)
+        out["token_chain"][rows] = _be_uint(buf, p + 65, 2)
+        out["redeemer"][rows] = _gather(buf, p + 67, 32)
+        out["redeemer_chain"][rows] = _be_uint(buf, p + 99, 2)
+
+    return out
+
+
+def as_columns(parsed: np.ndarray) -> Dict[str, np.ndarray]:
+    # one contiguous array per field, e.g. for pyarrow.Table.from_pydict
+    return {name: np.ascontiguousarray(parsed[name]) for name in parsed.dtype.names}
@@ -0,0 +1,282 @@
+import asyncio
+import base64
+import json
+import os
+import random
+from collections import deque
+from typing import AsyncIterator, Deque, Iterable, List, Optional, Set, Tuple, Union
+
+import httpx
+
+GUARDIAN_API_TESTNET = "https://wormhole-v2-testnet-api.certus.one"
+
+# responses worth retrying: not signed yet, rate limited or a guardian API hiccup
+_RETRY_STATUS = {404, 429, 500, 502, 503, 504}
+
+
+class VaaNotFound(ValueError):
+    def __init__(self, emitter_chain: int, emitter_address: str, sequence: int, reason: str):
+        super().__init__(f"signed vaa {emitter_chain}/{emitter_address}/{sequence} not available: {reason}")
+        self.emitter_chain = emitter_chain
+        self.emitter_address = emitter_address
+        self.sequence = sequence
+        self.reason = reason
+
+
+def emitter_hex(emitter_address: Union[bytes, memoryview, str]) -> str:
+    if isinstance(emitter_address, str):
+        return emitter_address.lower().replace("0x", "")
+    return bytes(emitter_address).hex()
+
+
+def signed_vaa_path(emitter_chain: int, emitter_address: Union[bytes, str], sequence: int) -> str:
+    return f"/v1/signed_vaa/{emitter_chain}/{emitter_hex(emitter_address)}/{sequence}"
+
+
+class VaaFetcher:
+    def __init__(
+            self,
+            base_url: str = GUARDIAN_API_TESTNET,
+            max_concurrency: int = 32,
+            timeout: float = 10.0,
+            retries: int = 5,
+            backoff: float = 0.5,
+            max_backoff: float = 10.0,
+            cache=None,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # optional vaa_cache.VaaCache consulted before the network
+        self.cache = cache
+        # e.g. httpx.MockTransport to run against a stand-in guardian API
+        self.transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retry_delay(self, attempt: int) -> float:
+        # exponential backoff with jitter so concurrent fetches do not retry in lockstep
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    async def fetch_once(
+            self,
+            emitter_chain: int,
+            emitter_address: Union[bytes, str],
+            sequence: int,
+            fresh: bool = False
+    ) -> Optional[bytes]:
+        # a single request, None when the VAA is not signed yet. fresh ignores cached "not signed" answers
+        cache = self.cache
+        if cache is not None:
+            # sqlite calls run in the default executor, they must not block the event loop
+            loop = asyncio.get_running_loop()
+            vaa = await loop.run_in_executor(None, cache.get, emitter_chain, emitter_address, sequence)
+            if vaa is not None:
+                return vaa
+            if not fresh and await loop.run_in_executor(
+                    None, cache.is_unsigned, emitter_chain, emitter_address, sequence
+            ):
+                return None
+
+        await self.open()
+        async with self._semaphore:
+            response = await self._client.get(signed_vaa_path(emitter_chain, emitter_address, sequence))
+
+        if response.status_code == 404:
+            if cache is not None:
+                await loop.run_in_executor(None, cache.put_unsigned, emitter_chain, emitter_address, sequence)
+            return None
+        if response.status_code in _RETRY_STATUS:
+            response.raise_for_status()
+
+        data = response.json()
+        if "vaaBytes" not in data:
+            raise VaaNotFound(emitter_chain, emitter_hex(emitter_address), sequence, response.text)
+
+        vaa = base64.b64decode(data["vaaBytes"])
+        if cache is not None:
+            await loop.run_in_executor(None, cache.put, emitter_chain, emitter_address, sequence, vaa)
+        return vaa
+
+    async def fetch(self, emitter_chain: int, emitter_address: Union[bytes, str], sequence: int) -> bytes:
+        reason = "not signed"
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self._retry_delay(attempt - 1))
+            try:
+                # retries go to the network, the cached "not signed" answer is what they retry
+                vaa = await self.fetch_once(emitter_chain, emitter_address, sequence, fresh=attempt > 0)
+            except httpx.HTTPStatusError as e:
+                reason = f"HTTP {e.response.status_code}"
+                continue
+            except httpx.TransportError as e:
+                reason = f"{type(e).__name__}: {e}"
+                continue
+            if vaa is not None:
+                return vaa
+            reason = "not signed"
+
+        raise VaaNotFound(emitter_chain, emitter_hex(emitter_address), sequence, reason)
+
+    async def fetch_many(
+            self,
+            keys: Iterable[Tuple[int, Union[bytes, str], int]],
+            return_exceptions: bool = False
+    ) -> List[Union[bytes, BaseException]]:
+        return await asyncio.gather(
+            *(self.fetch(emitter_chain, emitter_address, sequence) for emitter_chain, emitter_address, sequence in keys),
+            return_exceptions=return_exceptions
+        )
+
+
+class BackfillCheckpoint:
+    # resume point of a sequence range backfill: every sequence below next_sequence was either
+    # delivered or recorded in missing, which holds the ones the guardians had not signed yet
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.next_sequence: Optional[int] = None
+        self.missing: Set[int] = set()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @property
+    def contiguous(self) -> Optional[int]:
+        # highest sequence the backfill got past in order
+        return None if self.next_sequence is None else self.next_sequence - 1
+
+    def load(self):
+        with open(self.path) as file:
+            state = json.load(file)
+        self.next_sequence = state["next_sequence"]
+        self.missing = set(state["missing"])
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"next_sequence": self.next_sequence, "missing": sorted(self.missing)}, file)
+        os.replace(tmp_path, self.path)
+
+    def advance(self, sequence: int, found: bool):
+        self.next_sequence = sequence + 1
+        if found:
+            self.missing.discard(sequence)
+        else:
+            self.missing.add(sequence)
+
+
+async def _fetch_or_none(fetcher: VaaFetcher, emitter_chain: int, emitter_address, sequence: int) -> Optional[bytes]:
+    try:
+        return await fetcher.fetch(emitter_chain, emitter_address, sequence)
+    except VaaNotFound:
+        return None
+
+
+async def _fetch_sequences(
+        fetcher: VaaFetcher,
+        emitter_chain: int,
+        emitter_address: Union[bytes, str],
+        sequences: Iterable[int],
+        window: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    # keeps up to window fetches in flight and resolves them in input order
+    sequences = iter(sequences)
+    pending: Deque[Tuple[int, asyncio.Task]] = deque()
+
+    def schedule():
+        for sequence in sequences:
+            pending.append((sequence, asyncio.ensure_future(
+                _fetch_or_none(fetcher, emitter_chain, emitter_address, sequence)
+            )))
+            if len(pending) >= window:
+                break
+
+    schedule()
+    try:
+        while pending:
+            sequence, task = pending.popleft()
+            vaa = await task
+            schedule()
+            yield sequence, vaa
+    finally:
+        for _sequence, task in pending:
+            task.cancel()
+
+
+async def fetch_range(
+        fetcher: VaaFetcher,
+        emitter_chain: int,
+        emitter_address: Union[bytes, str],
+        start: int,
+        end: int,
+        window: int = 64,
+        checkpoint: Optional[BackfillCheckpoint] = None,
+        save_every: int = 256
+) -> AsyncIterator[Tuple[int, bytes]]:
+    # signed VAAs for sequences [start, end) in sequence order, resuming after the checkpoint.
+    # sequences that are still not signed after the fetcher retries are skipped and recorded
+    # in checkpoint.missing for retry_missing
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint()
+    if checkpoint.next_sequence is not None:
+        start = max(start, checkpoint.next_sequence)
+
+    resolved = 0
+    try:
+        async for sequence, vaa in _fetch_sequences(fetcher, emitter_chain, emitter_address, range(start, end), window):
+            if vaa is not None:
+                # advance only once the consumer took it, so an interrupted run yields it again
+                yield sequence, vaa
+            checkpoint.advance(sequence, vaa is not None)
+            resolved += 1
+            if resolved % save_every == 0:
+                checkpoint.save()
+    finally:
+        checkpoint.save()
+
+
+async def retry_missing(
+        fetcher: VaaFetcher,
+        emitter_chain: int,
+        emitter_address: Union[bytes, str],
+        checkpoint: BackfillCheckpoint,
+        window: int = 64
+) -> AsyncIterator[Tuple[int, bytes]]:
+    try:
+        async for sequence, vaa in _fetch_sequences(
+                fetcher, emitter_chain, emitter_address, sorted(checkpoint.missing), window
+        ):
+            if vaa is not None:
+                checkpoint.missing.discard(sequence)
+                yield sequence, vaa
+    finally:
+        checkpoint.save()
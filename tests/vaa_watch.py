@@ -0,0 +1,120 @@
+import asyncio
+import sys
+from typing import Optional, Tuple, Union
+
+import httpx
+
+from vaa_fetch import VaaFetcher, emitter_hex
+
+
+class SequenceWatcher:
+    # follows one (chain, emitter) and pushes (sequence, vaa) onto queue as soon as the
+    # guardians sign the next sequence. Polls every min_interval right after a hit or a
+    # nudge() and slows down geometrically up to max_interval while nothing new appears.
+
+    def __init__(
+            self,
+            fetcher: VaaFetcher,
+            emitter_chain: int,
+            emitter_address: Union[bytes, str],
+            next_sequence: int,
+            queue: Optional[asyncio.Queue] = None,
+            min_interval: float = 0.1,
+            max_interval: float = 10.0,
+            backoff_factor: float = 1.5
+    ):
+        self.fetcher = fetcher
+        self.emitter_chain = emitter_chain
+        self.emitter_address = emitter_hex(emitter_address)
+        self.next_sequence = next_sequence
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.interval = min_interval
+        self.polls = 0
+        self.delivered = 0
+        self.errors = 0
+        self._nudged = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def last_sequence(self) -> Optional[int]:
+        return self.next_sequence - 1 if self.next_sequence > 0 else None
+
+    def nudge(self):
+        # call right after sending a message from the watched emitter
+        self.interval = self.min_interval
+        self._nudged.set()
+
+    async def poll(self) -> Optional[Tuple[int, bytes]]:
+        self.polls += 1
+        try:
+            # skip the negative cache, its TTL is far longer than our fast interval
+            vaa = await self.fetcher.fetch_once(
+                self.emitter_chain, self.emitter_address, self.next_sequence, fresh=True
+            )
+        except (httpx.HTTPStatusError, httpx.TransportError):
+            vaa = None
+        if vaa is None:
+            return None
+
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.delivered += 1
+        await self.queue.put((sequence, vaa))
+        return sequence, vaa
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._nudged.wait(), self.interval)
+        except asyncio.TimeoutError:
+            pass
+        self._nudged.clear()
+
+    async def run(self):
+        while True:
+            try:
+                found = await self.poll() is not None
+            except Exception as e:
+                # e.g. a 400 or an undecodable body from the guardian API, log it and back off
+                self.errors += 1
+                print(f"watch {self.emitter_chain}/{self.emitter_address}/{self.next_sequence} failed: {e!r}")
+                found = False
+            if found:
+                # drain bursts back to back
+                self.interval = self.min_interval
+                continue
+            await self._wait()
+            self.interval = min(self.max_interval, self.interval * self.backoff_factor)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def watch(emitter_chain: int, emitter_address: str, next_sequence: int):
+    async with VaaFetcher() as fetcher:
+        watcher = SequenceWatcher(fetcher, emitter_chain, emitter_address, next_sequence)
+        watcher.start()
+        try:
+            while True:
+                sequence, vaa = await watcher.queue.get()
+                print(f"{sequence} 0x{vaa.hex()}")
+        finally:
+            await watcher.stop()
+
+
+if __name__ == '__main__':
+    # python vaa_watch.py 21 40440411a170b4842ae7dee4f4a7b7a58bc0a98566e998850a7bb87bf5dc05b9 126
+    asyncio.run(watch(int(sys.argv[1]), sys.argv[2], int(sys.argv[3])))